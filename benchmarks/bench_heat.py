@@ -0,0 +1,117 @@
+"""
+"Qizigan bahs" detektori benchmarki: xabar boshiga yangilash narxi va eski qoida
+(thread'ning umumiy hisoblagichi >= 2 yoki bitta "issiq" so'z) bilan solishtirganda soxta triggerlar.
+
+Sintetik oqim ikki xil threaddan iborat:
+  - "tinch": bitta odam bir necha daqiqada bitta savol beradi (javob kutilmaydi);
+  - "bahs": 2–4 kishi bir daqiqa ichida ketma-ket yozishadi (javob kutiladi).
+
+Ishga tushirish:
+    python -m benchmarks.bench_heat [--threads 2000] [--repeat 5]
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from services.heat import HeatDetector
+
+# (vaqt, chat_id, thread_id, user_id, markerlar, bahsmi)
+Event = Tuple[float, int, None, int, int, bool]
+
+
+def build_stream(threads: int, seed: int = 42) -> List[Event]:
+    rnd = random.Random(seed)
+    events: List[Event] = []
+    for chat_id in range(threads):
+        start = rnd.uniform(0, 3600)
+        if rnd.random() < 0.7:
+            # tinch thread: bitta yozuvchi, savollar orasida 2–10 daqiqa
+            t = start
+            for _ in range(rnd.randint(2, 6)):
+                events.append((t, chat_id, None, chat_id * 10, rnd.choice((0, 0, 1)), False))
+                t += rnd.uniform(120, 600)
+        else:
+            # bahs: 2–4 ishtirokchi, 6–12 xabar, 3–10 soniya oralig'ida
+            users = [chat_id * 10 + i for i in range(rnd.randint(2, 4))]
+            t = start
+            for _ in range(rnd.randint(6, 12)):
+                events.append((t, chat_id, None, rnd.choice(users), rnd.choice((0, 1, 1, 2)), True))
+                t += rnd.uniform(3, 10)
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def legacy_flags(events: List[Event]) -> List[bool]:
+    """
+    Eski qoida: ``THREAD_COUNT[(chat, thread)]`` hech qachon nolga qaytmaydigan hisoblagich
+    >= 2 yoki xabarda >= 1 marker.
+    """
+    counts: Dict[Tuple[int, None], int] = defaultdict(int)
+    flags = []
+    for _now, chat_id, thread_id, _user, markers, _ in events:
+        counts[(chat_id, thread_id)] += 1
+        flags.append(counts[(chat_id, thread_id)] >= 2 or markers >= 1)
+    return flags
+
+
+def detector_flags(events: List[Event]) -> List[bool]:
+    heat = HeatDetector(max_threads=len(events))
+    flags = []
+    for now, chat_id, thread_id, user_id, markers, _ in events:
+        heat.observe(chat_id, thread_id, user_id, markers, now=now)
+        flags.append(heat.is_heated(chat_id, thread_id, now=now))
+    return flags
+
+
+def report(name: str, events: List[Event], flags: List[bool]) -> None:
+    quiet = [f for e, f in zip(events, flags) if not e[5]]
+    burst = [f for e, f in zip(events, flags) if e[5]]
+    print(f"{name:<9} soxta (tinch): {sum(quiet) / len(quiet):6.1%}   "
+          f"topilgan (bahs): {sum(burst) / len(burst):6.1%}   triggerlar: {sum(flags)}")
+
+
+def bench(events: List[Event], repeat: int) -> Tuple[float, float]:
+    """Eng yaxshi natija bo'yicha xabar boshiga ns: (observe, observe + is_heated)."""
+    best_observe = best_full = float("inf")
+    for _ in range(repeat):
+        heat = HeatDetector(max_threads=len(events))
+        started = time.perf_counter()
+        for now, chat_id, thread_id, user_id, markers, _ in events:
+            heat.observe(chat_id, thread_id, user_id, markers, now=now)
+        best_observe = min(best_observe, time.perf_counter() - started)
+
+        heat = HeatDetector(max_threads=len(events))
+        started = time.perf_counter()
+        for now, chat_id, thread_id, user_id, markers, _ in events:
+            heat.observe(chat_id, thread_id, user_id, markers, now=now)
+            heat.is_heated(chat_id, thread_id, now=now)
+        best_full = min(best_full, time.perf_counter() - started)
+    return best_observe / len(events) * 1e9, best_full / len(events) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    events = build_stream(args.threads)
+    print(f"xabarlar: {len(events)}, threadlar: {args.threads}")
+    report("eski", events, legacy_flags(events))
+    report("detektor", events, detector_flags(events))
+
+    observe_ns, full_ns = bench(events, args.repeat)
+    print(f"observe:             {observe_ns:,.0f} ns/xabar")
+    print(f"observe + is_heated: {full_ns:,.0f} ns/xabar")
+
+    heat = HeatDetector(max_threads=args.threads)
+    for now, chat_id, thread_id, user_id, markers, _ in events:
+        heat.observe(chat_id, thread_id, user_id, markers, now=now)
+    stats = heat.stats()
+    print(f"xotira:              {stats['memory_bytes'] / 1024:,.1f} KiB ({stats['threads']} thread)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Suhbat xotirasi tekshiruvi: bir chatga parallel ``remember`` chaqiruvlari hech bir turnni
+yo'qotmasligi kerak — har bir savol yoki kontekstda, yoki xulosaga qo'shilganlar orasida
+aynan bir marta uchraydi. Oxirida ``remember`` narxi chiqariladi.
+
+Ishga tushirish:
+    python -m benchmarks.bench_memory [--chats 50] [--turns 40] [--redis redis://localhost:6379/15]
+"""
+import argparse
+import asyncio
+import time
+from collections import Counter
+from typing import List, Optional
+
+from services.memory import ConversationMemory
+from services.state import MemoryStateBackend, RedisStateBackend, StateBackend
+
+
+def build_state(dsn: Optional[str], history_limit: int) -> StateBackend:
+    if dsn:
+        return RedisStateBackend(dsn, history_limit=history_limit, prefix="bench-memory:")
+    return MemoryStateBackend(history_limit=history_limit)
+
+
+async def check_concurrent(state: StateBackend, chats: int, turns: int, token_budget: int) -> float:
+    """Har bir chatga ``turns`` ta turnni bir vaqtda yozadi; yo'qolgan/takroriy turn bo'lsa AssertionError."""
+    folded: List[str] = []
+
+    async def summarizer(previous: str, evicted: List[dict]) -> str:
+        folded.extend(t["content"] for t in evicted if t["role"] == "user")
+        return previous
+
+    memory = ConversationMemory(state, token_budget=token_budget, summarizer=summarizer)
+    for chat_id in range(chats):
+        await state.clear_history(chat_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        memory.remember(chat_id, f"savol {chat_id}:{turn}", f"javob {chat_id}:{turn} " + "x" * (turn % 7 * 20))
+        for turn in range(turns)
+        for chat_id in range(chats)
+    ))
+    elapsed = time.perf_counter() - started
+    await memory.drain()
+
+    seen = Counter(folded)
+    for chat_id in range(chats):
+        history = await state.get_history(chat_id)
+        seen.update(e["content"] for e in history if e["role"] == "user")
+        await state.clear_history(chat_id)
+    expected = {f"savol {chat_id}:{turn}" for chat_id in range(chats) for turn in range(turns)}
+    lost = expected - set(seen)
+    duplicated = [prompt for prompt, count in seen.items() if count > 1]
+    assert not lost, f"{len(lost)} ta turn yo'qoldi, masalan: {sorted(lost)[:3]}"
+    assert not duplicated, f"{len(duplicated)} ta turn takrorlandi, masalan: {duplicated[:3]}"
+    return elapsed / (chats * turns) * 1e6
+
+
+async def run(args) -> None:
+    state = build_state(args.redis, args.history_limit)
+    try:
+        per_turn_us = await check_concurrent(state, args.chats, args.turns, args.token_budget)
+    finally:
+        await state.close()
+    print(f"{type(state).__name__}: {args.chats} chat x {args.turns} parallel turn — yo'qolgan turn yo'q")
+    print(f"remember: {per_turn_us:,.1f} us/turn")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--token-budget", type=int, default=300)
+    parser.add_argument("--history-limit", type=int, default=40)
+    parser.add_argument("--redis", help="Redis DSN (berilmasa — xotiradagi backend)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
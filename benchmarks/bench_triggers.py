@@ -0,0 +1,180 @@
+"""
+Trigger klassifikatori mikrobenchmarki: eski (har bir yordamchi alohida lower()/regex/substring)
+va yangi (``services.triggers.TriggerClassifier`` bitta o'tish) yo'llarini solishtiradi.
+
+Kalit so'zlar ro'yxatlari ``handlers.users.echo`` dan olinadi; eski yordamchilar bu yerda —
+faqat taqqoslash uchun.
+
+Ishga tushirish:
+    python -m benchmarks.bench_triggers [--messages 20000] [--repeat 5]
+"""
+import argparse
+import random
+import re
+import time
+
+from handlers.users import echo
+from services.triggers import TriggerClassifier
+
+CLASSIFIER = TriggerClassifier(
+    topics=echo.ALLOWED_TOPICS,
+    question_words=echo.QUESTION_WORDS,
+    heated_markers=echo.HEATED_MARKERS,
+    code_hints=echo.CODE_HINTS,
+    playful_hints=echo.PLAYFUL_HINTS,
+    mention_words=echo.MENTION_WORDS,
+    bot_username=echo.BOT_USERNAME,
+)
+TOPICS_RE = re.compile(r"\b(" + "|".join(map(re.escape, echo.ALLOWED_TOPICS)) + r")\b", re.I)
+
+SAMPLES = [
+    "Salom hammaga, bugun dars bo'ladimi?",
+    "docker compose up qilganda xato chiqyapti, nega?",
+    "git push error: rejected, qanday tuzataman",
+    "@{bot} fastapi da websocket qanday ishlaydi?",
+    "/ask django orm select_related va prefetch_related farqi",
+    "aka bot hazil qilib bering 😄",
+    "kod yozib bering pls, react useEffect misol",
+    "menimcha bu noto'g'ri, postgres index kerak",
+    "nginx 502 bad gateway qayerda qaraymiz",
+    "Rahmat ustoz!",
+    "bugun ob-havo zo'r ekan",
+    "pytest fixture haqida fikr bildiring",
+    "linux da systemd service ishlamayapti",
+    "Kimdir kubernetes helm chart yozganmi?",
+    "typescript yoki javascript — qaysi biri yaxshi?",
+    "bro, mem tashlang",
+]
+
+
+# ---------------------- Eski yordamchilar ----------------------
+def looks_it_topic(text: str) -> bool:
+    return bool(TOPICS_RE.search(text or ""))
+
+
+def is_question_or_confusion(text: str) -> bool:
+    low = (text or "").lower()
+    return ("?" in low) or any(k in low for k in echo.QUESTION_WORDS)
+
+
+def mentioned_directly(text: str) -> bool:
+    return bool(echo.BOT_USERNAME) and (f"@{echo.BOT_USERNAME}".lower() in (text or "").lower())
+
+
+def is_code_request(text: str) -> bool:
+    low = (text or "").lower()
+    return any(h in low for h in echo.CODE_HINTS)
+
+
+def is_playful_request(text: str) -> bool:
+    low = (text or "").lower()
+    return any(h in low for h in echo.PLAYFUL_HINTS)
+
+
+def legacy_features(text: str):
+    """Eski yo'l: group_only_listener + should_respond dagi chaqiruvlar ketma-ketligi."""
+    gate = (looks_it_topic(text) or is_question_or_confusion(text) or mentioned_directly(text)
+            or text.startswith("/ask"))
+    if not gate:
+        return is_playful_request(text)
+    ask = text.startswith("/ask")
+    mentioned = mentioned_directly(text)
+    it_topic = looks_it_topic(text)
+    question = it_topic and is_question_or_confusion(text)
+    low = text.lower()
+    hot = sum(1 for k in echo.HEATED_MARKERS if k in low)
+    mention_word = looks_it_topic(text) and any(w in text.lower() for w in echo.MENTION_WORDS)
+    prompt = text[len("/ask"):].strip() if ask else text
+    playful = is_playful_request(prompt)
+    code = is_code_request(prompt)
+    return mentioned, it_topic, question, hot, mention_word, playful, code, looks_it_topic(prompt)
+
+
+def new_features(text: str):
+    features = CLASSIFIER.classify(text)
+    if not (features.it_topic or features.question or features.mentioned or features.ask):
+        return features.playful
+    return features
+
+
+def check_equivalence(corpus) -> int:
+    """Yangi klassifikator eski yordamchilar bilan bir xil natija berishini tekshiradi."""
+    mismatches = 0
+    for text in corpus:
+        f = CLASSIFIER.classify(text)
+        low = text.lower()
+        expected = (
+            looks_it_topic(text),
+            is_question_or_confusion(text),
+            sum(1 for k in echo.HEATED_MARKERS if k in low),
+            is_code_request(text),
+            is_playful_request(text),
+            any(w in low for w in echo.MENTION_WORDS),
+            mentioned_directly(text),
+        )
+        got = (f.it_topic, f.question, f.hot, f.code_request, f.playful, f.mention_word, f.mentioned)
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH {text!r}: expected={expected} got={got}")
+    return mismatches
+
+
+def check_overlap() -> int:
+    """
+    Mavzu va kalit so'z bir pozitsiyadan boshlanganda ikkalasi ham topilishini tekshiradi
+    (echo ro'yxatlarida bunday juftlik hozircha yo'q, shuning uchun alohida ro'yxatlar bilan).
+    """
+    classifier = TriggerClassifier(
+        topics=("error", "git"),
+        question_words=("error",),
+        heated_markers=("gi",),
+        code_hints=("github",),
+        playful_hints=(),
+        mention_words=(),
+    )
+    cases = {
+        # matn: (it_topic, question, hot, code_request)
+        "error chiqdi": (True, True, 0, False),
+        "git push": (True, False, 1, False),
+        "github actions": (False, False, 1, True),
+    }
+    mismatches = 0
+    for text, expected in cases.items():
+        f = classifier.classify(text)
+        got = (f.it_topic, f.question, f.hot, f.code_request)
+        if got != expected:
+            mismatches += 1
+            print(f"OVERLAP MISMATCH {text!r}: expected={expected} got={got}")
+    return mismatches
+
+
+def run(fn, corpus, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - started)
+    return len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    samples = [s.format(bot=echo.BOT_USERNAME) for s in SAMPLES]
+    corpus = [rnd.choice(samples) for _ in range(args.messages)]
+
+    mismatches = check_equivalence(samples) + check_overlap()
+    before = run(legacy_features, corpus, args.repeat)
+    after = run(new_features, corpus, args.repeat)
+    print(f"equivalence mismatches: {mismatches}")
+    print(f"before: {before:,.0f} msg/s")
+    print(f"after:  {after:,.0f} msg/s  ({after / before:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
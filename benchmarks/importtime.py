@@ -0,0 +1,83 @@
+"""
+Sovuq start (import vaqti) budjeti: ``python -X importtime`` bilan asosiy modullarni alohida
+jarayonda import qiladi va ikkita shartni tekshiradi:
+
+  1. Import yon ta'sirsiz va yengil: og'ir klient kutubxonalari (openai, sqlalchemy, httpx, redis)
+     import paytida yuklanmaydi — ular startup hookida / birinchi murojaatda kerak bo'ladi.
+  2. Import vaqti ikki budjetga sig'adi: aiogram'ning o'zi (Bot API tiplari — import vaqtining
+     asosiy qismi) ``--framework-budget-ms`` ga, qolgan hammasi (loyiha kodi va boshqa
+     kutubxonalar: aiohttp, pydantic, fastapi, ...) ``--budget-ms`` ga. Jami ham chiqariladi.
+
+Budjet oshsa yoki taqiqlangan modul yuklansa — chiqish kodi 1 (CI'da ishlatish mumkin).
+
+Ishga tushirish:
+    python -m benchmarks.importtime [--budget-ms 1000] [--framework-budget-ms 4000] [--repeat 3]
+"""
+import argparse
+import collections
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+MODULES = ("handlers.users.echo", "bot", "infrastructure.api.app")
+# Import paytida yuklanmasligi kerak bo'lgan og'ir kutubxonalar
+FORBIDDEN = ("openai", "sqlalchemy", "httpx", "redis")
+# Alohida budjetli framework: faqat aiogram paketining o'z vaqti (bog'liqliklari umumiy budjetda)
+FRAMEWORK = frozenset({"aiogram"})
+
+
+def measure(module: str) -> Tuple[Dict[str, int], List[str]]:
+    """
+    Modulni toza jarayonda import qiladi.
+
+    :return: (paket -> self vaqt mikrosoniyada, yuklangan taqiqlangan modullar)
+    """
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    code = f"import sys, {module}; print(','.join(m for m in {FORBIDDEN!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    by_package: Dict[str, int] = collections.Counter()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _cumulative, name = line[len("import time:"):].split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return by_package, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1000, help="aiogram'dan tashqari import vaqti chegarasi")
+    parser.add_argument("--framework-budget-ms", type=float, default=4000, help="aiogram import vaqti chegarasi")
+    parser.add_argument("--repeat", type=int, default=3, help="eng yaxshi natija olinadi")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        runs = [measure(module) for _ in range(args.repeat)]
+        by_package, loaded = min(runs, key=lambda run: sum(run[0].values()))
+        total = sum(by_package.values()) / 1000
+        framework = sum(us for pkg, us in by_package.items() if pkg in FRAMEWORK) / 1000
+        own = total - framework
+        heaviest = sorted(
+            ((pkg, us) for pkg, us in by_package.items() if pkg not in FRAMEWORK), key=lambda item: -item[1],
+        )[:5]
+
+        ok = own <= args.budget_ms and framework <= args.framework_budget_ms and not loaded
+        failed = failed or not ok
+        print(f"{module}: {'OK' if ok else 'FAIL'}")
+        print(f"  jami:          {total:8.1f} ms")
+        print(f"  aiogram:       {framework:8.1f} ms (budjet {args.framework_budget_ms:.0f} ms)")
+        print(f"  qolgani:       {own:8.1f} ms (budjet {args.budget_ms:.0f} ms)")
+        print(f"  eng og'irlari: {', '.join(f'{pkg} {us / 1000:.1f}' for pkg, us in heaviest)}")
+        if loaded:
+            print(f"  taqiqlangan modullar yuklandi: {', '.join(loaded)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+Offline yuklama testi: haqiqiy ``Dispatcher`` (routers_list + global middleware'lar) ga
+sintetik guruh update'larini beradi. Telegram o'rniga stub Bot session, OpenAI o'rniga
+sozlanadigan kechikish va 429 bilan lokal stub server ishlatiladi — tarmoq kerak emas.
+
+Ishga tushirish:
+    python -m benchmarks.loadtest --updates 3000 --rate 300 --oai-latency 0.2 --oai-429 0.05
+    python -m benchmarks.loadtest --corpus requests.jsonl --groups 50
+    python -m benchmarks.loadtest --no-throttle --noisy-share 0.6 --oai-latency 1.0   # bitta guruh portlaydi
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import List, Optional
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# ---------------------- Stub OpenAI ----------------------
+async def start_stub_openai(port: int, latency: float, error_rate: float, rnd: random.Random):
+    """``/v1/chat/completions`` ni taqlid qiluvchi aiohttp server (oddiy va stream javoblar)."""
+    from aiohttp import web
+
+    stats = {"requests": 0, "throttled": 0}
+    # Provayder prompt keshini taqlid qiladi: avval ko'rilgan eng uzun xabarlar prefiksi "keshdan" o'qiladi
+    seen_prefixes = set()
+
+    async def completions(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        stats["requests"] += 1
+        if rnd.random() < error_rate:
+            stats["throttled"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"retry-after-ms": "200"},
+            )
+        await asyncio.sleep(max(0.0, rnd.gauss(latency, latency / 4)))
+        messages = body["messages"]
+        prompt_tokens = len(json.dumps(messages, ensure_ascii=False)) // 4
+        cached_tokens = 0
+        for size in range(1, len(messages) + 1):
+            prefix = json.dumps(messages[:size], ensure_ascii=False)
+            if prefix in seen_prefixes:
+                cached_tokens = len(prefix) // 4
+            seen_prefixes.add(prefix)
+        answer = "Loglarni tekshiring. Keyin konfiguratsiyani solishtiring. Kichik misolda sinang."
+        created = int(time.time())
+        if body.get("stream"):
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for word in answer.split(" "):
+                chunk = {
+                    "id": "stub", "object": "chat.completion.chunk", "created": created, "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}],
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        return web.json_response({
+            "id": "stub", "object": "chat.completion", "created": created, "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        })
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner, stats
+
+
+# ---------------------- Stub Telegram ----------------------
+def make_stub_session(latency: float):
+    from aiogram.client.session.base import BaseSession
+    from aiogram.methods import GetChatAdministrators, SendMessage, EditMessageText, SendChatAction
+    from aiogram.types import Chat, ChatMemberAdministrator, Message, User
+
+    class StubSession(BaseSession):
+        """Bot API chaqiruvlarini tarmoqsiz bajaradi va sanaydi."""
+
+        def __init__(self) -> None:
+            super().__init__()
+            self.calls: dict = {}
+            self._message_id = 0
+
+        async def make_request(self, bot, method, timeout=None):
+            name = type(method).__name__
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if latency:
+                await asyncio.sleep(latency)
+            if isinstance(method, GetChatAdministrators):
+                admin = User(id=1, is_bot=False, first_name="Ustoz")
+                return [ChatMemberAdministrator(
+                    user=admin, can_be_edited=False, is_anonymous=False, can_manage_chat=True,
+                    can_delete_messages=True, can_manage_video_chats=True, can_restrict_members=True,
+                    can_promote_members=True, can_change_info=True, can_invite_users=True,
+                    can_post_stories=True, can_edit_stories=True, can_delete_stories=True,
+                )]
+            if isinstance(method, (SendMessage, EditMessageText)):
+                self._message_id += 1
+                return Message(
+                    message_id=self._message_id,
+                    date=datetime.now(),
+                    chat=Chat(id=method.chat_id or 0, type="supergroup"),
+                    text=method.text,
+                ).as_(bot)
+            if isinstance(method, SendChatAction):
+                return True
+            return True
+
+        async def stream_content(self, *args, **kwargs):
+            yield b""
+
+        async def close(self) -> None:
+            pass
+
+    return StubSession()
+
+
+# ---------------------- Korpus va update'lar ----------------------
+def load_corpus(path: Optional[str]) -> List[str]:
+    if not path:
+        from benchmarks.bench_triggers import SAMPLES
+        return list(SAMPLES)
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            text = row.get("text") or " ".join(filter(None, [row.get("title"), row.get("body")]))
+            if text:
+                texts.append(text[:1000])
+    return texts
+
+
+NOISY_CHAT_ID = -1000000000000
+
+
+def make_update(
+        update_id: int, text: str, rnd: random.Random, groups: int, users: int, bot_username: str,
+        noisy_share: float = 0.0,
+) -> dict:
+    # noisy_share — update'larning shu ulushi bitta "portlagan" guruhga (NOISY_CHAT_ID) keladi
+    if rnd.random() < noisy_share:
+        chat_id = NOISY_CHAT_ID
+    else:
+        chat_id = NOISY_CHAT_ID - rnd.randrange(groups)
+    user_id = 10_000 + rnd.randrange(users)
+    text = text.replace("{bot}", bot_username)
+    roll = rnd.random()
+    if roll < 0.1:
+        text = f"@{bot_username} {text}"
+    elif roll < 0.15:
+        text = f"/ask {text}"
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": chat_id, "type": "supergroup", "title": "Load test"},
+        "from": {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"},
+        "text": text,
+    }
+    if rnd.random() < 0.05:
+        message["reply_to_message"] = {
+            "message_id": update_id - 1,
+            "date": int(time.time()),
+            "chat": message["chat"],
+            "from": {"id": 42, "is_bot": True, "first_name": "Bot", "username": bot_username},
+            "text": "oldingi javob",
+        }
+    return {"update_id": update_id, "message": message}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q * (len(values) - 1))))
+    return values[index]
+
+
+# ---------------------- Asosiy sikl ----------------------
+async def run(args) -> None:
+    rnd = random.Random(args.seed)
+    oai_port = free_port()
+    oai_runner, oai_stats = await start_stub_openai(oai_port, args.oai_latency, args.oai_429, rnd)
+
+    # Modullar import qilinishidan oldin: OpenAI klienti stub serverga qaraydi
+    os.environ["OPENAI_API_KEY"] = "stub"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{oai_port}/v1"
+    if args.no_throttle:
+        os.environ.update(USER_RATE_WINDOW="0", GROUP_COOLDOWN_MIN="0", GROUP_COOLDOWN_MAX="0")
+    if args.stream:
+        os.environ["OPENAI_STREAM"] = "1"
+        os.environ["STREAM_EDIT_INTERVAL"] = "0"
+
+    from aiogram import Bot
+    from aiogram.types import Update
+
+    from bot import create_bot, create_dispatcher
+    from config import Config, Miscellaneous, OpenAIConfig, TgBot
+    from handlers.users import echo
+
+    config = Config(
+        tg_bot=TgBot(token="123456:STUB", admin_ids=[], use_redis=False),
+        misc=Miscellaneous(),
+        openai=OpenAIConfig(api_key="stub"),
+    )
+    session = make_stub_session(args.tg_latency)
+    if args.no_send_scheduler:
+        bot = Bot(token=config.tg_bot.token, session=session)
+    else:
+        bot = create_bot(config, session=session)
+    dp = create_dispatcher(config)
+    # Router startup hooklari: konteyner (OpenAI klienti) va fon vazifalari
+    await dp.emit_startup(bot=bot, **dp.workflow_data)
+
+    corpus = load_corpus(args.corpus)
+    updates = [
+        Update.model_validate(
+            make_update(i + 1, rnd.choice(corpus), rnd, args.groups, args.users, echo.BOT_USERNAME, args.noisy_share),
+            context={"bot": bot},
+        )
+        for i in range(args.updates)
+    ]
+
+    latencies: List[float] = []
+    quiet_latencies: List[float] = []
+    errors = 0
+
+    async def handle(update: Update) -> None:
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        if update.message.chat.id != NOISY_CHAT_ID:
+            quiet_latencies.append(latencies[-1])
+
+    tracemalloc.start()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    mem_before, _ = tracemalloc.get_traced_memory()
+
+    tasks = []
+    interval = 1 / args.rate if args.rate > 0 else 0
+    started = time.perf_counter()
+    for i, update in enumerate(updates):
+        # Ochiq sikl: update'lar javobni kutmasdan belgilangan tezlikda keladi
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(handle(update)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    mem_after, mem_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+    await dp["container"].close()
+    await oai_runner.cleanup()
+
+    print(f"updates:        {len(updates)} ({errors} xato)")
+    print(f"elapsed:        {elapsed:.2f}s")
+    print(f"throughput:     {len(updates) / elapsed:,.1f} update/s")
+    print(f"latency p50:    {percentile(latencies, 0.5) * 1000:.1f} ms")
+    print(f"latency p99:    {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print(f"latency mean:   {statistics.fmean(latencies) * 1000:.1f} ms")
+    if args.noisy_share:
+        print(f"quiet p99:      {percentile(quiet_latencies, 0.99) * 1000:.1f} ms (shovqinli guruhsiz)")
+    print(f"memory growth:  {(mem_after - mem_before) / 1024:.1f} KiB (peak {mem_peak / 1024:.1f} KiB)")
+    print(f"max RSS:        {rss_before / 1024:.1f} -> {rss_after / 1024:.1f} MiB")
+    print(f"openai stub:    {oai_stats['requests']} so'rov, {oai_stats['throttled']} ta 429")
+    print(f"telegram stub:  {session.calls}")
+    if not args.no_send_scheduler:
+        print(f"send scheduler: {session.middleware[0].stats()}")
+    print(f"openai limiter: {echo.OAI_LIMITER.stats()}")
+    print(f"prompt keshi:   {echo.PROMPTS.stats()}")
+    print(f"chat kutishlari: {echo.OAI_LIMITER.chat_stats(top=3)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="JSONL fayl: har qatorda 'text' yoki 'title'/'body'")
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="update/s (0 — cheklovsiz)")
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--oai-latency", type=float, default=0.3, help="stub OpenAI o'rtacha kechikishi (s)")
+    parser.add_argument("--oai-429", type=float, default=0.0, help="429 qaytarish ehtimoli")
+    parser.add_argument("--tg-latency", type=float, default=0.0, help="stub Bot API kechikishi (s)")
+    parser.add_argument("--stream", action="store_true", help="OPENAI_STREAM rejimini sinash")
+    parser.add_argument("--no-throttle", action="store_true", help="foydalanuvchi/guruh cheklovlarini o'chirish")
+    parser.add_argument("--no-send-scheduler", action="store_true", help="Bot API yuborishlarini navbatsiz chaqirish")
+    parser.add_argument("--noisy-share", type=float, default=0.0, help="bitta guruhga keladigan update'lar ulushi")
+    parser.add_argument("--seed", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,49 @@ from aiogram.client.default import DefaultBotProperties
 import betterlogging as bl
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
-from aiogram.fsm.storage.redis import RedisStorage, DefaultKeyBuilder
 
 from config import load_config, Config
-from handlers.users import routers_list
+from infrastructure.container import AppContainer
 from middlewares.config import ConfigMiddleware
+from middlewares.lifecycle import LifecycleMiddleware
+from middlewares.metrics import MetricsMiddleware, HandlerTimingMiddleware
 
 from services import broadcaster
+from services.message_log import MessageLogSink, install_message_log
+from services.metrics import METRICS, start_metrics_server
+from services.send_scheduler import SendScheduler
 
 
-async def on_startup(bot: Bot, admin_ids: list[int]):
-    await broadcaster.broadcast(bot, admin_ids, "Bot ishga tushdi ")
+async def on_startup(bot: Bot, admin_ids: list[int], session_pool=None):
+    # Baza bo'lsa botni bloklagan adminlar ham nofaol deb belgilanadi
+    on_blocked = broadcaster.deactivate_users(session_pool) if session_pool is not None else None
+    await broadcaster.broadcast(bot, admin_ids, "Bot ishga tushdi ", on_blocked=on_blocked)
 
 
-def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=None):
+def create_bot(config: Config, session=None) -> Bot:
+    """
+    Create the bot with the outbound send scheduler installed on its session,
+    so every Bot API call (replies, chat actions, broadcasts) goes through one queue.
+    Shared by polling mode (this module) and webhook mode (infrastructure/api/app.py).
+
+    :param config: The configuration object from the loaded configuration.
+    :param session: Optional custom aiogram session (e.g. a stub in benchmarks).
+    :return: Bot instance.
+    """
+    kwargs = {"session": session} if session is not None else {}
+    bot = Bot(token=config.tg_bot.token, default=DefaultBotProperties(parse_mode="HTML"), **kwargs)
+    scheduler = SendScheduler(
+        rate=config.send.rate,
+        chat_interval=config.send.chat_interval,
+        action_ttl=config.send.action_ttl,
+        max_retries=config.send.max_retries,
+    )
+    bot.session.middleware(scheduler)
+    METRICS.gauge("send_scheduler", "Chiquvchi Bot API navbati: kutayotganlar, tashlangan chat action, flood", scheduler.stats)
+    return bot
+
+
+def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=None, user_writer=None, lifecycle=None):
     """
     Register global middlewares for the given dispatcher.
     Global middlewares here are the ones that are applied to all the handlers (you specify the type of update)
@@ -27,17 +56,32 @@ def register_global_middlewares(dp: Dispatcher, config: Config, session_pool=Non
     :type dp: Dispatcher
     :param config: The configuration object from the loaded configuration.
     :param session_pool: Optional session pool object for the database using SQLAlchemy.
+    :param user_writer: Optional write-behind buffer, so users are upserted in batches instead of per update.
+    :param lifecycle: Optional lifecycle tracker; every update is counted as in-flight and rejected while draining.
     :return: None
     """
+    if lifecycle is not None:
+        # Update darajasida: barcha turdagi update'lar (message, callback, chat_member) hisobga olinadi
+        dp.update.outer_middleware(LifecycleMiddleware(lifecycle))
+
     middleware_types = [
+        MetricsMiddleware(),
         ConfigMiddleware(config),
-        # DatabaseMiddleware(session_pool),
     ]
+    if session_pool is not None:
+        # sqlalchemy faqat baza yoqilganda import qilinadi
+        from middlewares.database import DatabaseMiddleware
+
+        middleware_types.append(DatabaseMiddleware(session_pool, user_writer))
 
     for middleware_type in middleware_types:
         dp.message.outer_middleware(middleware_type)
         dp.callback_query.outer_middleware(middleware_type)
 
+    # Inner middleware faqat handler vaqtini o'lchaydi — filtrlar vaqti shundan ajratiladi
+    dp.message.middleware(HandlerTimingMiddleware())
+    dp.callback_query.middleware(HandlerTimingMiddleware())
+
 
 def setup_logging():
     """
@@ -73,34 +117,133 @@ def get_storage(config):
         config (Config): The configuration object.
 
     Returns:
-        Storage: The storage object based on the configuration.
+        Storage: The storage object based on the configuration. With Redis enabled this is a
+        sharded storage with a per-process read-through cache in front of it.
 
     """
     if config.tg_bot.use_redis:
-        return RedisStorage.from_url(
-            config.redis.dsn(),
+        # redis faqat yoqilganda import qilinadi
+        from aiogram.fsm.storage.base import DefaultKeyBuilder
+
+        from infrastructure.fsm_storage import ShardedRedisStorage
+
+        storage = ShardedRedisStorage.from_urls(
+            config.redis.fsm_dsns(),
             key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True),
+            cache_size=config.redis.fsm_cache_size,
+            cache_ttl=config.redis.fsm_cache_ttl,
         )
+        METRICS.gauge("fsm_storage", "FSM storage keshi: hit/miss, invalidatsiyalar, shardlar", storage.stats)
+        return storage
     else:
         return MemoryStorage()
 
 
+def create_dispatcher(config: Config, session_pool=None, user_writer=None, container: AppContainer = None) -> Dispatcher:
+    """
+    Build the dispatcher with storage, routers and global middlewares.
+    Shared by polling mode (this module) and webhook mode (infrastructure/api/app.py).
+
+    Routers are imported here, after the configuration (and .env) is loaded, because
+    handler modules read their settings from the environment at import time.
+    The dependency container is passed to startup hooks and handlers via workflow data.
+    On shutdown the dispatcher first drains in-flight updates, then router shutdown hooks run.
+    """
+    from handlers.users import routers_list
+
+    container = container or AppContainer(config)
+    dp = Dispatcher(storage=get_storage(config))
+    dp.include_routers(*routers_list)
+    register_global_middlewares(dp, config, session_pool, user_writer, lifecycle=container.lifecycle)
+    dp["container"] = container
+    # Dispatcher'ning o'z shutdown handlerlari routerlarnikidan oldin chaqiriladi
+    dp.shutdown.register(container.lifecycle.drain)
+    METRICS.gauge("lifecycle", "Bajarilayotgan va to'xtatishda rad etilgan update'lar", container.lifecycle.stats)
+    return dp
+
+
+def create_db_writers(config: Config, container: AppContainer):
+    """
+    Build the batched DB writers enabled in the config: the user write-behind buffer
+    (DB_TRACK_USERS) and the message log sink (DB_LOG_MESSAGES).
+    They are started later with ``start_db_writers``, inside the running event loop.
+    Shared by polling mode (this module) and webhook mode (infrastructure/api/app.py).
+
+    :return: (session_pool, user_writer, message_log); disabled parts are None.
+    """
+    session_pool = None
+    user_writer = None
+    message_log = None
+    if config.db and (config.db.track_users or config.db.log_messages):
+        session_pool = container.session_pool
+    if session_pool is not None and config.db.track_users:
+        from services.user_writer import UserWriteBehind
+
+        user_writer = UserWriteBehind(
+            session_pool,
+            flush_interval=config.db.user_flush_interval_ms / 1000,
+            max_batch=config.db.user_flush_batch,
+            max_pending=config.db.user_pending_max,
+        )
+    if session_pool is not None and config.db.log_messages:
+        message_log = MessageLogSink(
+            session_pool,
+            flush_interval=config.db.message_flush_interval_ms / 1000,
+            max_queue=config.db.message_queue_size,
+            spill_path=config.db.message_spill_path,
+        )
+        METRICS.gauge("message_log", "Savol-javob jurnali: yozilgan/faylga tashlangan/tashlab yuborilgan", message_log.stats)
+    return session_pool, user_writer, message_log
+
+
+def start_db_writers(user_writer=None, message_log=None) -> None:
+    if user_writer is not None:
+        user_writer.start()
+    if message_log is not None:
+        message_log.start()
+        install_message_log(message_log)
+
+
+async def stop_db_writers(user_writer=None, message_log=None) -> None:
+    """Flush buffered rows; must run before the DB pool is closed."""
+    if user_writer is not None:
+        await user_writer.stop()
+    if message_log is not None:
+        install_message_log(None)
+        await message_log.stop()
+
+
 async def main():
     setup_logging()
 
     config = load_config(".env")
-    storage = get_storage(config)
 
+    bot = create_bot(config)
+    container = AppContainer(config)
 
-    bot = Bot(token=config.tg_bot.token, default=DefaultBotProperties(parse_mode="HTML"))
-    dp = Dispatcher(storage=storage)
+    session_pool, user_writer, message_log = create_db_writers(config, container)
+    start_db_writers(user_writer, message_log)
 
-    dp.include_routers(*routers_list)
+    # Foydalanuvchilarni kuzatish o'chiq bo'lsa, pul faqat jurnal uchun — middleware'ga berilmaydi
+    dp = create_dispatcher(config, session_pool if user_writer is not None else None, user_writer, container=container)
 
-    register_global_middlewares(dp, config)
+    metrics_runner = None
+    if config.misc.metrics_port:
+        metrics_runner = await start_metrics_server(port=config.misc.metrics_port)
 
-    await on_startup(bot, config.tg_bot.admin_ids)
-    await dp.start_polling(bot)
+    try:
+        await on_startup(bot, config.tg_bot.admin_ids, session_pool)
+        await dp.start_polling(bot)
+    finally:
+        # Polling to'xtaganda drain allaqachon bajarilgan (dp.shutdown) — bu yerda hisobot qaytadi
+        report = await container.lifecycle.drain()
+        # Bufferdagi yozuvlar pullar yopilishidan oldin bazaga tushiriladi
+        await stop_db_writers(user_writer, message_log)
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await container.close()
+        await dp.storage.close()
+        logging.info(f"Bot to'xtatildi: {report}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 from environs import Env
 import logging
 
@@ -11,6 +11,15 @@ class DbConfig:
     user: str
     database: str
     port: int = 5432
+    track_users: bool = False
+    user_flush_interval_ms: int = 500
+    user_flush_batch: int = 500
+    user_pending_max: int = 20_000
+    log_messages: bool = False
+    message_flush_interval_ms: int = 1000
+    message_queue_size: int = 10_000
+    message_spill_path: Optional[str] = "spill/messages.jsonl"
+    group_settings: bool = False
 
     def construct_sqlalchemy_url(self, driver="asyncpg", host=None, port=None) -> str:
         """
@@ -49,8 +58,26 @@ class DbConfig:
             user = env.str("POSTGRES_USER", default="postgres")
             database = env.str("POSTGRES_DB", default="mydb")
             port = env.int("DB_PORT", default=5432)
+            track_users = env.bool("DB_TRACK_USERS", default=False)
+            user_flush_interval_ms = env.int("USER_FLUSH_INTERVAL_MS", default=500)
+            user_flush_batch = env.int("USER_FLUSH_BATCH", default=500)
+            user_pending_max = env.int("USER_PENDING_MAX", default=20_000)
+            log_messages = env.bool("DB_LOG_MESSAGES", default=False)
+            message_flush_interval_ms = env.int("MESSAGE_FLUSH_INTERVAL_MS", default=1000)
+            message_queue_size = env.int("MESSAGE_QUEUE_SIZE", default=10_000)
+            message_spill_path = env.str("MESSAGE_SPILL_PATH", default="spill/messages.jsonl") or None
+            group_settings = env.bool("DB_GROUP_SETTINGS", default=False)
             return DbConfig(
-                host=host, password=password, user=user, database=database, port=port
+                host=host, password=password, user=user, database=database, port=port,
+                track_users=track_users,
+                user_flush_interval_ms=user_flush_interval_ms,
+                user_flush_batch=user_flush_batch,
+                user_pending_max=user_pending_max,
+                log_messages=log_messages,
+                message_flush_interval_ms=message_flush_interval_ms,
+                message_queue_size=message_queue_size,
+                message_spill_path=message_spill_path,
+                group_settings=group_settings,
             )
         except Exception as e:
             logging.error(f"Ma'lumotlar bazasi sozlamalarini yuklashda xato: {e}")
@@ -85,6 +112,10 @@ class RedisConfig:
     redis_pass: Optional[str]
     redis_port: Optional[int]
     redis_host: Optional[str]
+    # FSM uchun shardlar (DSN ro'yxati); bo'sh bo'lsa — yagona ``dsn()``
+    fsm_urls: List[str] = field(default_factory=list)
+    fsm_cache_size: int = 10_000
+    fsm_cache_ttl: float = 60.0
 
     def dsn(self) -> str:
         """
@@ -100,6 +131,9 @@ class RedisConfig:
             logging.error(f"Redis DSN yaratishda xato: {e}")
             raise
 
+    def fsm_dsns(self) -> List[str]:
+        return self.fsm_urls or [self.dsn()]
+
     @staticmethod
     def from_env(env: Env):
         """
@@ -110,16 +144,115 @@ class RedisConfig:
             redis_port = env.int("REDIS_PORT", default=6379)
             redis_host = env.str("REDIS_HOST", default="localhost")
             return RedisConfig(
-                redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host
+                redis_pass=redis_pass, redis_port=redis_port, redis_host=redis_host,
+                fsm_urls=env.list("REDIS_FSM_URLS", default=[]),
+                fsm_cache_size=env.int("FSM_CACHE_SIZE", 10_000),
+                fsm_cache_ttl=env.float("FSM_CACHE_TTL", 60.0),
             )
         except Exception as e:
             logging.error(f"Redis sozlamalarini yuklashda xato: {e}")
             raise
 
 
+@dataclass
+class WebhookConfig:
+    url: Optional[str] = None
+    secret: Optional[str] = None
+    path: str = "/webhook"
+    workers: int = 4
+    queue_size: int = 1000
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        .env fayldan WebhookConfig obyektini yaratadi.
+        """
+        try:
+            url = env.str("WEBHOOK_URL", default=None)
+            secret = env.str("WEBHOOK_SECRET", default=None)
+            path = env.str("WEBHOOK_PATH", default="/webhook")
+            workers = env.int("WEBHOOK_WORKERS", default=4)
+            queue_size = env.int("WEBHOOK_QUEUE_SIZE", default=1000)
+            return WebhookConfig(
+                url=url, secret=secret, path=path, workers=workers, queue_size=queue_size
+            )
+        except Exception as e:
+            logging.error(f"Webhook sozlamalarini yuklashda xato: {e}")
+            raise
+
+
+@dataclass
+class HttpPoolConfig:
+    limit: int = 100
+    limit_per_host: int = 20
+    keepalive_timeout: float = 30.0
+    dns_ttl: int = 300
+    # HTTP/2 ``h2`` paketini talab qiladi (requirements.txt'da yo'q) — shuning uchun ixtiyoriy
+    http2: bool = False
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        .env fayldan tashqi HTTP ulanishlar puli sozlamalarini o'qiydi.
+        """
+        try:
+            limit = env.int("HTTP_POOL_LIMIT", default=100)
+            limit_per_host = env.int("HTTP_POOL_PER_HOST", default=20)
+            keepalive_timeout = env.float("HTTP_KEEPALIVE", default=30.0)
+            dns_ttl = env.int("HTTP_DNS_TTL", default=300)
+            http2 = env.bool("HTTP2", default=False)
+            return HttpPoolConfig(
+                limit=limit, limit_per_host=limit_per_host, keepalive_timeout=keepalive_timeout,
+                dns_ttl=dns_ttl, http2=http2,
+            )
+        except Exception as e:
+            logging.error(f"HTTP pul sozlamalarini yuklashda xato: {e}")
+            raise
+
+
+@dataclass
+class SendConfig:
+    rate: float = 25
+    chat_interval: float = 1.0
+    action_ttl: float = 4.0
+    max_retries: int = 2
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        .env fayldan chiquvchi Bot API so'rovlari rejalashtiruvchisi sozlamalarini o'qiydi.
+        """
+        try:
+            rate = env.float("SEND_RATE", default=25)
+            chat_interval = env.float("SEND_CHAT_INTERVAL", default=1.0)
+            action_ttl = env.float("CHAT_ACTION_TTL", default=4.0)
+            max_retries = env.int("SEND_MAX_RETRIES", default=2)
+            return SendConfig(
+                rate=rate, chat_interval=chat_interval, action_ttl=action_ttl, max_retries=max_retries,
+            )
+        except Exception as e:
+            logging.error(f"Yuborish rejalashtiruvchisi sozlamalarini yuklashda xato: {e}")
+            raise
+
+
+@dataclass
+class OpenAIConfig:
+    api_key: Optional[str] = None
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        .env fayldan OpenAI sozlamalarini o'qiydi (kalit tekshiruvi klient yaratilganda).
+        """
+        return OpenAIConfig(api_key=env.str("OPENAI_API_KEY", default=None))
+
+
 @dataclass
 class Miscellaneous:
     other_params: str = None
+    metrics_port: Optional[int] = None
+    # To'xtatishda bajarilayotgan update'larni kutish muddati (soniya)
+    drain_timeout: float = 25.0
 
 
 @dataclass
@@ -128,6 +261,10 @@ class Config:
     misc: Miscellaneous
     db: Optional[DbConfig] = None
     redis: Optional[RedisConfig] = None
+    webhook: Optional[WebhookConfig] = None
+    http: HttpPoolConfig = field(default_factory=HttpPoolConfig)
+    send: SendConfig = field(default_factory=SendConfig)
+    openai: OpenAIConfig = field(default_factory=OpenAIConfig)
 
 
 def load_config(path: str = None) -> Config:
@@ -140,11 +277,19 @@ def load_config(path: str = None) -> Config:
     try:
         env = Env()
         env.read_env(path)
+        tg_bot = TgBot.from_env(env)
         config = Config(
-            tg_bot=TgBot.from_env(env),
-            misc=Miscellaneous(),
+            tg_bot=tg_bot,
+            misc=Miscellaneous(
+                metrics_port=env.int("METRICS_PORT", default=None),
+                drain_timeout=env.float("SHUTDOWN_DRAIN_TIMEOUT", 25.0),
+            ),
             db=DbConfig.from_env(env),  # Agar ma'lumotlar bazasi ishlatilsa
-            # redis=RedisConfig.from_env(env),  # Agar Redis ishlatilsa
+            redis=RedisConfig.from_env(env) if tg_bot.use_redis else None,  # USE_REDIS — FSM storage uchun
+            webhook=WebhookConfig.from_env(env),
+            http=HttpPoolConfig.from_env(env),
+            send=SendConfig.from_env(env),
+            openai=OpenAIConfig.from_env(env),
         )
         logging.info("Konfiguratsiya muvaffaqiyatli yuklandi")
         return config
@@ -11,45 +11,80 @@
 #  - Kontekst xotira (har chat uchun oxirgi 8 xabar)
 #  - /reset (kontekstni tozalash), /tip (kunlik bitta maslahat), /xulosa (3 punktli xulosa)
 #  - Retry + exponential backoff (429/vaqtinchalik xatolar uchun)
+#  - "X nima?" tipidagi savollarga lokal FAQ bazasidan (data/faq.json) OpenAI'siz javob
 #  - Javoblar doimo juda qisqa: 1–2 jumla (eng ko'pi 3)
+#
+# Import yon ta'sirsiz: OpenAI klienti, FAQ indeksi, holat (STATE/MEMORY) va javob keshi startup
+# hookida (yoki birinchi murojaatda) yaratiladi. Env qiymatlari import paytida o'qiladi — modul
+# load_config(".env") dan keyin (create_dispatcher ichida) import qilinadi.
+
+from __future__ import annotations
 
 import os
 import re
 import asyncio
+import logging
 import random
 import time
-from collections import defaultdict, deque
-from typing import Deque, Dict, List, Tuple, Optional
+from typing import TYPE_CHECKING, List, Tuple, Optional
 
 from aiogram import types, Router, F
 from aiogram.filters import StateFilter, Command
 from aiogram.fsm.context import FSMContext
 from aiogram.enums import ChatAction, ChatType
-from dotenv import load_dotenv
+from environs import Env
 
-# OpenAI (async) SDK
-from openai import AsyncOpenAI
-from openai.types.chat import ChatCompletionMessageParam
+from config import RedisConfig
+from infrastructure.container import AppContainer
+from services.admin_cache import AdminCache
+from services.answer_cache import (
+    AnswerCache, MemoryAnswerBackend, RedisAnswerBackend, make_cache_key, normalize_prompt,
+)
+from services.coalesce import SingleFlight
+from services.group_policy import GroupPolicy, GroupPolicyCache
+from services.heat import HeatDetector
+from services.local_answers import LocalAnswerIndex, load_faq
+from services.fair_queue import QueueDropped
+from services.memory import ConversationMemory
+from services.message_log import MessageRecord, log_message
+from services.metrics import ANSWER_TIER_SECONDS, METRICS, STAGE_SECONDS, TRIGGERS_TOTAL
+from services.oai_limiter import (
+    AdaptiveLimiter, PRIORITY_AUTO, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, is_rate_limited, retry_after_seconds,
+)
+from services.prompt_builder import PromptBuilder
+from services.state import MemoryStateBackend, RedisStateBackend, StateBackend
+from services.stream_reply import StreamingReply
+from services.triggers import TriggerClassifier, TriggerFeatures
 
-load_dotenv()
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from openai.types import CompletionUsage
+    from openai.types.chat import ChatCompletionMessageParam
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 BOT_USERNAME = os.getenv("BOT_USERNAME", "chaqqonaibot")  # masalan: 'guruh_yordamchi_bot'
 USTOZ_USERNAME = os.getenv("USTOZ_USERNAME", "davronovsimple")  # '@' siz
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY .env da topilmadi")
+echo_router = Router()
 
-oai = AsyncOpenAI(api_key=OPENAI_API_KEY)
+# Bog'liqliklar konteyneri startup hookida dispatcher workflow_data'dan olinadi
+_container: Optional[AppContainer] = None
 
-echo_router = Router()
+def openai_client() -> AsyncOpenAI:
+    if _container is None:
+        raise RuntimeError("echo_router startup hooki ishga tushmagan: AppContainer berilmagan")
+    return _container.openai
 
 # ---------------------- Konfiguratsiya ----------------------
-ALLOWED_TOPICS_RE = re.compile(
-    r"\b(python|django|fastapi|aiogram|javascript|typescript|react|tailwind|html|css|sass|less|\bjs\b|ts|node|npm|yarn|vite|webpack|rollup|jest|pytest|unittest|docker|compose|linux|bash|zsh|git|github|gitlab|ci/cd|postgres|mysql|sqlite|redis|celery|rabbitmq|nginx|gunicorn|uvicorn|daphne|supervisor|systemd|selenium|playwright|rest|graphql|drf|jwt|oauth|websocket|http|api|regex|typing|oop|etl|pandas|numpy|matplotlib|plotly|k8s|kubernetes|helm|terraform)\b",
-    re.I,
+ALLOWED_TOPICS = (
+    "python", "django", "fastapi", "aiogram", "javascript", "typescript", "react", "tailwind", "html", "css",
+    "sass", "less", "js", "ts", "node", "npm", "yarn", "vite", "webpack", "rollup", "jest", "pytest", "unittest",
+    "docker", "compose", "linux", "bash", "zsh", "git", "github", "gitlab", "ci/cd", "postgres", "mysql", "sqlite",
+    "redis", "celery", "rabbitmq", "nginx", "gunicorn", "uvicorn", "daphne", "supervisor", "systemd", "selenium",
+    "playwright", "rest", "graphql", "drf", "jwt", "oauth", "websocket", "http", "api", "regex", "typing", "oop",
+    "etl", "pandas", "numpy", "matplotlib", "plotly", "k8s", "kubernetes", "helm", "terraform",
 )
+ALLOWED_TOPICS_RE = re.compile(r"\b(" + "|".join(map(re.escape, ALLOWED_TOPICS)) + r")\b", re.I)
 HEATED_MARKERS = ("yo'q", "noto'g'ri", "ishlamayapti", "xato", "error", "qanday", "nega", "qayerda")
 
 # Rate limits
@@ -57,16 +92,132 @@ USER_RATE_WINDOW = int(os.getenv("USER_RATE_WINDOW", 20))   # s
 GROUP_COOLDOWN_MIN = int(os.getenv("GROUP_COOLDOWN_MIN", 45))
 GROUP_COOLDOWN_MAX = int(os.getenv("GROUP_COOLDOWN_MAX", 90))
 
-# Parallel OpenAI so'rovlarini cheklash
-OAI_SEMAPHORE = asyncio.Semaphore(int(os.getenv("OAI_PARALLEL", 4)))
+# Streaming rejimi: birinchi jumla darrov, keyin xabar bosqichma-bosqich tahrirlanadi
+OPENAI_STREAM = os.getenv("OPENAI_STREAM", "0").lower() in ("1", "true", "yes")
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", 1.5))  # s
+
+# Parallel OpenAI so'rovlarini cheklash: AIMD — sog'lom paytda oshadi, 429 da keskin kamayadi
+OAI_LIMITER = AdaptiveLimiter(
+    initial=int(os.getenv("OAI_PARALLEL", 4)),
+    min_limit=int(os.getenv("OAI_PARALLEL_MIN", 1)),
+    max_limit=int(os.getenv("OAI_PARALLEL_MAX", 16)),
+    latency_target=float(os.getenv("OAI_LATENCY_TARGET", 6.0)),
+    # Chatlar orasida adolatli navbat: har aylanishda chatga ~bitta to'liq so'rov (tokenlarda)
+    quantum=float(os.getenv("OAI_FAIR_QUANTUM", 1500)),
+    max_chat_depth=int(os.getenv("OAI_CHAT_QUEUE_DEPTH", 8)),
+)
 
-# Xotira: har chat uchun oxirgi 8 xabar
-HISTORY: Dict[int, Deque[ChatCompletionMessageParam]] = defaultdict(lambda: deque(maxlen=8))
+# Xotira: token byudjeti bo'yicha qisqartiriladi, eski qismi xulosaga yig'iladi.
+# HISTORY_LIMIT — xabarlar soni bo'yicha qo'shimcha "xavfsizlik" chegarasi (undan chiqqanlar
+# ham xulosaga qo'shiladi).
+HISTORY_LIMIT = int(os.getenv("HISTORY_LIMIT", 40))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 1200))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", 200))
+
+# Takroriy savollar uchun javob keshi: ANSWER_CACHE=memory|redis|off
+def build_answer_cache() -> Optional[AnswerCache]:
+    backend_name = os.getenv("ANSWER_CACHE", "memory").lower()
+    if backend_name in ("", "0", "off", "none"):
+        return None
+    if backend_name == "redis":
+        backend = RedisAnswerBackend(RedisConfig.from_env(Env()).dsn())
+    else:
+        backend = MemoryAnswerBackend(max_bytes=int(os.getenv("ANSWER_CACHE_MAX_BYTES", 4 * 1024 * 1024)))
+    return AnswerCache(backend, ttl=float(os.getenv("ANSWER_CACHE_TTL", 6 * 3600)))
+
+# Startup hookida quriladi (Redis klientlari import paytida yaratilmaydi); None — kesh o'chiq
+ANSWER_CACHE: Optional[AnswerCache] = None
+
+# Kontekst, foydalanuvchi/guruh throttling holati: STATE_BACKEND=memory|redis
+# (redis — bir nechta bot nusxasi uchun umumiy holat)
+def build_state_backend() -> StateBackend:
+    if os.getenv("STATE_BACKEND", "memory").lower() == "redis":
+        return RedisStateBackend(RedisConfig.from_env(Env()).dsn(), history_limit=HISTORY_LIMIT)
+    return MemoryStateBackend(
+        history_limit=HISTORY_LIMIT,
+        max_chats=int(os.getenv("STATE_MAX_CHATS", 10_000)),
+        max_users=int(os.getenv("STATE_MAX_USERS", 100_000)),
+    )
+
+# Startup hookida quriladi (start_background)
+STATE: Optional[StateBackend] = None
+
+# "Qizigan bahs" detektori: HEAT_WINDOW soniya ichida kamida HEAT_MIN_PARTICIPANTS kishi va
+# HEAT_MIN_MESSAGES xabar (yoki markerlar zichligi >= HEAT_MARKER_DENSITY) bo'lsa
+HEAT = HeatDetector(
+    window=float(os.getenv("HEAT_WINDOW", 120)),
+    min_messages=int(os.getenv("HEAT_MIN_MESSAGES", 4)),
+    min_participants=int(os.getenv("HEAT_MIN_PARTICIPANTS", 2)),
+    marker_density=float(os.getenv("HEAT_MARKER_DENSITY", 0.5)),
+)
+
+SUMMARY_PROMPT = (
+    "Siz suhbat xulosasini yangilaysiz. Oldingi xulosa va yangi xabarlardan 2–3 jumlalik "
+    "juda qisqa xulosa yozing: muhokama qilingan muammolar va qabul qilingan yechimlar. Kod yozmang."
+)
+
+async def summarize_turns(summary: str, turns: List[ChatCompletionMessageParam]) -> str:
+    """Kontekstdan chiqqan xabarlarni yig'ma xulosaga qo'shadi (fon vazifasida chaqiriladi)."""
+    dialog = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    async with OAI_LIMITER.slot(PRIORITY_BACKGROUND):
+        resp = await openai_client().chat.completions.create(
+            model=OPENAI_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Oldingi xulosa: {summary or '-'}\n\nYangi xabarlar:\n{dialog}"},
+            ],
+            temperature=0,
+            max_tokens=160,
+        )
+    return resp.choices[0].message.content or summary
+
+def build_memory(state: StateBackend) -> ConversationMemory:
+    return ConversationMemory(
+        state,
+        token_budget=HISTORY_TOKEN_BUDGET,
+        summary_budget=SUMMARY_TOKEN_BUDGET,
+        summarizer=summarize_turns,
+    )
+
+# STATE bilan birga startup hookida quriladi
+MEMORY: Optional[ConversationMemory] = None
+
+# So'rov xabarlari: statik prefiks birinchi va o'zgarmas — provayder prompt keshi ishlaydi
+PROMPTS = PromptBuilder()
+
+# Guruh adminlari keshi (har xabarda get_chat_administrators chaqirmaslik uchun)
+ADMIN_CACHE = AdminCache(ttl=float(os.getenv("ADMIN_CACHE_TTL", 300)))
+
+# OpenAI'dan oldingi lokal daraja: FAQ bilimlar bazasi (ishonch past bo'lsa — OpenAI)
+FAQ_PATH = os.getenv("FAQ_PATH", "data/faq.json")
+FAQ_THRESHOLD = float(os.getenv("FAQ_THRESHOLD", 0.75))
+_local_answers: Optional[LocalAnswerIndex] = None
+
+def local_answers() -> LocalAnswerIndex:
+    """FAQ indeksi birinchi murojaatda (odatda startup hookida) quriladi."""
+    global _local_answers
+    if _local_answers is None:
+        _local_answers = LocalAnswerIndex(load_faq(FAQ_PATH), threshold=FAQ_THRESHOLD)
+    return _local_answers
+
+# Bir chatda bir vaqtda berilgan bir xil savollar bitta OpenAI chaqiruviga birlashtiriladi
+ANSWER_FLIGHT = SingleFlight()
+
+# /metrics da ko'rinadigan holat ko'rsatkichlari
+METRICS.gauge("openai_limiter", "OpenAI limiter holati (limit, in_flight, navbat)", OAI_LIMITER.stats)
+# Chat bo'yicha adolatli navbat (DRR): faqat eng uzoq kutgan chatlar — label soni cheklangan
+METRICS.gauge("openai_chat_queue_depth", "OpenAI navbatida kutayotgan so'rovlar (chat bo'yicha)",
+              lambda: OAI_LIMITER.chat_metric("queue_depth"), label="chat")
+METRICS.gauge("openai_chat_served", "OpenAI slotini olgan so'rovlar (chat bo'yicha)",
+              lambda: OAI_LIMITER.chat_metric("served"), label="chat")
+METRICS.gauge("openai_chat_dropped", "Chat navbati to'lgani uchun tashlangan so'rovlar (chat bo'yicha)",
+              lambda: OAI_LIMITER.chat_metric("dropped"), label="chat")
+METRICS.gauge("admin_cache", "Adminlar keshi statistikasi", ADMIN_CACHE.stats)
+METRICS.gauge("local_answers", "Lokal FAQ darajasi: so'rovlar va topilganlar", lambda: local_answers().stats())
+METRICS.gauge("answer_flight", "Birlashtirilgan (single-flight) OpenAI so'rovlari", ANSWER_FLIGHT.stats)
+METRICS.gauge("prompt_cache", "Prompt tokenlari va provayder keshidan o'qilgan ulushi", PROMPTS.stats)
+METRICS.gauge("heat", "Qizigan bahs detektori: kuzatilgan xabarlar va tekshiruvlar", HEAT.stats)
 
-# Foydalanuvchi va guruh throttling holati
-LAST_SEEN_USER: Dict[int, float] = defaultdict(float)   # user_id -> ts
-GROUP_COOLDOWN: Dict[int, float] = defaultdict(float)   # chat_id -> ts
-THREAD_COUNT: Dict[Tuple[int, Optional[int]], int] = defaultdict(int)
 # Paste this over your broken SYSTEM_PROMPT block
 # Clean, single string; no stray quotes; tight instructions.
 
@@ -79,6 +230,18 @@ SYSTEM_PROMPT = (
     "Ustoz (@davronovsimple) xabar yozsa, avval tasdiqlang: 'To'g'ri aytyapsiz ustoz ✅', so'ng bitta juda qisqa qo'shimcha bering. "
     "Boshqa mavzularni qat'iy rad eting. Emojilar minimal (🙂, ✅) va faqat kerak bo'lsa."
 )
+# Ustoz xabariga javobda savoldan oldin alohida system xabar sifatida qo'shiladi
+USTOZ_INSTRUCTION = "Bu ustoz xabari: fikrini qisqa tasdiqlab, bitta lo'nda qo'shimcha bering."
+
+# Guruh bo'yicha sozlamalar (group_settings jadvali); yo'q bo'lsa — yuqoridagi env qiymatlari
+POLICY = GroupPolicyCache(GroupPolicy(
+    user_rate_window=USER_RATE_WINDOW,
+    group_cooldown_min=GROUP_COOLDOWN_MIN,
+    group_cooldown_max=GROUP_COOLDOWN_MAX,
+    ustoz_username=USTOZ_USERNAME,
+    system_prompt=SYSTEM_PROMPT,
+))
+METRICS.gauge("group_policy", "Guruh sozlamalari keshi", POLICY.stats)
 
 
 # ---------------------- Util funksiyalar ----------------------
@@ -87,50 +250,30 @@ def is_group(chat_type: ChatType) -> bool:
     return chat_type in {ChatType.GROUP, ChatType.SUPERGROUP}
 
 async def get_admin_ids(bot, chat_id: int) -> set:
-    admins = await bot.get_chat_administrators(chat_id)
-    return {adm.user.id for adm in admins}
-
-def is_from_ustoz(admin_ids: set, user_id: int, text: str) -> bool:
-    if user_id in admin_ids:
-        return True
-    return f"@{USTOZ_USERNAME}" in (text or "")
-
-def looks_it_topic(text: str) -> bool:
-    return bool(ALLOWED_TOPICS_RE.search(text or ""))
-
-def is_question_or_confusion(text: str) -> bool:
-    low = (text or "").lower()
-    return ("?" in low) or any(k in low for k in ("qanday", "nega", "nimaga", "ishlamayapti", "xato", "error"))
-
-def is_heating_up(chat_id: int, thread_id: Optional[int], text: str) -> bool:
-    key = (chat_id, thread_id)
-    THREAD_COUNT[key] += 1
-    low = (text or "").lower()
-    hot = sum(1 for k in HEATED_MARKERS if k in low)
-    # tezroq tutish: 2 xabar yoki 1 ta "issiq" so'z yetarli
-    return THREAD_COUNT[key] >= 2 or hot >= 1
-
-def user_rate_limited(user_id: int) -> bool:
-    now = time.time()
-    if now - LAST_SEEN_USER[user_id] < USER_RATE_WINDOW:
-        return True
-    LAST_SEEN_USER[user_id] = now
-    return False
-
-def group_cooldown_ok(chat_id: int) -> bool:
-    now = time.time()
-    window = random.randint(GROUP_COOLDOWN_MIN, GROUP_COOLDOWN_MAX)
-    if now - GROUP_COOLDOWN[chat_id] >= window:
-        GROUP_COOLDOWN[chat_id] = now
-        return True
-    return False
+    with METRICS.span("get_chat_administrators"):
+        return await ADMIN_CACHE.get(bot, chat_id)
+
+QUESTION_WORDS = ("qanday", "nega", "nimaga", "ishlamayapti", "xato", "error")
+
+def observe_heat(message: types.Message, features: TriggerFeatures) -> None:
+    """Guruhdagi har bir xabarni thread oynasiga yozadi (features.hot — HEATED_MARKERS soni)."""
+    sender = message.from_user or message.sender_chat
+    HEAT.observe(message.chat.id, message.message_thread_id, sender.id if sender else 0, features.hot)
+
+def is_heating_up(chat_id: int, thread_id: Optional[int]) -> bool:
+    return HEAT.is_heated(chat_id, thread_id)
+
+async def user_rate_limited(user_id: int, chat_id: int) -> bool:
+    return await STATE.user_rate_limited(user_id, POLICY.get(chat_id).user_rate_window)
+
+async def group_cooldown_ok(chat_id: int) -> bool:
+    policy = POLICY.get(chat_id)
+    window = random.randint(policy.group_cooldown_min, policy.group_cooldown_max)
+    return await STATE.group_cooldown_ok(chat_id, window)
 
 MENTION_WORDS = ("fikir", "izoh", "aniqlashtir", "xulosa", "fikr")
 
 # --- qo'shimcha trigger yordamchilari ---
-def mentioned_directly(text: str) -> bool:
-    return bool(BOT_USERNAME) and (f"@{BOT_USERNAME}".lower() in (text or "").lower())
-
 def reply_to_bot(message: types.Message) -> bool:
     u = getattr(getattr(message, "reply_to_message", None), "from_user", None)
     if not u or not u.username:
@@ -139,78 +282,315 @@ def reply_to_bot(message: types.Message) -> bool:
 
 def is_ustoz_message(message: types.Message) -> bool:
     u = message.from_user
-    return bool(u and u.username and (u.username.lower() == USTOZ_USERNAME.lower()))
+    ustoz = POLICY.get(message.chat.id).ustoz_username
+    return bool(u and u.username and ustoz and (u.username.lower() == ustoz.lower()))
 
 # "kod yozib ber" tipidagi so'rovlarni oldindan ushlaymiz (oddiy heuristika)
 CODE_HINTS = ("kod yoz", "kodini yoz", "kod yozib ber", "write code", "code sample", "snippet", "namuna")
 
-def is_code_request(text: str) -> bool:
-    low = (text or "").lower()
-    return any(h in low for h in CODE_HINTS)
-
-def should_respond(message: types.Message, admin_ids: set) -> bool:
-    text = message.text or ""
+async def should_respond(message: types.Message, admin_ids: set, features: Optional[TriggerFeatures] = None) -> bool:
+    if features is None:
+        features = TRIGGERS.classify(message.text or "")
     # 0) agar botning javobiga reply bo'lsa
     if reply_to_bot(message):
-        return True
+        return count_trigger("reply_to_bot", True)
     # 1) @mention yoki /ask
-    if mentioned_directly(text) or text.startswith("/ask"):
-        return True
+    if features.mentioned or features.ask:
+        return count_trigger("mention_or_ask", True)
     # 2) ustoz xabari (IT bo'lsa)
-    if is_ustoz_message(message) and looks_it_topic(text):
-        return True
+    if is_ustoz_message(message) and features.it_topic:
+        return count_trigger("ustoz", True)
     # 3) qizigan bahs + IT + savol/aniqlik + cooldown
-    if looks_it_topic(text) and is_question_or_confusion(text) and is_heating_up(message.chat.id, message.message_thread_id, text):
-        return group_cooldown_ok(message.chat.id)
+    if features.it_topic and features.question and is_heating_up(message.chat.id, message.message_thread_id):
+        return count_trigger("heated", await group_cooldown_ok(message.chat.id))
     # 4) trigger so'zlar
-    if looks_it_topic(text) and any(w in text.lower() for w in MENTION_WORDS):
-        return group_cooldown_ok(message.chat.id)
-    return False
+    if features.it_topic and features.mention_word:
+        return count_trigger("mention_word", await group_cooldown_ok(message.chat.id))
+    return count_trigger("none", False)
+
+def count_trigger(branch: str, result: bool) -> bool:
+    TRIGGERS_TOTAL.inc(branch=branch, result="respond" if result else "skip")
+    return result
 
 # ---------------------- OpenAI mantiqi ----------------------
-async def chatgpt_answer(chat_id: int, prompt: str) -> str:
+def answer_cache_key(prompt: str, system_prompt: str = SYSTEM_PROMPT, instruction: Optional[str] = None) -> str:
+    if instruction:
+        system_prompt = f"{system_prompt}\n{instruction}"
+    return make_cache_key(normalize_prompt(prompt, ALLOWED_TOPICS_RE), OPENAI_MODEL, system_prompt)
+
+async def cached_answer(chat_id: int, prompt: str, cache_key: Optional[str]) -> Optional[str]:
+    """Keshdan javob topilsa — kontekstga yozib, tozalangan javobni qaytaradi."""
+    if cache_key is None:
+        return None
+    answer = await ANSWER_CACHE.get(cache_key)
+    if answer is None:
+        return None
+    await MEMORY.remember(chat_id, prompt, answer)
+    return sanitize_answer(answer, prompt)
+
+async def local_answer(chat_id: int, prompt: str) -> Optional[str]:
+    """FAQ bazasidan yetarli ishonch bilan javob topilsa — kontekstga yozib qaytaradi."""
+    found = local_answers().match(prompt)
+    if found is None:
+        return None
+    answer, score = found
+    logging.debug(f"Lokal FAQ javobi [chat:{chat_id}]: ishonch={score:.2f}")
+    await MEMORY.remember(chat_id, prompt, answer)
+    return answer
+
+def record_tier(
+        chat_id: int, tier: str, started: float, prompt: str, answer: str,
+        user_id: Optional[int] = None, usage: Optional[CompletionUsage] = None,
+) -> None:
+    """Javob darajasi va kechikishini metrikaga, savol-javobni esa (yoqilgan bo'lsa) jurnalga yozadi."""
+    elapsed = time.perf_counter() - started
+    ANSWER_TIER_SECONDS.observe(elapsed, tier=tier)
+    logging.info(f"Javob darajasi [chat:{chat_id}]: {tier} ({elapsed * 1000:.2f} ms)")
+    log_message(MessageRecord(
+        chat_id=chat_id,
+        user_id=user_id,
+        prompt=prompt,
+        answer=answer,
+        tier=tier,
+        latency_ms=int(elapsed * 1000),
+        model=OPENAI_MODEL if tier == "openai" else None,
+        prompt_tokens=usage.prompt_tokens if usage else None,
+        completion_tokens=usage.completion_tokens if usage else None,
+    ))
+
+def answer_flight_key(chat_id: int, prompt: str, instruction: Optional[str] = None) -> Tuple[int, str, Optional[str]]:
+    return chat_id, normalize_prompt(prompt, ALLOWED_TOPICS_RE), instruction
+
+async def chatgpt_answer(
+        chat_id: int, prompt: str, cacheable: bool = True, priority: int = PRIORITY_INTERACTIVE,
+        user_id: Optional[int] = None,
+) -> str:
+    answer, _ = await chatgpt_answer_shared(chat_id, prompt, cacheable, priority, user_id=user_id)
+    return answer
+
+async def chatgpt_answer_shared(
+        chat_id: int, prompt: str, cacheable: bool = True, priority: int = PRIORITY_INTERACTIVE,
+        local: bool = True, user_id: Optional[int] = None, instruction: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """
+    ``chatgpt_answer`` + birlashtirish: xuddi shu chatda xuddi shu savol uchun generatsiya
+    ketayotgan bo'lsa, yangi so'rov yuborilmaydi. (javob, shared) qaytaradi.
+
+    Darajalar: lokal FAQ -> javob keshi -> OpenAI. ``cacheable=False`` (kontekstga bog'liq
+    so'rovlar) yoki ``local=False`` bo'lsa lokal daraja o'tkazib yuboriladi.
+    ``instruction`` — shu so'rovga xos ko'rsatma (savol matniga qo'shilmaydi, ``PromptBuilder``).
+    """
+    started = time.perf_counter()
+    if local and cacheable:
+        answer = await local_answer(chat_id, prompt)
+        if answer is not None:
+            record_tier(chat_id, "local", started, prompt, answer, user_id)
+            return answer, False
+
+    cache_key = (
+        answer_cache_key(prompt, POLICY.get(chat_id).system_prompt, instruction)
+        if (ANSWER_CACHE is not None and cacheable) else None
+    )
+    cached = await cached_answer(chat_id, prompt, cache_key)
+    if cached is not None:
+        record_tier(chat_id, "cache", started, prompt, cached, user_id)
+        return cached, False
+
+    (answer, usage), shared = await ANSWER_FLIGHT.do(
+        answer_flight_key(chat_id, prompt, instruction),
+        lambda: generate_answer(chat_id, prompt, cache_key, priority, instruction),
+    )
+    final = sanitize_answer(answer, prompt)
+    if shared:
+        record_tier(chat_id, "coalesced", started, prompt, final, user_id)
+    else:
+        record_tier(chat_id, "openai", started, prompt, final, user_id, usage)
+    return final, shared
+
+async def generate_answer(
+        chat_id: int, prompt: str, cache_key: Optional[str], priority: int, instruction: Optional[str] = None,
+) -> Tuple[str, Optional[CompletionUsage]]:
     # juda qisqa delay burstlarni yumshatish uchun
     await asyncio.sleep(0.12)
 
     max_retries = 3
     backoff = 0.7
 
-    messages: List[ChatCompletionMessageParam] = [
-        {"role": "system", "content": SYSTEM_PROMPT},
-    ]
-    # Chatga bog'lab kontekst yuritamiz
-    messages.extend(HISTORY[chat_id])
-    messages.append({"role": "user", "content": prompt})
-
-    async with OAI_SEMAPHORE:
-        for attempt in range(1, max_retries + 1):
-            try:
-                resp = await oai.chat.completions.create(
+    # Chatga bog'lab kontekst yuritamiz; cost — adolatli navbatdagi ulush (tokenlar)
+    messages, cost = PROMPTS.build(POLICY.get(chat_id).system_prompt, await MEMORY.build(chat_id), prompt, instruction)
+
+    for attempt in range(1, max_retries + 1):
+        try:
+            async with OAI_LIMITER.slot(priority, chat_id, cost) as waited:
+                STAGE_SECONDS.observe(waited, stage="openai_queue_wait")
+                with METRICS.span("openai_generation"):
+                    resp = await openai_client().chat.completions.create(
+                        model=OPENAI_MODEL,
+                        messages=messages,
+                        temperature=0.2,
+                        max_tokens=450,
+                    )
+            break
+        except Exception as e:
+            if is_rate_limited(e) and attempt < max_retries:
+                # Slot bo'shatilgan holda kutamiz; server retry-after bersa — shunga amal qilamiz
+                await asyncio.sleep(retry_after_seconds(e) or backoff)
+                backoff *= 1.8
+                continue
+            raise
+
+    PROMPTS.observe(resp.usage)
+    content = resp.choices[0].message.content
+    answer = content or "Uzr, javob topilmadi."
+    if content and cache_key is not None:
+        await ANSWER_CACHE.set(cache_key, content)
+    # Xotiraga yozamiz (chat bo'yicha)
+    await MEMORY.remember(chat_id, prompt, answer)
+    return answer, resp.usage
+
+async def chatgpt_answer_stream(
+        message: types.Message, prompt: str, priority: int = PRIORITY_INTERACTIVE, local: bool = True,
+        instruction: Optional[str] = None,
+) -> Tuple[str, bool]:
+    """
+    chatgpt_answer ning stream varianti: javob kelishi bilan guruhga chiqarib boriladi.
+    Birlashtirilgan (shared) so'rovda javob faqat lider xabariga stream qilinadi. (javob, shared) qaytaradi.
+    """
+    chat_id = message.chat.id
+    user_id = message.from_user.id if message.from_user else None
+    started = time.perf_counter()
+    if local:
+        answer = await local_answer(chat_id, prompt)
+        if answer is not None:
+            record_tier(chat_id, "local", started, prompt, answer, user_id)
+            await StreamingReply(message).finish(answer)
+            return answer, False
+
+    cache_key = (
+        answer_cache_key(prompt, POLICY.get(chat_id).system_prompt, instruction) if ANSWER_CACHE is not None else None
+    )
+    cached = await cached_answer(chat_id, prompt, cache_key)
+    if cached is not None:
+        record_tier(chat_id, "cache", started, prompt, cached, user_id)
+        await StreamingReply(message).finish(cached)
+        return cached, False
+
+    # Generatsiya erta to'xtatilsa usage kelmaydi — u holda tokenlar yozilmaydi
+    (answer, usage), shared = await ANSWER_FLIGHT.do(
+        answer_flight_key(chat_id, prompt, instruction),
+        lambda: generate_answer_stream(message, prompt, cache_key, priority, instruction),
+    )
+    final = sanitize_answer(answer, prompt)
+    if shared:
+        record_tier(chat_id, "coalesced", started, prompt, final, user_id)
+    else:
+        record_tier(chat_id, "openai", started, prompt, final, user_id, usage)
+    return final, shared
+
+async def generate_answer_stream(
+        message: types.Message, prompt: str, cache_key: Optional[str], priority: int,
+        instruction: Optional[str] = None,
+) -> Tuple[str, Optional[CompletionUsage]]:
+    chat_id = message.chat.id
+    await asyncio.sleep(0.12)
+
+    max_retries = 3
+    backoff = 0.7
+
+    messages, cost = PROMPTS.build(POLICY.get(chat_id).system_prompt, await MEMORY.build(chat_id), prompt, instruction)
+
+    reply = StreamingReply(message, min_interval=STREAM_EDIT_INTERVAL)
+    ttfb: Optional[float] = None
+    usage: Optional[CompletionUsage] = None
+    raw = ""
+
+    # Slot faqat OpenAI stream'ini qamraydi: oraliq matn ``reply.push`` bilan fon vazifasida chiqadi
+    for attempt in range(1, max_retries + 1):
+        try:
+            async with OAI_LIMITER.slot(priority, chat_id, cost) as waited:
+                STAGE_SECONDS.observe(waited, stage="openai_queue_wait")
+                stream = await openai_client().chat.completions.create(
                     model=OPENAI_MODEL,
                     messages=messages,
                     temperature=0.2,
                     max_tokens=450,
+                    stream=True,
+                    stream_options={"include_usage": True},
                 )
-                answer = resp.choices[0].message.content or "Uzr, javob topilmadi."
-                # Xotiraga yozamiz (chat bo'yicha)
-                HISTORY[chat_id].append({"role": "user", "content": prompt})
-                HISTORY[chat_id].append({"role": "assistant", "content": answer})
-                return sanitize_answer(answer)
-            except Exception as e:
-                status = getattr(e, "status_code", None)
-                if status == 429 and attempt < max_retries:
-                    await asyncio.sleep(backoff)
-                    backoff *= 1.8
-                    continue
-                raise
+                async for chunk in stream:
+                    if chunk.usage is not None:
+                        usage = chunk.usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - reply.started
+                    raw += delta
+                    visible, complete = sanitize_partial(raw)
+                    if complete >= 3:
+                        # 3 jumladan keyingisi baribir kesiladi — generatsiyani to'xtatamiz
+                        await stream.close()
+                        break
+                    reply.push(visible, complete)
+            break
+        except Exception as e:
+            if is_rate_limited(e) and attempt < max_retries and not raw:
+                await asyncio.sleep(retry_after_seconds(e) or backoff)
+                backoff *= 1.8
+                continue
+            await reply.drain()
+            raise
+
+    PROMPTS.observe(usage)
+    answer = raw or "Uzr, javob topilmadi."
+    if raw and cache_key is not None:
+        await ANSWER_CACHE.set(cache_key, raw)
+    await MEMORY.remember(chat_id, prompt, answer)
+
+    final = sanitize_answer(answer, prompt)
+    await reply.finish(final)
+
+    total = time.perf_counter() - reply.started
+    if ttfb is not None:
+        STAGE_SECONDS.observe(ttfb, stage="openai_ttfb")
+    if reply.first_visible is not None:
+        STAGE_SECONDS.observe(reply.first_visible, stage="first_visible")
+    STAGE_SECONDS.observe(total, stage="openai_stream_total")
+    logging.info(
+        f"OpenAI stream [chat:{chat_id}]: ttfb={ttfb if ttfb is not None else -1:.3f}s "
+        f"first_visible={reply.first_visible or -1:.3f}s total={total:.3f}s edits={reply.edits}"
+    )
+    return answer, usage
 
 CODE_FENCE_RE = re.compile(r"```[\s\S]*?```", re.M)
+CODE_FENCE_JOKE = "Men kod yozsam, siz nima o'rganasiz? 🙂 Yo'nalish: 1) muammoni aniqlang; 2) kichik misol; 3) log/xatoni o'qing."
+SENTENCE_SEPS = (". ", "? ", "! ")
+
+def sanitize_partial(raw: str) -> Tuple[str, int]:
+    """Stream davomidagi matnni tozalaydi: yopilmagan kod blokini yashiradi. (matn, tugallangan jumlalar soni) qaytaradi."""
+    if raw.count("```") % 2:
+        raw = raw[:raw.rfind("```")]
+    text = CODE_FENCE_RE.sub(CODE_FENCE_JOKE, raw)
+    buf = text.strip()
+    for sep in SENTENCE_SEPS:
+        buf = buf.replace(sep, "|SEP|")
+    parts = buf.split("|SEP|")
+    # Oxirgi bo'lak hali tugamagan bo'lishi mumkin
+    complete = [p.strip() for p in parts[:-1] if p.strip()]
+    tail = parts[-1].strip()
+    if tail.endswith((".", "?", "!")) and tail[:-1].strip():
+        complete.append(tail)
+        tail = ""
+    if len(complete) >= 3:
+        return ". ".join(complete[:3]), len(complete)
+    shown = ". ".join(complete + ([tail] if tail else []))
+    return shown, len(complete)
 
 def sanitize_answer(ans: str, prompt: str) -> str:
     """Kod bloklarini chiqarib yubormaslik; o'zini tanishtirishni faqat so'ralganda; javobni juda qisqa tutish."""
     # Kod bloklarini hazil bilan almashtiramiz
     if CODE_FENCE_RE.search(ans):
-        ans = CODE_FENCE_RE.sub("Men kod yozsam, siz nima o'rganasiz? 🙂 Yo'nalish: 1) muammoni aniqlang; 2) kichik misol; 3) log/xatoni o'qing.", ans)
+        ans = CODE_FENCE_RE.sub(CODE_FENCE_JOKE, ans)
     # O'zini tanishtirishni faqat "kim?" so'ralganda qoldiramiz
     WHOAMI_SENT = "Men ustoz Davronov G'olibjonning yordamchisiman"
     WHOASK_HINTS = ("kimsan", "kimligi", "kim o'zi", "who are you")
@@ -219,7 +599,7 @@ def sanitize_answer(ans: str, prompt: str) -> str:
         ans = ans.replace(WHOAMI_SENT, "").strip()
     # Juda uzun bo'lsa — 3 jumlagacha qisqartiramiz (sodda bo'luvchi)
     buf = ans.strip()
-    for sep in [". ", "? ", "! "]:
+    for sep in SENTENCE_SEPS:
         buf = buf.replace(sep, "|SEP|")
     sentences = [s.strip() for s in buf.split("|SEP|") if s.strip()]
     if len(sentences) > 3:
@@ -233,17 +613,63 @@ PLAYFUL_HINTS = (
     "hazil", "kuldir", "mem", "katta ketma", "uka", "sen mening yordamchimisan", "sening vazifang", "botjon", "bot aka", "aka bot", "bro", "aka"
 )
 
-def is_playful_request(text: str) -> bool:
-    low = (text or "").lower()
-    return any(h in low for h in PLAYFUL_HINTS)
+# Barcha trigger belgilarini bitta o'tishda hisoblovchi klassifikator
+TRIGGERS = TriggerClassifier(
+    topics=ALLOWED_TOPICS,
+    question_words=QUESTION_WORDS,
+    heated_markers=HEATED_MARKERS,
+    code_hints=CODE_HINTS,
+    playful_hints=PLAYFUL_HINTS,
+    mention_words=MENTION_WORDS,
+    bot_username=BOT_USERNAME,
+)
 
 # ---------------------- Handlers ----------------------
 
 @echo_router.message(Command("reset"))
 async def reset_ctx(message: types.Message):
-    HISTORY.pop(message.chat.id, None)
+    await MEMORY.clear(message.chat.id)
     await message.reply("♻️ Kontekst tozalandi. Yangi suhbat boshlandi.")
 
+@echo_router.startup()
+async def start_background(container: Optional[AppContainer] = None):
+    global _container, STATE, MEMORY, ANSWER_CACHE
+    # Konteyner dispatcher workflow_data orqali keladi (create_dispatcher)
+    if container is not None:
+        _container = container
+        container.openai  # kalit yo'q bo'lsa — birinchi so'rovda emas, ishga tushishda xato
+    local_answers()
+    # Holat va javob keshi (Redis klientlari bo'lishi mumkin) faqat ishga tushishda quriladi
+    if STATE is None:
+        STATE = build_state_backend()
+        MEMORY = build_memory(STATE)
+        ANSWER_CACHE = build_answer_cache()
+        METRICS.gauge("memory", "Kontekst xotirasi: yuborilgan/tejalgan prompt tokenlari", MEMORY.stats)
+        METRICS.gauge("state", "Holat omborlari: yozuvlar, chiqarilganlar va taxminiy xotira (bayt)", STATE.stats)
+        if ANSWER_CACHE is not None:
+            METRICS.gauge("answer_cache", "Javob keshi statistikasi", ANSWER_CACHE.stats)
+    await STATE.start()
+    # Guruh sozlamalari bazada bo'lsa — LISTEN/NOTIFY keshi, aks holda faqat env qiymatlari
+    db = container.config.db if container is not None else None
+    if db is not None and db.group_settings:
+        await POLICY.start(container.db_engine)
+
+@echo_router.shutdown()
+async def stop_background():
+    # Update'lar drain qilingan (Lifecycle); endi fon xulosalari va backend ulanishlari
+    if MEMORY is not None:
+        await MEMORY.drain(timeout=5.0)
+    await POLICY.stop()
+    if STATE is not None:
+        await STATE.close()
+    if ANSWER_CACHE is not None:
+        await ANSWER_CACHE.close()
+
+@echo_router.chat_member()
+async def on_chat_member_update(update: types.ChatMemberUpdated):
+    # Admin huquqlari o'zgargan bo'lishi mumkin — keshni yangilashga majburlaymiz
+    ADMIN_CACHE.invalidate(update.chat.id)
+
 @echo_router.message(Command("tip"))
 async def tip_cmd(message: types.Message):
     tips = [
@@ -263,7 +689,10 @@ async def xulosa_cmd(message: types.Message):
         "Formati: 1) muammo 2) asosiy fikr 3) keyingi qadam."
     )
     try:
-        ans = await chatgpt_answer(message.chat.id, prompt)
+        # Xulosa kontekstga bog'liq — keshlamaymiz
+        ans = await chatgpt_answer(
+            message.chat.id, prompt, cacheable=False, user_id=message.from_user.id if message.from_user else None,
+        )
     except Exception:
         ans = "⚠️ AI bilan ulanishda muammo."
     await message.reply(ans)
@@ -274,11 +703,13 @@ async def group_only_listener(message: types.Message):
         return  # faqat guruh
 
     text = message.text or ""
+    features = TRIGGERS.classify(text)
+    observe_heat(message, features)
+    to_bot = reply_to_bot(message)
 
     # Mention/savol/IT yoki reply-to-bot bo'lmasa — jim (lekin hazilga bitta qisqa javob berishimiz mumkin)
-    if not (looks_it_topic(text) or is_question_or_confusion(text) or mentioned_directly(text)
-            or text.startswith("/ask") or reply_to_bot(message)):
-        if is_playful_request(text) and group_cooldown_ok(message.chat.id):
+    if not (features.it_topic or features.question or features.mentioned or features.ask or to_bot):
+        if features.playful and await group_cooldown_ok(message.chat.id):
             jokes = [
                 "Katta ketmang, uka 🙂 vazifa sodda: savolni aniqlang, keyin bir qadam qilib sinang.",
                 "Bot aka hushyor! Ammo IT bo'lmasa, jim turaman 😉",
@@ -288,19 +719,21 @@ async def group_only_listener(message: types.Message):
         return
 
     admin_ids = await get_admin_ids(message.bot, message.chat.id)
-    if not should_respond(message, admin_ids):
+    if not await should_respond(message, admin_ids, features):
         return
 
-    if user_rate_limited(message.from_user.id):
+    if await user_rate_limited(message.from_user.id, message.chat.id):
         return
 
-    await message.bot.send_chat_action(message.chat.id, ChatAction.TYPING)
+    with METRICS.span("send_chat_action"):
+        await message.bot.send_chat_action(message.chat.id, ChatAction.TYPING)
 
     # /ask bo'lsa prefiksini olib tashlaymiz
-    prompt = text[len("/ask"):].strip() if text.startswith("/ask") else text
+    prompt = text[len("/ask"):].strip() if features.ask else text
+    prompt_features = TRIGGERS.classify(prompt) if features.ask else features
 
     # Agar off-topic bo'lsa, ammo bevosita murojaat (mention/reply) yoki hazil bo'lsa — API'ga chiqmasdan qisqa hazil
-    if (not looks_it_topic(prompt) and (mentioned_directly(text) or reply_to_bot(message))) or is_playful_request(prompt):
+    if (not prompt_features.it_topic and (features.mentioned or to_bot)) or prompt_features.playful:
         jokes = [
             "Katta ketmang, uka 🙂 Men IT mavzularida kuchliman. Savol bo'lsa marhamat",
             "Ha, yordamchingizman — lekin darsdan qochirmayman 😉 Savolingizni aniqlashtiring",
@@ -310,7 +743,7 @@ async def group_only_listener(message: types.Message):
         return
 
     # Kod so'rovi — APIsiz, darrov hazil
-    if is_code_request(prompt):
+    if prompt_features.code_request:
         jokes = [
             "Men kod yozsam, siz nima o'rganasiz? 🙂 Yo'nalish: muammoni aniqlang, kichik misol qiling, logni o'qing.",
             "Kod? Yo‘q-yo‘q 🙂 Avval fikrni aniqla, o‘zing urin — men yo‘nalishni aytaman.",
@@ -319,19 +752,53 @@ async def group_only_listener(message: types.Message):
         await message.reply(random.choice(jokes))
         return
 
-    # Ustoz xabari bo'lsa — doim tasdiq + bitta lo'nda qo'shimcha
-    if is_ustoz_message(message):
-        prompt = "Ustoz fikrini qisqa tasdiqlab, bitta lo'nda qo'shimcha bering: " + prompt
-
-    try:
-        answer = await chatgpt_answer(message.chat.id, prompt)
-    except Exception:
-        answer = "⚠️ API bilan bog'lanishda muammo yuz berdi. Birozdan so'ng urinib ko'ring."
+    # Ustoz xabari bo'lsa — doim tasdiq + bitta lo'nda qo'shimcha (FAQ javobi bu yerda mos emas)
+    # Ko'rsatma savolga qo'shilmaydi — alohida xabar bo'lib tarixdan keyin turadi (prompt keshi saqlanadi)
+    ustoz = is_ustoz_message(message)
+    instruction = USTOZ_INSTRUCTION if ustoz else None
+
+    # Bevosita murojaatlar navbatda avtomatik (qizigan bahs) javoblardan oldin turadi
+    direct = features.ask or features.mentioned or to_bot or ustoz
+    priority = PRIORITY_INTERACTIVE if direct else PRIORITY_AUTO
+
+    shared = False
+    if OPENAI_STREAM:
+        try:
+            answer, shared = await chatgpt_answer_stream(
+                message, prompt, priority, local=not ustoz, instruction=instruction,
+            )
+        except QueueDropped:
+            # Chatdan yangiroq savollar navbatda — eskisiga javob bermaymiz
+            logging.info(f"Eskirgan savol navbatdan tashlandi [chat:{message.chat.id}]")
+            return
+        except Exception:
+            logging.exception("OpenAI stream xatosi")
+            await message.reply("⚠️ API bilan bog'lanishda muammo yuz berdi. Birozdan so'ng urinib ko'ring.")
+            return
+        if not shared:
+            return
+    else:
+        try:
+            answer, shared = await chatgpt_answer_shared(
+                message.chat.id, prompt, priority=priority, local=not ustoz, user_id=message.from_user.id,
+                instruction=instruction,
+            )
+        except QueueDropped:
+            logging.info(f"Eskirgan savol navbatdan tashlandi [chat:{message.chat.id}]")
+            return
+        except Exception:
+            answer = "⚠️ API bilan bog'lanishda muammo yuz berdi. Birozdan so'ng urinib ko'ring."
+
+    if shared and not direct:
+        # Xuddi shu savolga javob guruhda allaqachon chiqdi — takrorlamaymiz
+        logging.info(f"Birlashtirilgan javob takrorlanmadi [chat:{message.chat.id}]")
+        return
 
     if len(answer) > 350:
         answer = answer[:330] + "..."
 
-    await message.reply(answer, disable_web_page_preview=True)
+    with METRICS.span("reply"):
+        await message.reply(answer, disable_web_page_preview=True)
 
 @echo_router.message(F.text)
 async def group_only_listener_with_state(message: types.Message, state: FSMContext):
@@ -1,22 +1,125 @@
+import hmac
 import logging
+from contextlib import asynccontextmanager
+from typing import Optional
 
 import betterlogging as bl
 import fastapi
-from aiogram import Bot
+from aiogram.types import Update
 from fastapi import FastAPI
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
+from bot import create_bot, create_dispatcher, create_db_writers, start_db_writers, stop_db_writers
 from config import load_config, Config
+from infrastructure.api.update_queue import UpdateQueue
+from infrastructure.container import AppContainer
+from services.metrics import METRICS
 
-app = FastAPI()
-log_level = logging.INFO
-bl.basic_colorized_config(level=log_level)
 log = logging.getLogger(__name__)
 
-config: Config = load_config(".env")
-bot = Bot(token=config.tg_bot.token)
 
+def create_app(config: Optional[Config] = None) -> FastAPI:
+    """
+    Webhook ilovasi fabrikasi: import paytida konfiguratsiya, Bot yoki klientlar yaratilmaydi.
 
-@app.post("/api")
-async def webhook_endpoint(request: fastapi.Request):
-    return JSONResponse(status_code=200, content={"status": "ok"})
+    Ishga tushirish: ``uvicorn --factory infrastructure.api.app:create_app``
+
+    :param config: Tayyor konfiguratsiya (berilmasa — ``.env`` dan o'qiladi).
+    :return: FastAPI ilovasi.
+    """
+    bl.basic_colorized_config(level=logging.INFO)
+    if config is None:
+        config = load_config(".env")
+
+    container = AppContainer(config)
+    bot = create_bot(config)
+    # Polling'dagi kabi: foydalanuvchilar va savol-javob jurnali bazaga to'plab yoziladi
+    session_pool, user_writer, message_log = create_db_writers(config, container)
+    dp = create_dispatcher(config, session_pool if user_writer is not None else None, user_writer, container=container)
+    update_queue = UpdateQueue(
+        dp,
+        bot,
+        workers=config.webhook.workers,
+        maxsize=config.webhook.queue_size,
+    )
+    METRICS.gauge("webhook_queue", "Webhook update navbati holati", update_queue.stats)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        start_db_writers(user_writer, message_log)
+        # Polling'dagi kabi router startup/shutdown handlerlarini ishga tushiramiz
+        await dp.emit_startup(bot=bot, **dp.workflow_data)
+        update_queue.start()
+        if config.webhook.url:
+            await bot.set_webhook(
+                config.webhook.url,
+                secret_token=config.webhook.secret,
+                allowed_updates=dp.resolve_used_update_types(),
+                max_connections=100,
+            )
+            log.info(f"Webhook o'rnatildi: {config.webhook.url}")
+        app.state.shutting_down = False
+        yield
+        # Yangi update'lar 503 oladi (Telegram keyin qayta yuboradi); navbatdagilari muddat ichida tugatiladi
+        app.state.shutting_down = True
+        pending = update_queue.accepted - update_queue.processed - update_queue.failed
+        dropped = await update_queue.stop(timeout=config.misc.drain_timeout)
+        await dp.emit_shutdown(bot=bot, **dp.workflow_data)
+        # Bufferdagi yozuvlar pullar yopilishidan oldin bazaga tushiriladi
+        await stop_db_writers(user_writer, message_log)
+        await bot.session.close()
+        await dp.storage.close()
+        await container.close()
+        log.info(
+            f"Webhook to'xtatildi: {pending - dropped} ta update tugatildi, {dropped} ta tashlandi, "
+            f"{container.lifecycle.rejected} ta rad etildi"
+        )
+
+    app = FastAPI(lifespan=lifespan)
+
+    def authorized(request: fastapi.Request, *, bearer: bool = False) -> bool:
+        """Webhook sirini tekshiradi (sir berilmagan bo'lsa — ochiq)."""
+        if not config.webhook.secret:
+            return True
+        token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+        if bearer and not token:
+            # Prometheus va boshqa skreperlar uchun: ``Authorization: Bearer <WEBHOOK_SECRET>``
+            token = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        return hmac.compare_digest(token.encode(), config.webhook.secret.encode())
+
+    @app.post("/api")
+    async def webhook_endpoint(request: fastapi.Request):
+        return JSONResponse(status_code=200, content={"status": "ok"})
+
+    @app.post(config.webhook.path)
+    async def telegram_webhook(request: fastapi.Request):
+        if not authorized(request):
+            return JSONResponse(status_code=401, content={"status": "unauthorized"})
+
+        if request.app.state.shutting_down or container.lifecycle.draining:
+            container.lifecycle.reject()
+            return JSONResponse(status_code=503, content={"status": "shutting down"})
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": bot})
+        except ValueError as e:
+            # JSON yoki Update sxemasi xato — qayta yuborish foydasiz
+            log.warning(f"Webhook: noto'g'ri update rad etildi ({type(e).__name__})")
+            return JSONResponse(status_code=400, content={"status": "bad request"})
+        if not update_queue.put(update):
+            # Telegram 2xx bo'lmagan javobda update'ni keyinroq qayta yuboradi
+            return JSONResponse(status_code=503, content={"status": "busy"})
+        return JSONResponse(status_code=200, content={"status": "ok"})
+
+    @app.get("/stats/updates")
+    async def webhook_stats(request: fastapi.Request):
+        if not authorized(request, bearer=True):
+            return JSONResponse(status_code=401, content={"status": "unauthorized"})
+        return JSONResponse(status_code=200, content=update_queue.stats())
+
+    @app.get("/metrics")
+    async def metrics(request: fastapi.Request):
+        if not authorized(request, bearer=True):
+            return PlainTextResponse("unauthorized\n", status_code=401)
+        return PlainTextResponse(METRICS.render())
+
+    return app
@@ -0,0 +1,85 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+log = logging.getLogger(__name__)
+
+
+class UpdateQueue:
+    """
+    Webhook orqali kelgan update'lar uchun chegaralangan navbat.
+
+    HTTP handler update'ni navbatga qo'yib darhol 200 qaytaradi, ``workers`` ta
+    vazifa esa ularni ``Dispatcher.feed_update`` ga uzatadi. Navbat to'lsa
+    ``put`` False qaytaradi — handler 503 bilan javob beradi va Telegram update'ni
+    keyinroq qayta yuboradi (backpressure).
+    """
+
+    def __init__(self, dp: Dispatcher, bot: Bot, workers: int = 4, maxsize: int = 1000) -> None:
+        self.dp = dp
+        self.bot = bot
+        self.workers = workers
+        self._queue: "asyncio.Queue[Update]" = asyncio.Queue(maxsize=maxsize)
+        self._tasks: List[asyncio.Task] = []
+
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+
+    def put(self, update: Update) -> bool:
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            log.warning(f"Update navbati to'la ({self._queue.maxsize}), update {update.update_id} rad etildi")
+            return False
+        self.accepted += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dp.feed_update(self.bot, update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                log.exception(f"Update {update.update_id} ni qayta ishlashda xato")
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f"update-worker-{i}"))
+
+    async def stop(self, timeout: Optional[float] = 10.0) -> int:
+        """
+        Navbatdagi update'larni ``timeout`` soniyagacha qayta ishlab, worker'larni to'xtatadi.
+
+        :return: Tugallanmay qolgan (navbatdagi va bekor qilingan) update'lar soni.
+        """
+        dropped = 0
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            dropped = self.accepted - self.processed - self.failed
+            log.warning(f"{dropped} ta update qayta ishlanmay qoldi (navbatda {self._queue.qsize()} ta)")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        return dropped
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+        }
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from config import Config
+from services.lifecycle import Lifecycle
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+    from infrastructure.http_pool import HttpPool
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+
+class AppContainer:
+    """
+    Ilova bog'liqliklari konteyneri: konfiguratsiya va tashqi klientlar (OpenAI, Postgres).
+
+    Import paytida hech narsa yaratilmaydi — klient birinchi murojaatda (odatda router
+    startup hookida) quriladi, og'ir kutubxonalar (openai, sqlalchemy) ham shunda import
+    qilinadi. Konteyner dispatcher workflow_data orqali (``dp["container"]``) uzatiladi.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.lifecycle = Lifecycle(drain_timeout=config.misc.drain_timeout)
+        self._openai: Optional[AsyncOpenAI] = None
+        self._db_engine: Optional[AsyncEngine] = None
+        self._session_pool: Optional[async_sessionmaker] = None
+
+    @property
+    def http_pool(self) -> HttpPool:
+        """Tashqi HTTP ulanishlar puli (``Config.http`` sozlamalari bilan)."""
+        from infrastructure.http_pool import get_http_pool
+
+        return get_http_pool(self.config.http)
+
+    @property
+    def openai(self) -> AsyncOpenAI:
+        if self._openai is None:
+            from openai import AsyncOpenAI
+
+            api_key = self.config.openai.api_key
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY .env da topilmadi")
+            # SDK ichidagi retry o'chirilgan: qayta urinishlar OAI_LIMITER slotini bo'shatib, handlerda qilinadi
+            self._openai = AsyncOpenAI(api_key=api_key, max_retries=0, http_client=self.http_pool.openai_client())
+        return self._openai
+
+    @property
+    def db_engine(self) -> Optional[AsyncEngine]:
+        """Baza sozlanmagan bo'lsa None."""
+        if self._db_engine is None and self.config.db is not None:
+            from infrastructure.database.setup import create_engine
+
+            self._db_engine = create_engine(self.config.db)
+        return self._db_engine
+
+    @property
+    def session_pool(self) -> Optional[async_sessionmaker]:
+        if self._session_pool is None and self.db_engine is not None:
+            from infrastructure.database.setup import create_session_pool
+
+            self._session_pool = create_session_pool(self.db_engine)
+        return self._session_pool
+
+    async def close(self) -> None:
+        """Yaratilgan klientlarni yopadi (yaratilmaganlariga tegmaydi). Drain'dan keyin chaqiriladi."""
+        from infrastructure.http_pool import close_http_pool
+
+        # OpenAI'ning HTTP klienti umumiy pulga tegishli — uni close_http_pool yopadi
+        self._openai = None
+        if self._db_engine is not None:
+            await self._db_engine.dispose()
+            self._db_engine = None
+            self._session_pool = None
+        await close_http_pool()
+        logging.info("Ilova klientlari yopildi")
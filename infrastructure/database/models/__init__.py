@@ -1,2 +1,4 @@
 from .base import Base
 from .users import User
+from .messages import Message
+from .group_settings import GroupSettings
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BIGINT, Integer, String, Text
+from sqlalchemy.dialects.postgresql import TIMESTAMP
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql.functions import func
+
+from .base import Base
+
+
+class GroupSettings(Base):
+    """
+    Guruh bo'yicha sozlamalar. NULL maydon — umumiy (env) qiymat ishlatiladi.
+    O'zgarishlar ``group_settings`` kanaliga NOTIFY qilinadi (migratsiyadagi trigger).
+    """
+
+    __tablename__ = "group_settings"
+
+    chat_id: Mapped[int] = mapped_column(BIGINT, primary_key=True, autoincrement=False)
+    user_rate_window: Mapped[Optional[int]] = mapped_column(Integer)
+    group_cooldown_min: Mapped[Optional[int]] = mapped_column(Integer)
+    group_cooldown_max: Mapped[Optional[int]] = mapped_column(Integer)
+    ustoz_username: Mapped[Optional[str]] = mapped_column(String(64))
+    system_prompt: Mapped[Optional[str]] = mapped_column(Text)
+    updated_at: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<GroupSettings {self.chat_id}>"
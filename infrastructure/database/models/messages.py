@@ -0,0 +1,26 @@
+from typing import Optional
+
+from sqlalchemy import BIGINT, Index, Integer, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, TableNameMixin
+
+
+class Message(Base, TimestampMixin, TableNameMixin):
+    """Bot javoblari jurnali: savol, javob, token sarfi va kechikish (tahlil uchun)."""
+
+    id: Mapped[int] = mapped_column(BIGINT, primary_key=True, autoincrement=True)
+    chat_id: Mapped[int] = mapped_column(BIGINT)
+    user_id: Mapped[Optional[int]] = mapped_column(BIGINT)
+    prompt: Mapped[str] = mapped_column(Text)
+    answer: Mapped[str] = mapped_column(Text)
+    tier: Mapped[str] = mapped_column(String(16))
+    model: Mapped[Optional[str]] = mapped_column(String(64))
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(Integer)
+    completion_tokens: Mapped[Optional[int]] = mapped_column(Integer)
+    latency_ms: Mapped[int] = mapped_column(Integer)
+
+    __table_args__ = (Index("ix_messages_chat_id_created_at", "chat_id", "created_at"),)
+
+    def __repr__(self):
+        return f"<Message {self.id} chat={self.chat_id} tier={self.tier}>"
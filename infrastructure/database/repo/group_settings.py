@@ -0,0 +1,45 @@
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.functions import func
+
+from infrastructure.database.models import GroupSettings
+from infrastructure.database.repo.base import BaseRepo
+
+
+class GroupSettingsRepo(BaseRepo):
+    async def get_all(self) -> Sequence[GroupSettings]:
+        """
+        Returns overrides of all groups (used to warm the in-memory policy cache).
+        """
+        result = await self.session.execute(select(GroupSettings))
+        return result.scalars().all()
+
+    async def get(self, chat_id: int) -> Optional[GroupSettings]:
+        """
+        Returns the overrides of a single group, None if the group uses defaults.
+        :param chat_id: The group's chat ID.
+        """
+        return await self.session.get(GroupSettings, chat_id)
+
+    async def upsert(self, chat_id: int, **fields: Any) -> GroupSettings:
+        """
+        Creates or updates group overrides. Pass None to reset a field to the default.
+        :param chat_id: The group's chat ID.
+        :param fields: GroupSettings column values.
+        :return: GroupSettings object.
+        """
+        insert_stmt = (
+            insert(GroupSettings)
+            .values(chat_id=chat_id, **fields)
+            .on_conflict_do_update(
+                index_elements=[GroupSettings.chat_id],
+                set_=dict(fields, updated_at=func.now()),
+            )
+            .returning(GroupSettings)
+        )
+        result = await self.session.execute(insert_stmt)
+
+        await self.session.commit()
+        return result.scalar_one()
@@ -0,0 +1,22 @@
+from typing import Any, Mapping, Sequence
+
+from sqlalchemy import insert
+
+from infrastructure.database.models import Message
+from infrastructure.database.repo.base import BaseRepo
+
+
+class MessageRepo(BaseRepo):
+    async def insert_many(self, rows: Sequence[Mapping[str, Any]]) -> int:
+        """
+        Inserts a batch of message log rows with a single multi-row INSERT.
+        :param rows: Rows with the Message column names as keys.
+        :return: Number of rows sent to the database.
+        """
+        if not rows:
+            return 0
+
+        await self.session.execute(insert(Message).values(list(rows)))
+
+        await self.session.commit()
+        return len(rows)
@@ -2,6 +2,8 @@ from dataclasses import dataclass
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from infrastructure.database.repo.group_settings import GroupSettingsRepo
+from infrastructure.database.repo.messages import MessageRepo
 from infrastructure.database.repo.users import UserRepo
 from infrastructure.database.setup import create_engine
 
@@ -23,6 +25,20 @@ class RequestsRepo:
         """
         return UserRepo(self.session)
 
+    @property
+    def messages(self) -> MessageRepo:
+        """
+        The Message repository is used for the conversation/analytics log.
+        """
+        return MessageRepo(self.session)
+
+    @property
+    def group_settings(self) -> GroupSettingsRepo:
+        """
+        The GroupSettings repository holds per-group policy overrides.
+        """
+        return GroupSettingsRepo(self.session)
+
 
 if __name__ == "__main__":
     from infrastructure.database.setup import create_session_pool
@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import Optional, Sequence, Mapping, Any
 
+from sqlalchemy import update
 from sqlalchemy.dialects.postgresql import insert
 
 from infrastructure.database.models import User
@@ -44,3 +45,43 @@ class UserRepo(BaseRepo):
 
         await self.session.commit()
         return result.scalar_one()
+
+    async def upsert_users(self, users: Sequence[Mapping[str, Any]]) -> int:
+        """
+        Bulk upserts users with a single multi-row INSERT ... ON CONFLICT DO UPDATE.
+        :param users: Rows with user_id, full_name, language and username keys.
+        :return: Number of rows sent to the database.
+        """
+        if not users:
+            return 0
+
+        insert_stmt = insert(User).values(list(users))
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[User.user_id],
+            set_=dict(
+                username=insert_stmt.excluded.username,
+                full_name=insert_stmt.excluded.full_name,
+            ),
+        )
+        await self.session.execute(insert_stmt)
+
+        await self.session.commit()
+        return len(users)
+
+    async def set_inactive(self, user_ids: Sequence[int]) -> int:
+        """
+        Marks users as inactive (e.g. they blocked the bot).
+        :param user_ids: IDs of the users to deactivate.
+        :return: Number of updated rows.
+        """
+        if not user_ids:
+            return 0
+
+        result = await self.session.execute(
+            update(User)
+            .where(User.user_id.in_(list(user_ids)), User.active.is_(True))
+            .values(active=False)
+        )
+
+        await self.session.commit()
+        return result.rowcount
@@ -0,0 +1,287 @@
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, cast
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import ResponseError
+
+from services.ttl_store import TTLStore
+
+log = logging.getLogger(__name__)
+
+# Keyspace hodisalari: K — keyspace kanali, g — DEL/EXPIRE, $ — SET, x — muddati o'tganlar
+KEYSPACE_FLAGS = "Kg$x"
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Izchil (consistent) xeshlash halqasi: har bir tugun ``replicas`` ta virtual nuqtaga ega.
+    Tugun qo'shilsa/olib tashlansa kalitlarning faqat ~1/N qismi boshqa tugunga ko'chadi.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 128) -> None:
+        points = sorted((_hash(f"{node}#{i}"), index) for index, node in enumerate(nodes) for i in range(replicas))
+        self._hashes = [point for point, _ in points]
+        self._nodes = [index for _, index in points]
+
+    def node(self, key: str) -> int:
+        """Kalit tushadigan tugun indeksi."""
+        position = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[position]
+
+
+class ShardedRedisStorage(BaseStorage):
+    """
+    aiogram FSM storage: bir nechta Redis instansiyasi (izchil xeshlash) + jarayon ichidagi
+    read-through kesh.
+
+    - Bir kalitning state va data yozuvlari bitta shardda — ikkalasi bitta ``MGET`` bilan
+      (bitta round-trip) o'qiladi va keshga tushadi; keyingi ``get_state``/``get_data``
+      Redis'ga bormaydi. Yozuvlar keshni ham yangilaydi (write-through).
+    - Boshqa jarayonlar yozganda kesh keyspace notification'lar orqali tozalanadi; shu
+      jarayonning o'z yozuvlari haqidagi hodisalar kutiladi va o'tkazib yuboriladi (kesh
+      write-through bilan allaqachon yangi). Redis ularni yoqishga ruxsat bermasa
+      (``CONFIG SET`` taqiqlangan) yoki obuna uzilsa, kesh yozuvlari ``stale_ttl`` soniyadan ortiq yashamaydi.
+    - Kalitlar ``RedisStorage`` bilan bir xil (``DefaultKeyBuilder``) — bitta shardli
+      sozlamada mavjud FSM ma'lumotlari saqlanib qoladi.
+    """
+
+    def __init__(
+            self,
+            shards: Sequence[Redis],
+            key_builder: Optional[KeyBuilder] = None,
+            cache_size: int = 10_000,
+            cache_ttl: float = 60.0,
+            stale_ttl: float = 1.0,
+            own_write_ttl: float = 5.0,
+            state_ttl: Optional[int] = None,
+            data_ttl: Optional[int] = None,
+    ) -> None:
+        if not shards:
+            raise ValueError("Kamida bitta Redis shard kerak")
+        self.shards = list(shards)
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self.cache_ttl = cache_ttl
+        self.stale_ttl = stale_ttl
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+        self._ring = HashRing([str(index) for index in range(len(self.shards))])
+        # asosiy kalit -> (state, data JSON) — data satr holida: har o'qishda yangi dict qaytadi
+        self._cache: TTLStore[Tuple[Optional[str], Optional[str]]] = TTLStore(cache_size, cache_ttl)
+        self._listeners: List[asyncio.Task] = []
+        self._subscribed = [False] * len(self.shards)
+        # Redis'dan o'qilayotgan kalitlar: asosiy kalit -> [avlod, o'quvchilar soni].
+        # Kalit o'zgarsa avlod oshadi — o'qish paytida eskirgan javob keshga yozilmaydi
+        self._loading: Dict[str, List[int]] = {}
+        # O'zimiz yozgan kalitlar: to'liq kalit -> hali kelmagan keyspace hodisalari soni.
+        # Hodisa kelmay qolsa (uzilish) belgi ``own_write_ttl`` dan keyin o'chadi
+        self._own_writes: TTLStore[int] = TTLStore(cache_size, own_write_ttl)
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.own_events = 0
+
+    @classmethod
+    def from_urls(cls, urls: Sequence[str], **kwargs: Any) -> "ShardedRedisStorage":
+        shards = [Redis(connection_pool=ConnectionPool.from_url(url)) for url in urls]
+        return cls(shards, **kwargs)
+
+    # ---------------------- Kalitlar va shardlar ----------------------
+    def _keys(self, key: StorageKey) -> Tuple[str, str, str]:
+        """(asosiy kalit, state kaliti, data kaliti)"""
+        state_key = self.key_builder.build(key, "state")
+        return state_key.rsplit(":", 1)[0], state_key, self.key_builder.build(key, "data")
+
+    def _shard(self, key: StorageKey) -> Redis:
+        # Chat bo'yicha: bitta chatdagi barcha foydalanuvchilar bitta shardda
+        return self.shards[self._ring.node(f"{key.bot_id}:{key.chat_id}")]
+
+    def _ttl(self) -> float:
+        return self.cache_ttl if all(self._subscribed) else min(self.cache_ttl, self.stale_ttl)
+
+    # ---------------------- Kesh invalidatsiyasi ----------------------
+    def _changed(self, base: str) -> None:
+        """Kalit o'zgardi: shu kalitni o'qiyotganlar natijasini keshga yozmaydi."""
+        loading = self._loading.get(base)
+        if loading is not None:
+            loading[0] += 1
+
+    def _expect(self, redis_key: str, events: int) -> None:
+        """O'zimizning yozuvimizdan keladigan keyspace hodisalari sonini qayd qiladi."""
+        if not self._listeners:
+            return
+        pending = (self._own_writes.get(redis_key) or 0) + events
+        if pending > 0:
+            self._own_writes.set(redis_key, pending)
+        else:
+            self._own_writes.pop(redis_key)
+
+    def _own_event(self, redis_key: str) -> bool:
+        pending = self._own_writes.get(redis_key)
+        if not pending:
+            return False
+        self._expect(redis_key, -1)
+        return True
+
+    def _ensure_listeners(self) -> None:
+        if self._listeners or self.cache_ttl <= self.stale_ttl:
+            return
+        for index, shard in enumerate(self.shards):
+            self._listeners.append(asyncio.create_task(self._listen(index, shard), name=f"fsm-invalidate-{index}"))
+
+    async def _listen(self, index: int, shard: Redis) -> None:
+        db = shard.connection_pool.connection_kwargs.get("db", 0)
+        prefix = f"__keyspace@{db}__:"
+        backoff = 1.0
+        while True:
+            pubsub = shard.pubsub()
+            try:
+                try:
+                    flags = (await shard.config_get("notify-keyspace-events")).get("notify-keyspace-events", "")
+                    missing = "".join(flag for flag in KEYSPACE_FLAGS if flag not in flags)
+                    if missing:
+                        await shard.config_set("notify-keyspace-events", flags + missing)
+                except ResponseError as e:
+                    log.warning(f"FSM shard {index}: keyspace notification yoqilmadi ({e}), kesh {self.stale_ttl} s bilan")
+                    return
+                await pubsub.psubscribe(f"{prefix}{getattr(self.key_builder, 'prefix', 'fsm')}:*")
+                self._subscribed[index] = True
+                backoff = 1.0
+                async for message in pubsub.listen():
+                    # "expire" faqat muddatni o'zgartiradi (SET ... EX ham yuboradi) — qiymat o'sha
+                    if message["type"] != "pmessage" or message["data"] in (b"expire", "expire"):
+                        continue
+                    channel = message["channel"]
+                    if isinstance(channel, bytes):
+                        channel = channel.decode()
+                    redis_key = channel[len(prefix):]
+                    if self._own_event(redis_key):
+                        self.own_events += 1
+                        continue
+                    base = redis_key.rsplit(":", 1)[0]
+                    self._changed(base)
+                    if self._cache.pop(base) is not None:
+                        self.invalidations += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"FSM shard {index}: keyspace obunasi uzildi ({e}), {backoff:.0f} s dan keyin qayta ulanadi")
+            finally:
+                self._subscribed[index] = False
+                await pubsub.aclose()
+            # Uzilish paytidagi o'zgarishlar ko'rinmadi — kesh ishonchsiz
+            for loading in self._loading.values():
+                loading[0] += 1
+            self._cache = TTLStore(self._cache.max_entries, self.cache_ttl)
+            self._own_writes = TTLStore(self._own_writes.max_entries, self._own_writes.ttl)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    # ---------------------- O'qish ----------------------
+    async def _load(self, key: StorageKey) -> Tuple[Optional[str], Optional[str]]:
+        base, state_key, data_key = self._keys(key)
+        cached = self._cache.get(base)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        self._ensure_listeners()
+        loading = self._loading.get(base)
+        if loading is None:
+            loading = self._loading[base] = [0, 0]
+        generation = loading[0]
+        loading[1] += 1
+        try:
+            state, data = await self._shard(key).mget(state_key, data_key)
+        finally:
+            loading[1] -= 1
+            if not loading[1]:
+                del self._loading[base]
+        entry = (
+            state.decode() if isinstance(state, bytes) else state,
+            data.decode() if isinstance(data, bytes) else data,
+        )
+        if generation == loading[0]:
+            self._cache.set(base, entry, self._ttl())
+        return entry
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(key)
+        return state
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(key)
+        if data is None:
+            return {}
+        return cast(Dict[str, Any], json.loads(data))
+
+    # ---------------------- Yozish ----------------------
+    async def _write(self, key: StorageKey, redis_key: str, value: Optional[str], ttl: Optional[int]) -> None:
+        """SET (``ex=ttl`` bilan) yoki ``value`` None bo'lsa DEL; o'z hodisalarimiz oldindan qayd qilinadi."""
+        shard = self._shard(key)
+        # SET -> "set"; DEL -> "del" (faqat kalit bo'lgan bo'lsa)
+        self._expect(redis_key, 1)
+        try:
+            if value is None:
+                if not await shard.delete(redis_key):
+                    self._expect(redis_key, -1)
+            else:
+                await shard.set(redis_key, value, ex=ttl)
+        except BaseException:
+            self._own_writes.pop(redis_key)
+            raise
+
+    def _write_through(self, base: str, state: Any = ..., data: Any = ...) -> None:
+        self._changed(base)
+        cached = self._cache.get(base)
+        if cached is None:
+            # Ikkinchi qism noma'lum — keyingi o'qish Redis'dan to'liq oladi
+            return
+        entry = (state if state is not ... else cached[0], data if data is not ... else cached[1])
+        self._cache.set(base, entry, self._ttl())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        base, state_key, _ = self._keys(key)
+        value = cast(Optional[str], state.state if isinstance(state, State) else state)
+        await self._write(key, state_key, value, self.state_ttl)
+        self._write_through(base, state=value)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        base, _, data_key = self._keys(key)
+        raw = json.dumps(data) if data else None
+        await self._write(key, data_key, raw, self.data_ttl)
+        self._write_through(base, data=raw)
+
+    async def close(self) -> None:
+        for task in self._listeners:
+            task.cancel()
+        await asyncio.gather(*self._listeners, return_exceptions=True)
+        self._listeners.clear()
+        for shard in self.shards:
+            await shard.aclose(close_connection_pool=True)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "shards": len(self.shards),
+            "subscribed": sum(self._subscribed),
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+            "invalidations": self.invalidations,
+            "own_events": self.own_events,
+        }
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import importlib.util
+import logging
+import ssl
+import weakref
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+import certifi
+import httpx
+from aiohttp import ClientSession, TCPConnector, TraceConfig
+
+from config import HttpPoolConfig
+
+if TYPE_CHECKING:
+    from yarl import URL
+
+
+@lru_cache(maxsize=1)
+def shared_ssl_context() -> ssl.SSLContext:
+    """Sertifikatlari tekshiriladigan (certifi) yagona SSL konteksti — barcha ulanishlar uchun."""
+    return ssl.create_default_context(cafile=certifi.where())
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """httpx transporti: band ulanishlar va pul to'lib qolgan holatlarni sanaydi."""
+
+    def __init__(self, max_connections: int, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.saturated = 0
+        self.requests = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.in_flight >= self.max_connections:
+            self.saturated += 1
+        self.in_flight += 1
+        self.requests += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        # Ulanish javob tanasi o'qib bo'lingach bo'shaydi (stream javoblar ham)
+        original_close = response.stream.aclose
+
+        async def aclose() -> None:
+            try:
+                await original_close()
+            finally:
+                self.in_flight -= 1
+
+        response.stream.aclose = aclose
+        return response
+
+    def open_connections(self) -> int:
+        return len(self._pool.connections)
+
+
+class HttpPool:
+    """
+    Tashqi HTTP so'rovlar uchun umumiy, keep-alive ulanishlar puli.
+
+    - aiohttp: bitta ``TCPConnector`` (host bo'yicha limit, DNS kesh) — ``BaseClient`` sessiyalari
+      uni ``connector_owner=False`` bilan bo'lishadi;
+    - httpx: OpenAI klienti uchun alohida pul (``HTTP2=true`` va h2 o'rnatilgan bo'lsa HTTP/2);
+    - ikkalasi ham bitta tekshiriladigan SSL kontekstidan foydalanadi.
+    """
+
+    def __init__(self, config: HttpPoolConfig) -> None:
+        self.config = config
+        self._connector: Optional[TCPConnector] = None
+        self._transport: Optional[_CountingTransport] = None
+        self._openai_client: Optional[httpx.AsyncClient] = None
+        # Berilgan sessiyalar: egasi yopmagan bo'lsa, pul yopilganda yopiladi
+        self._sessions: "weakref.WeakSet[ClientSession]" = weakref.WeakSet()
+
+        self.aiohttp_stats: Dict[str, int] = {
+            "connections_created": 0,
+            "connections_reused": 0,
+            "queued": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    def _trace_config(self) -> TraceConfig:
+        trace = TraceConfig()
+
+        def counter(name: str):
+            async def on_event(session, context, params) -> None:
+                self.aiohttp_stats[name] += 1
+            return on_event
+
+        trace.on_connection_create_end.append(counter("connections_created"))
+        trace.on_connection_reuseconn.append(counter("connections_reused"))
+        trace.on_connection_queued_start.append(counter("queued"))
+        trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace
+
+    def connector(self) -> TCPConnector:
+        """Umumiy connector (event loop ichida, birinchi chaqiruvda yaratiladi)."""
+        if self._connector is None or self._connector.closed:
+            self._connector = TCPConnector(
+                ssl=shared_ssl_context(),
+                limit=self.config.limit,
+                limit_per_host=self.config.limit_per_host,
+                keepalive_timeout=self.config.keepalive_timeout,
+                ttl_dns_cache=self.config.dns_ttl,
+            )
+        return self._connector
+
+    def session(self, base_url: str | URL | None = None, **kwargs: Any) -> ClientSession:
+        """Umumiy connector ustidagi yangi ``ClientSession`` (yopilganda connector yopilmaydi)."""
+        session = ClientSession(
+            base_url=base_url,
+            connector=self.connector(),
+            connector_owner=False,
+            trace_configs=[self._trace_config()],
+            **kwargs,
+        )
+        self._sessions.add(session)
+        return session
+
+    def openai_client(self) -> httpx.AsyncClient:
+        """``AsyncOpenAI(http_client=...)`` uchun umumiy httpx klienti."""
+        if self._openai_client is None:
+            from openai import DefaultAsyncHttpxClient
+
+            http2 = self.config.http2 and http2_available()
+            if self.config.http2 and not http2:
+                logging.warning("HTTP2 yoqilgan, lekin h2 paketi o'rnatilmagan (pip install h2) — HTTP/1.1")
+            self._transport = _CountingTransport(
+                max_connections=self.config.limit_per_host,
+                verify=shared_ssl_context(),
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.config.limit_per_host,
+                    max_keepalive_connections=self.config.limit_per_host,
+                    keepalive_expiry=self.config.keepalive_timeout,
+                ),
+            )
+            self._openai_client = DefaultAsyncHttpxClient(transport=self._transport)
+            logging.info(f"OpenAI HTTP puli: {self.config.limit_per_host} ulanish, HTTP/2={'ha' if http2 else 'yoq'}")
+        return self._openai_client
+
+    def stats(self) -> Dict[str, int]:
+        data = dict(self.aiohttp_stats)
+        if self._transport is not None:
+            data.update(
+                openai_in_flight=self._transport.in_flight,
+                openai_peak_in_flight=self._transport.peak_in_flight,
+                openai_saturated=self._transport.saturated,
+                openai_requests=self._transport.requests,
+                openai_open_connections=self._transport.open_connections(),
+            )
+        return data
+
+    async def close(self) -> None:
+        for session in list(self._sessions):
+            if not session.closed:
+                await session.close()
+        self._sessions.clear()
+        if self._openai_client is not None:
+            await self._openai_client.aclose()
+            self._openai_client = None
+            self._transport = None
+        if self._connector is not None and not self._connector.closed:
+            await self._connector.close()
+        self._connector = None
+
+
+_pool: Optional[HttpPool] = None
+
+
+def get_http_pool(config: Optional[HttpPoolConfig] = None) -> HttpPool:
+    """
+    Jarayon bo'yicha yagona pul. Birinchi chaqiruv uni quradi: ``config`` (odatda
+    ``AppContainer`` dan ``Config.http``) yoki u berilmasa ``HTTP_*`` muhit o'zgaruvchilari.
+    """
+    global _pool
+    if _pool is None:
+        from services.metrics import METRICS
+
+        if config is None:
+            from environs import Env
+
+            config = HttpPoolConfig.from_env(Env())
+        _pool = HttpPool(config)
+        METRICS.gauge("http_pool", "Tashqi HTTP ulanishlar puli holati", _pool.stats)
+    return _pool
+
+
+async def close_http_pool() -> None:
+    if _pool is not None:
+        await _pool.close()
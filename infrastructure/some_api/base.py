@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import asyncio
 import logging
-import ssl
 from typing import TYPE_CHECKING, Any
 
 import backoff
-from aiohttp import ClientError, ClientSession, TCPConnector, FormData
+from aiohttp import ClientError, ClientSession, FormData
 from ujson import dumps, loads
 
+from infrastructure.http_pool import get_http_pool
+
 if TYPE_CHECKING:
     from collections.abc import Mapping
 
@@ -25,13 +26,10 @@ class BaseClient:
         self.log = logging.getLogger(self.__class__.__name__)
 
     async def _get_session(self) -> ClientSession:
-        """Get aiohttp session with cache."""
-        if self._session is None:
-            ssl_context = ssl.SSLContext()
-            connector = TCPConnector(ssl_context=ssl_context)
-            self._session = ClientSession(
+        """Get aiohttp session with cache (on top of the shared keep-alive connector)."""
+        if self._session is None or self._session.closed:
+            self._session = get_http_pool().session(
                 base_url=self._base_url,
-                connector=connector,
                 json_serialize=dumps,
             )
 
@@ -1,14 +1,16 @@
-from typing import Callable, Dict, Any, Awaitable
+from typing import Callable, Dict, Any, Awaitable, Optional
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
 from infrastructure.database.repo.requests import RequestsRepo
+from services.user_writer import UserWriteBehind, UserSnapshot
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    def __init__(self, session_pool) -> None:
+    def __init__(self, session_pool, user_writer: Optional[UserWriteBehind] = None) -> None:
         self.session_pool = session_pool
+        self.user_writer = user_writer
 
     async def __call__(
         self,
@@ -19,12 +21,23 @@ class DatabaseMiddleware(BaseMiddleware):
         async with self.session_pool() as session:
             repo = RequestsRepo(session)
 
-            user = await repo.users.get_or_create_user(
-                event.from_user.id,
-                event.from_user.full_name,
-                event.from_user.language_code,
-                event.from_user.username
-            )
+            if self.user_writer is not None:
+                # Write-behind rejimi: bazaga yozish fon vazifasida, paketlab
+                user = self.user_writer.seen(
+                    UserSnapshot(
+                        user_id=event.from_user.id,
+                        full_name=event.from_user.full_name,
+                        language=event.from_user.language_code or "en",
+                        username=event.from_user.username,
+                    )
+                )
+            else:
+                user = await repo.users.get_or_create_user(
+                    event.from_user.id,
+                    event.from_user.full_name,
+                    event.from_user.language_code,
+                    event.from_user.username
+                )
 
             data["session"] = session
             data["repo"] = repo
@@ -0,0 +1,28 @@
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from services.lifecycle import Lifecycle
+
+
+class LifecycleMiddleware(BaseMiddleware):
+    """
+    Update darajasidagi outer middleware: har bir update'ni ``Lifecycle`` da bajarilayotgan
+    ish sifatida ro'yxatga oladi. To'xtatish boshlangach yangi update'lar handlerga yetmaydi.
+    """
+
+    def __init__(self, lifecycle: Lifecycle) -> None:
+        self.lifecycle = lifecycle
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if self.lifecycle.draining:
+            self.lifecycle.reject()
+            return None
+        async with self.lifecycle.track("update"):
+            return await handler(event, data)
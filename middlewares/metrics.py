@@ -0,0 +1,65 @@
+import time
+from typing import Callable, Dict, Any, Awaitable
+
+from aiogram import BaseMiddleware
+from aiogram.types import Message, CallbackQuery
+
+from services.metrics import STAGE_SECONDS, UPDATE_SECONDS, UPDATES_TOTAL
+
+
+def _event_type(event) -> str:
+    if isinstance(event, Message):
+        return "message"
+    if isinstance(event, CallbackQuery):
+        return "callback_query"
+    return type(event).__name__.lower()
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """
+    Outer middleware: update'ni to'liq qayta ishlash vaqtini (filtrlar + handler) o'lchaydi.
+    ``HandlerTimingMiddleware`` bilan birga filtrlar vaqti alohida ajratiladi.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        timing: Dict[str, float] = {}
+        data["metrics_timing"] = timing
+        event_type = _event_type(event)
+        status = "ok"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            total = time.perf_counter() - started
+            UPDATE_SECONDS.observe(total, event=event_type)
+            UPDATES_TOTAL.inc(event=event_type, status=status)
+            handler_time = timing.get("handler")
+            STAGE_SECONDS.observe(total - (handler_time or 0.0), stage="filters")
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """Inner middleware: faqat handler ishlagan vaqtni yozadi (filtrlar o'tgandan keyin)."""
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            elapsed = time.perf_counter() - started
+            timing = data.get("metrics_timing")
+            if timing is not None:
+                timing["handler"] = elapsed
+            STAGE_SECONDS.observe(elapsed, stage="handler")
@@ -0,0 +1,88 @@
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from aiogram import Bot
+
+from services.coalesce import SingleFlight
+
+
+class AdminCache:
+    """
+    Guruh adminlari ro'yxati uchun TTL kesh.
+
+    Har bir chat uchun ``get_chat_administrators`` natijasi ``ttl`` soniya saqlanadi.
+    Bir vaqtda kelgan bir xil so'rovlar bitta Bot API chaqiruviga birlashtiriladi
+    (single-flight), ``chat_member`` yangilanishlarida esa yozuv bekor qilinadi.
+    Bekor qilishdan oldin boshlangan so'rov natijasi keshga yozilmaydi (chat avlodi o'zgaradi).
+    """
+
+    def __init__(self, ttl: float = 300.0) -> None:
+        self.ttl = ttl
+        self._entries: Dict[int, Tuple[float, Set[int]]] = {}
+        self._flight: SingleFlight[Set[int]] = SingleFlight()
+        # chat -> avlod: ``invalidate`` da oshadi; umumiy tozalashda ``_epoch`` oshadi
+        self._generations: Dict[int, int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.api_calls = 0
+
+    async def get(self, bot: Bot, chat_id: int) -> Set[int]:
+        """
+        Chat adminlari ID larini qaytaradi (keshdan yoki Bot API orqali).
+
+        :param bot: Bot obyekti.
+        :param chat_id: Guruh ID si.
+        :return: Admin user_id lar to'plami.
+        """
+        entry = self._entries.get(chat_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        generation = self._generation(chat_id)
+        # Avlod kalitda: bekor qilingandan keyingi so'rov eski (eskirgan) so'rovga qo'shilmaydi
+        admin_ids, shared = await self._flight.do(
+            (chat_id, generation), lambda: self._fetch(bot, chat_id, generation),
+        )
+        if shared:
+            # Xuddi shu chat uchun so'rov allaqachon ketgan edi — uning natijasi olindi
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return admin_ids
+
+    def _generation(self, chat_id: int) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(chat_id, 0)
+
+    async def _fetch(self, bot: Bot, chat_id: int, generation: Tuple[int, int]) -> Set[int]:
+        self.api_calls += 1
+        admins = await bot.get_chat_administrators(chat_id)
+        admin_ids = {adm.user.id for adm in admins}
+        if self._generation(chat_id) == generation:
+            self._entries[chat_id] = (time.monotonic() + self.ttl, admin_ids)
+        return admin_ids
+
+    def invalidate(self, chat_id: Optional[int] = None) -> None:
+        """
+        Keshdagi yozuvni o'chiradi. ``chat_id`` berilmasa — butun kesh tozalanadi.
+        """
+        if chat_id is None:
+            self._entries.clear()
+            self._generations.clear()
+            self._epoch += 1
+        else:
+            self._entries.pop(chat_id, None)
+            self._generations[chat_id] = self._generations.get(chat_id, 0) + 1
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "api_calls": self.api_calls,
+            "hit_ratio": ((self.hits + self.coalesced) / total) if total else 0.0,
+            "entries": len(self._entries),
+        }
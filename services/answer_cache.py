@@ -0,0 +1,138 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Pattern, Tuple
+
+PUNCT_RE = re.compile(r"[^\w\s]+", re.U)
+SPACE_RE = re.compile(r"\s+", re.U)
+
+
+def normalize_prompt(text: str, topics_re: Optional[Pattern] = None) -> str:
+    """
+    So'rovni kesh kaliti uchun normallashtiradi: kichik harf, tinish belgilari
+    va bo'shliqlar birlashtiriladi, IT kalit so'zlari alohida ajratiladi.
+
+    :param text: Foydalanuvchi so'rovi.
+    :param topics_re: Mavzu kalit so'zlari regex'i (masalan ALLOWED_TOPICS_RE).
+    :return: Normallashtirilgan matn.
+    """
+    low = (text or "").lower()
+    folded = SPACE_RE.sub(" ", PUNCT_RE.sub(" ", low)).strip()
+    if topics_re is None:
+        return folded
+    topics = sorted({m.group(0).lower() for m in topics_re.finditer(low)})
+    return f"{folded}|{','.join(topics)}"
+
+
+def make_cache_key(normalized: str, model: str, system_prompt: str) -> str:
+    system_hash = hashlib.sha1(system_prompt.encode()).hexdigest()[:12]
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"{model}:{system_hash}:{digest}"
+
+
+class MemoryAnswerBackend:
+    """Jarayon ichidagi LRU kesh; umumiy hajm ``max_bytes`` bilan cheklanadi."""
+
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[float, str, int]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value, size = entry
+        if expires <= time.monotonic():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        size = len(key) + len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.size -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisAnswerBackend:
+    """Bir nechta bot nusxasi o'rtasida umumiy Redis kesh."""
+
+    def __init__(self, dsn: str, prefix: str = "answer:") -> None:
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(dsn, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.redis.set(self.prefix + key, value, ex=max(1, int(ttl)))
+
+    async def close(self) -> None:
+        await self.redis.aclose()
+
+
+class AnswerCache:
+    """
+    ``chatgpt_answer`` oldidagi javob keshi. Takroriy savollarga tokensiz javob beradi.
+
+    Backend xatolari keshni "miss" deb hisoblaydi — kesh hech qachon javobni to'xtatmaydi.
+    """
+
+    def __init__(self, backend, ttl: float = 6 * 3600) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Javob keshidan o'qishda xato: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logging.warning(f"Javob keshiga yozishda xato: {e}")
+
+    async def close(self) -> None:
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            await close()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": (self.hits / total) if total else 0.0,
+        }
@@ -1,27 +1,104 @@
 import asyncio
+import json
 import logging
-from typing import Union
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
 from aiogram import Bot, exceptions
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from services.send_scheduler import PRIORITY_BULK, installed_scheduler, send_priority
 
-async def send_message(
+# Yuborish natijalari
+SENT = "sent"
+FAILED = "failed"
+BLOCKED = "blocked"
+RETRY = "retry"
+
+
+class TokenBucket:
+    """
+    Global token bucket: soniyasiga ``rate`` ta xabar, ``capacity`` gacha portlash.
+    ``pause`` — flood limitda (RetryAfter) butun oqimni to'xtatib turish uchun.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class BroadcastCheckpoint:
+    """
+    Har bir foydalanuvchi bo'yicha natija (sent/failed/blocked) saqlanadigan JSON fayl.
+    To'xtab qolgan broadcast qayta ishga tushirilganda tugallanganlar o'tkazib yuboriladi.
+    """
+
+    def __init__(self, path: str, save_every: int = 200) -> None:
+        self.path = path
+        self.save_every = save_every
+        self.status: Dict[str, str] = {}
+        self._dirty = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.status = json.load(f)
+
+    def done(self, user_id: Union[int, str]) -> bool:
+        return str(user_id) in self.status
+
+    def mark(self, user_id: Union[int, str], status: str) -> None:
+        self.status[str(user_id)] = status
+        self._dirty += 1
+        if self._dirty >= self.save_every:
+            self.save()
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.status, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = 0
+
+    def summary(self) -> Dict[str, int]:
+        result = {SENT: 0, FAILED: 0, BLOCKED: 0}
+        for status in self.status.values():
+            result[status] = result.get(status, 0) + 1
+        return result
+
+
+async def _send_once(
         bot: Bot,
         user_id: Union[int, str],
         text: str,
         disable_notification: bool = False,
         reply_markup: InlineKeyboardMarkup = None,
-) -> bool:
+) -> Tuple[str, float]:
     """
-    Xavfsiz xabar yuboruvchi funksiya.
-
-    :param bot: Bot obyekti.
-    :param user_id: Foydalanuvchi ID si (int yoki str formatida, str bo‘lsa faqat raqamlardan iborat bo‘lishi kerak).
-    :param text: Yuboriladigan xabar matni.
-    :param disable_notification: Bildirishnoma ovozsiz yuboriladimi (False - ovozli, True - ovozsiz).
-    :param reply_markup: Inline klaviatura (agar mavjud bo‘lsa).
-    :return: Xabar muvaffaqiyatli yuborilgan bo‘lsa True, aks holda False.
+    Bitta urinish. (natija, retry_after) qaytaradi; qayta urinishni chaqiruvchi hal qiladi.
     """
     try:
         # Xabarni chiroyli formatlash uchun Markdown ishlatamiz
@@ -33,23 +110,48 @@ async def send_message(
             reply_markup=reply_markup,
             parse_mode="Markdown"
         )
-    except exceptions.TelegramBadRequest as e:
+    except exceptions.TelegramBadRequest:
         logging.error(f"Telegram server xatosi: Chat topilmadi [ID:{user_id}]")
-        return False
+        return FAILED, 0
     except exceptions.TelegramForbiddenError:
         logging.error(f"Foydalanuvchi [ID:{user_id}]: TelegramForbiddenError - bot bloklangan yoki chat mavjud emas")
-        return False
+        return BLOCKED, 0
     except exceptions.TelegramRetryAfter as e:
         logging.error(f"Foydalanuvchi [ID:{user_id}]: Flood limit oshdi. {e.retry_after} soniya kuting.")
-        await asyncio.sleep(e.retry_after)
-        # Qayta urinish
-        return await send_message(bot, user_id, text, disable_notification, reply_markup)
+        return RETRY, e.retry_after
     except exceptions.TelegramAPIError:
         logging.exception(f"Foydalanuvchi [ID:{user_id}]: Telegram API xatosi")
-        return False
+        return FAILED, 0
     else:
-        logging.info(f"Foydalanuvchi [ID:{user_id}]: Xabar muvaffaqiyatli yuborildi")
-        return True
+        logging.debug(f"Foydalanuvchi [ID:{user_id}]: Xabar muvaffaqiyatli yuborildi")
+        return SENT, 0
+
+
+async def send_message(
+        bot: Bot,
+        user_id: Union[int, str],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+        max_attempts: int = 3,
+) -> bool:
+    """
+    Xavfsiz xabar yuboruvchi funksiya.
+
+    :param bot: Bot obyekti.
+    :param user_id: Foydalanuvchi ID si (int yoki str formatida, str bo‘lsa faqat raqamlardan iborat bo‘lishi kerak).
+    :param text: Yuboriladigan xabar matni.
+    :param disable_notification: Bildirishnoma ovozsiz yuboriladimi (False - ovozli, True - ovozsiz).
+    :param reply_markup: Inline klaviatura (agar mavjud bo‘lsa).
+    :param max_attempts: Flood limitda eng ko'pi bilan nechta urinish qilinadi.
+    :return: Xabar muvaffaqiyatli yuborilgan bo‘lsa True, aks holda False.
+    """
+    for _ in range(max_attempts):
+        status, retry_after = await _send_once(bot, user_id, text, disable_notification, reply_markup)
+        if status != RETRY:
+            return status == SENT
+        await asyncio.sleep(retry_after)
+    return False
 
 
 async def broadcast(
@@ -58,28 +160,140 @@ async def broadcast(
         text: str,
         disable_notification: bool = False,
         reply_markup: InlineKeyboardMarkup = None,
+        broadcast_id: Optional[str] = None,
+        checkpoint_dir: str = "broadcasts",
+        rate: float = 25,
+        per_chat_interval: float = 1.0,
+        concurrency: int = 8,
+        max_attempts: int = 3,
+        on_blocked: Optional[Callable[[List[int]], Awaitable[None]]] = None,
 ) -> int:
     """
     Ommaviy xabar yuboruvchi funksiya.
 
+    Xabarlar ``concurrency`` ta parallel yuboruvchi orqali yuboriladi.
+
+    Bot session'ida ``SendScheduler`` o'rnatilgan bo'lsa (``create_bot`` shunday qiladi),
+    tezlik, chat oralig'i va ``TelegramRetryAfter`` qayta urinishlari to'liq unga
+    qoldiriladi: xabarlar ``PRIORITY_BULK`` bilan javoblardan keyin navbatga turadi, ikkinchi
+    limit esa qo'yilmaydi. Rejalashtiruvchi o'z urinishlaridan keyin ham flood limit qaytarsa,
+    foydalanuvchi ``failed`` deb belgilanadi.
+
+    Rejalashtiruvchisiz botda o'zining global token bucket'i (soniyasiga ``rate`` ta —
+    ``SendScheduler`` bilan bir xil 25) va ``per_chat_interval`` ishlaydi; flood limitga
+    tushgan foydalanuvchi ``max_attempts`` gacha qayta urinish navbatiga qo'yiladi —
+    qolganlar to'xtab qolmaydi.
+
     :param bot: Bot obyekti.
     :param users: Foydalanuvchi ID lari ro‘yxati.
     :param text: Yuboriladigan xabar matni.
     :param disable_notification: Bildirishnoma ovozsiz yuboriladimi.
     :param reply_markup: Inline klaviatura (agar mavjud bo‘lsa).
+    :param broadcast_id: Berilsa — natijalar checkpoint faylga yoziladi va qayta ishga tushirilganda davom ettiriladi.
+    :param checkpoint_dir: Checkpoint fayllar papkasi.
+    :param rate: Global limit (xabar/soniya); faqat ``SendScheduler`` o'rnatilmaganda.
+    :param per_chat_interval: Bitta chatga ketma-ket xabarlar orasidagi minimal vaqt (s); ``rate`` kabi.
+    :param concurrency: Parallel yuboruvchilar soni.
+    :param max_attempts: Flood limitda har bir foydalanuvchi uchun urinishlar soni; ``rate`` kabi.
+    :param on_blocked: Botni bloklagan foydalanuvchilar ro'yxati bilan chaqiriladi (masalan, User.active = false).
     :return: Muvaffaqiyatli yuborilgan xabarlar soni.
     """
+    checkpoint = None
+    if broadcast_id:
+        checkpoint = BroadcastCheckpoint(os.path.join(checkpoint_dir, f"{broadcast_id}.json"))
+
+    # Rejalashtiruvchi bo'lsa, tezlik va RetryAfter uning ishi — ikkinchi bucket faqat limitni ikkilantiradi
+    bucket = TokenBucket(rate) if installed_scheduler(bot) is None else None
+    queue: "asyncio.Queue[Tuple[Union[int, str], int]]" = asyncio.Queue()
+    chat_next_at: Dict[Union[int, str], float] = {}
+    pending = 0
+    finished = asyncio.Event()
+    blocked: List[int] = []
     count = 0
+
+    for user_id in users:
+        if checkpoint is not None and checkpoint.done(user_id):
+            continue
+        queue.put_nowait((user_id, 1))
+        pending += 1
+    if checkpoint is not None and len(checkpoint.status):
+        logging.info(f"Broadcast {broadcast_id}: {len(checkpoint.status)} ta foydalanuvchi avvalroq yakunlangan, davom ettirilmoqda")
+
+    def complete(user_id: Union[int, str], status: str) -> None:
+        nonlocal pending, count
+        pending -= 1
+        if status == SENT:
+            count += 1
+        elif status == BLOCKED:
+            blocked.append(int(user_id))
+        if checkpoint is not None:
+            checkpoint.mark(user_id, status)
+        if pending == 0:
+            finished.set()
+
+    async def sender() -> None:
+        while True:
+            user_id, attempt = await queue.get()
+            try:
+                if bucket is not None:
+                    wait = chat_next_at.get(user_id, 0) - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    await bucket.acquire()
+                    chat_next_at[user_id] = time.monotonic() + per_chat_interval
+
+                status, retry_after = await _send_once(bot, user_id, text, disable_notification, reply_markup)
+            except Exception:
+                # Kutilmagan xato (masalan, tarmoq) yuboruvchini o'ldirmasin: aks holda ``finished`` hech qachon kelmaydi
+                logging.exception(f"Foydalanuvchi [ID:{user_id}]: xabar yuborishda kutilmagan xato")
+                status, retry_after = FAILED, 0
+            if status == RETRY and bucket is not None:
+                # Flood limit butun bot uchun — global oqimni ham to'xtatamiz
+                bucket.pause(retry_after)
+                if attempt < max_attempts:
+                    asyncio.get_running_loop().call_later(retry_after, queue.put_nowait, (user_id, attempt + 1))
+                    continue
+            if status == RETRY:
+                # Urinishlar tugadi (rejalashtiruvchi bo'lsa — u chatni to'xtatib, o'zi qayta urinib bo'lgan)
+                status = FAILED
+            complete(user_id, status)
+
+    if pending == 0:
+        finished.set()
+    # Ommaviy xabarlar Bot session navbatida javoblardan keyin turadi (kontekst vazifalarga o'tadi)
+    with send_priority(PRIORITY_BULK):
+        workers = [asyncio.create_task(sender()) for _ in range(concurrency)]
     try:
-        for user_id in users:
-            if await send_message(bot, user_id, text, disable_notification, reply_markup):
-                count += 1
-            await asyncio.sleep(0.05)  # Telegram cheklovi: soniyada 20 ta xabar
+        await finished.wait()
     finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if checkpoint is not None:
+            checkpoint.save()
         logging.info(f"{count} ta xabar muvaffaqiyatli yuborildi.")
+        if blocked and on_blocked is not None:
+            try:
+                await on_blocked(blocked)
+            except Exception:
+                logging.exception("Bloklagan foydalanuvchilarni belgilashda xato")
     return count
 
 
+def deactivate_users(session_pool) -> Callable[[List[int]], Awaitable[None]]:
+    """
+    ``broadcast(on_blocked=...)`` uchun callback: botni bloklaganlarni ``User.active = false`` qiladi.
+    """
+    from infrastructure.database.repo.requests import RequestsRepo
+
+    async def _deactivate(user_ids: List[int]) -> None:
+        async with session_pool() as session:
+            updated = await RequestsRepo(session).users.set_inactive(user_ids)
+        logging.info(f"{updated} ta foydalanuvchi nofaol deb belgilandi.")
+
+    return _deactivate
+
+
 # Qo‘shimcha: Inline klaviatura yaratish uchun misol
 def create_broadcast_keyboard():
     """Ommaviy xabar uchun inline klaviatura yaratadi."""
@@ -87,4 +301,4 @@ def create_broadcast_keyboard():
     keyboard.button(text="ℹ️ Batafsil ma'lumot", callback_data="more_info")
     keyboard.button(text="📞 Bog‘lanish", callback_data="contact")
     keyboard.adjust(2)
-    return keyboard.as_markup()
\ No newline at end of file
+    return keyboard.as_markup()
@@ -0,0 +1,117 @@
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, List, Optional, Tuple
+
+
+class QueueDropped(Exception):
+    """Chat navbati to'lgani uchun so'rov (eng eskisi) tashlab yuborildi."""
+
+
+class _Flow:
+    __slots__ = ("items", "deficit")
+
+    def __init__(self, deficit: float) -> None:
+        # heap: (ustuvorlik, tartib, narx, navbatga qo'yilgan vaqt, element)
+        self.items: List[Tuple[int, int, float, float, Any]] = []
+        self.deficit = deficit
+
+
+class FairQueue:
+    """
+    Kalitlar (chatlar) orasida adolatli navbat — Deficit Round Robin.
+
+    Har bir kalitning o'z navbati bor; aylanish har safar kalitga ``quantum`` birlik
+    "kredit" beradi, element narxi (masalan, prompt tokenlari) shu kreditdan yechiladi.
+    Shunday qilib bitta shovqinli chat qancha xabar yubormasin, har aylanishda boshqa
+    chatlar bilan teng ulush oladi. Ustuvorlik faqat kalit ichidagi tartibni belgilaydi.
+    Kalit navbati ``max_depth`` dan oshsa eng past ustuvorlikdagi eng eski element
+    chiqarib tashlanadi (eskirgan savolga javob baribir kerak emas).
+    """
+
+    def __init__(self, quantum: float = 1.0, max_depth: int = 8) -> None:
+        self.quantum = quantum
+        self.max_depth = max_depth
+        self._flows: Dict[Hashable, _Flow] = {}
+        self._active: Deque[Hashable] = deque()
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def depth(self, key: Hashable) -> int:
+        flow = self._flows.get(key)
+        return len(flow.items) if flow is not None else 0
+
+    def push(self, key: Hashable, item: Any, cost: float = 1.0, priority: int = 0) -> Optional[Any]:
+        """
+        Elementni kalit navbatiga qo'yadi.
+
+        :return: Navbat to'lgani uchun chiqarib tashlangan eng eski element (bo'lmasa None).
+        """
+        flow = self._flows.get(key)
+        if flow is None:
+            # Yangi kalit birinchi aylanishda darhol xizmat oladi
+            flow = self._flows[key] = _Flow(self.quantum)
+            self._active.append(key)
+        heapq.heappush(flow.items, (priority, next(self._seq), cost, time.monotonic(), item))
+        self._size += 1
+        if len(flow.items) > self.max_depth:
+            oldest = max(flow.items, key=lambda entry: (entry[0], -entry[1]))
+            flow.items.remove(oldest)
+            heapq.heapify(flow.items)
+            self._size -= 1
+            return oldest[4]
+        return None
+
+    def remove(self, key: Hashable, item: Any) -> bool:
+        """Elementni navbatdan olib tashlaydi (masalan, kutayotgan vazifa bekor qilinganda)."""
+        flow = self._flows.get(key)
+        if flow is None:
+            return False
+        for entry in flow.items:
+            if entry[4] is item:
+                flow.items.remove(entry)
+                heapq.heapify(flow.items)
+                self._size -= 1
+                if not flow.items:
+                    self._forget(key)
+                return True
+        return False
+
+    def pop(self) -> Optional[Tuple[Hashable, Any, float]]:
+        """
+        Navbatdagi elementni DRR tartibida oladi.
+
+        :return: (kalit, element, navbatga qo'yilgan vaqt) yoki navbat bo'sh bo'lsa None.
+        """
+        while self._active:
+            key = self._active[0]
+            flow = self._flows[key]
+            _, _, cost, enqueued, item = flow.items[0]
+            if flow.deficit < cost:
+                # Kredit yetmadi — navbat keyingi kalitga o'tadi, bu kalit keyingi aylanishga kredit oladi
+                flow.deficit += self.quantum
+                self._active.rotate(-1)
+                continue
+            heapq.heappop(flow.items)
+            flow.deficit -= cost
+            self._size -= 1
+            if not flow.items:
+                self._forget(key)
+            return key, item, enqueued
+        return None
+
+    def _forget(self, key: Hashable) -> None:
+        # Bo'shagan kalit krediti saqlanmaydi (DRR qoidasi) — keyin kelganda yana ``quantum`` dan boshlaydi
+        del self._flows[key]
+        self._active.remove(key)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "depth": self._size,
+            "keys": len(self._flows),
+            "max_key_depth": max((len(flow.items) for flow in self._flows.values()), default=0),
+        }
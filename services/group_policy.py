@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Set
+
+NOTIFY_CHANNEL = "group_settings"
+OVERRIDABLE = ("user_rate_window", "group_cooldown_min", "group_cooldown_max", "ustoz_username", "system_prompt")
+# Manfiy bo'lmasligi kerak bo'lgan sonli sozlamalar (soniyalar)
+NON_NEGATIVE = ("user_rate_window", "group_cooldown_min", "group_cooldown_max")
+
+
+@dataclass(frozen=True)
+class GroupPolicy:
+    user_rate_window: int
+    group_cooldown_min: int
+    group_cooldown_max: int
+    ustoz_username: str
+    system_prompt: str
+
+
+class GroupPolicyCache:
+    """
+    Guruh siyosati (rate-limit, cooldown, ustoz, system prompt) uchun xotiradagi kesh.
+
+    ``get`` hech qachon bazaga murojaat qilmaydi: ishga tushishda barcha ``group_settings``
+    yozuvlari yuklanadi, keyin esa Postgres ``LISTEN group_settings`` orqali faqat o'zgargan
+    chat qayta o'qiladi. Ulanish uzilsa — qayta ulanib, butun jadval qayta yuklanadi.
+
+    To'liq yuklash va bitta chatni yangilash bitta qulf ostida (o'qish + keshga yozish):
+    aks holda eskiroq snapshot bilan tugagan ``load`` yangiroq ``refresh`` natijasini bosib ketadi.
+    """
+
+    def __init__(self, defaults: GroupPolicy, reconnect_delay: float = 5.0) -> None:
+        self.defaults = defaults
+        self.reconnect_delay = reconnect_delay
+        self._policies: Dict[int, GroupPolicy] = {}
+        self._session_pool = None
+        self._task: Optional[asyncio.Task] = None
+        self._refreshes: Set[asyncio.Task] = set()
+        self._lock = asyncio.Lock()
+
+        self.loads = 0
+        self.notifications = 0
+        self.invalid = 0
+
+    def get(self, chat_id: int) -> GroupPolicy:
+        return self._policies.get(chat_id, self.defaults)
+
+    def _merge(self, row) -> GroupPolicy:
+        """
+        Yozuvni umumiy qiymatlar ustiga qo'yadi. Noto'g'ri qiymatlar (manfiy son, cooldown
+        min > max) e'tiborsiz qoldiriladi — aks holda ``random.randint`` javob yo'lida yiqiladi.
+        """
+        overrides = {}
+        for name in OVERRIDABLE:
+            value = getattr(row, name)
+            if value is None:
+                continue
+            if name in NON_NEGATIVE and value < 0:
+                self.invalid += 1
+                logging.warning(f"group_settings [chat:{row.chat_id}]: {name}={value} manfiy — umumiy qiymat ishlatiladi")
+                continue
+            overrides[name] = value
+        policy = replace(self.defaults, **overrides)
+        if policy.group_cooldown_min > policy.group_cooldown_max:
+            self.invalid += 1
+            logging.warning(
+                f"group_settings [chat:{row.chat_id}]: group_cooldown_min={policy.group_cooldown_min} > "
+                f"group_cooldown_max={policy.group_cooldown_max} — umumiy cooldown ishlatiladi"
+            )
+            policy = replace(
+                policy,
+                group_cooldown_min=self.defaults.group_cooldown_min,
+                group_cooldown_max=self.defaults.group_cooldown_max,
+            )
+        return policy
+
+    async def load(self) -> int:
+        """Barcha guruh sozlamalarini bazadan o'qib, keshni to'liq almashtiradi."""
+        from infrastructure.database.repo.requests import RequestsRepo
+
+        async with self._lock:
+            async with self._session_pool() as session:
+                rows = await RequestsRepo(session).group_settings.get_all()
+            self._policies = {row.chat_id: self._merge(row) for row in rows}
+            self.loads += 1
+            return len(self._policies)
+
+    async def refresh(self, chat_id: int) -> None:
+        from infrastructure.database.repo.requests import RequestsRepo
+
+        async with self._lock:
+            async with self._session_pool() as session:
+                row = await RequestsRepo(session).group_settings.get(chat_id)
+            if row is None:
+                self._policies.pop(chat_id, None)
+            else:
+                self._policies[chat_id] = self._merge(row)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self.notifications += 1
+        try:
+            chat_id = int(payload)
+        except ValueError:
+            logging.warning(f"group_settings NOTIFY: noto'g'ri payload {payload!r}")
+            return
+        task = asyncio.create_task(self.refresh(chat_id), name=f"group-policy-refresh:{chat_id}")
+        self._refreshes.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._refreshes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # Keshdagi eski qiymat qoladi; keyingi NOTIFY yoki qayta ulanishdagi to'liq yuklash tuzatadi
+            logging.error(f"group_settings yangilanmadi ({task.get_name()})", exc_info=task.exception())
+
+    async def _listen(self, engine) -> None:
+        while True:
+            try:
+                async with engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    driver = raw.driver_connection
+                    closed = asyncio.Event()
+
+                    def on_terminate(_) -> None:
+                        closed.set()
+
+                    driver.add_termination_listener(on_terminate)
+                    await driver.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                    try:
+                        # Ulanish yo'qligida o'tkazib yuborilgan o'zgarishlar uchun to'liq yuklash
+                        count = await self.load()
+                        logging.info(f"Guruh sozlamalari yuklandi: {count} ta, LISTEN {NOTIFY_CHANNEL}")
+                        await closed.wait()
+                    finally:
+                        # Ulanish pulga qaytadi — tinglovchilar unda qolib ketmasin
+                        driver.remove_termination_listener(on_terminate)
+                        if not driver.is_closed():
+                            await driver.remove_listener(NOTIFY_CHANNEL, self._on_notify)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Guruh sozlamalari LISTEN ulanishida xato")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def start(self, engine) -> None:
+        """Keshni isitadi (birinchi yuklash tugaguncha kutadi) va LISTEN vazifasini ishga tushiradi."""
+        # Baza modullari faqat guruh sozlamalari yoqilganda import qilinadi
+        from infrastructure.database.setup import create_session_pool
+
+        self._session_pool = create_session_pool(engine)
+        try:
+            await self.load()
+        except Exception:
+            logging.exception("Guruh sozlamalarini yuklab bo'lmadi — umumiy qiymatlar ishlatiladi")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen(engine), name="group-policy-listen")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        refreshes = list(self._refreshes)
+        for task in refreshes:
+            task.cancel()
+        await asyncio.gather(*refreshes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "groups": len(self._policies),
+            "loads": self.loads,
+            "notifications": self.notifications,
+            "invalid": self.invalid,
+        }
@@ -0,0 +1,124 @@
+import time
+from array import array
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from services.ttl_store import TTLStore
+
+
+class HeatReading(NamedTuple):
+    messages: int        # oynadagi xabarlar soni
+    participants: int    # oynadagi turli yozuvchilar
+    markers: int         # oynadagi HEATED_MARKERS yig'indisi
+
+    @property
+    def density(self) -> float:
+        return self.markers / self.messages if self.messages else 0.0
+
+
+class _ThreadWindow:
+    """Bitta thread uchun oxirgi ``capacity`` ta xabarning halqa buferi (vaqt, yozuvchi, markerlar)."""
+
+    __slots__ = ("times", "users", "markers", "head", "size")
+
+    def __init__(self, capacity: int) -> None:
+        self.times = array("d", bytes(8 * capacity))
+        self.users = array("q", bytes(8 * capacity))
+        self.markers = array("B", bytes(capacity))
+        self.head = 0
+        self.size = 0
+
+    def push(self, now: float, user_id: int, markers: int) -> None:
+        i = self.head
+        self.times[i] = now
+        self.users[i] = user_id
+        self.markers[i] = min(markers, 255)
+        capacity = len(self.times)
+        self.head = (i + 1) % capacity
+        if self.size < capacity:
+            self.size += 1
+
+    def read(self, since: float) -> HeatReading:
+        # Eng yangisidan orqaga: oynadan chiqqan birinchi xabarda to'xtaymiz
+        capacity = len(self.times)
+        i = self.head
+        messages = markers = 0
+        users = set()
+        for _ in range(self.size):
+            i = (i - 1) % capacity
+            if self.times[i] < since:
+                break
+            messages += 1
+            markers += self.markers[i]
+            users.add(self.users[i])
+        return HeatReading(messages, len(users), markers)
+
+    def __sizeof__(self) -> int:
+        return (object.__sizeof__(self) + self.times.__sizeof__()
+                + self.users.__sizeof__() + self.markers.__sizeof__())
+
+
+class HeatDetector:
+    """
+    Thread bo'yicha "qizigan bahs" detektori: oxirgi ``window`` soniyadagi xabarlar tezligi,
+    turli ishtirokchilar soni va "issiq" markerlar zichligi.
+
+    Har bir thread — qat'iy o'lchamli halqa bufer (``capacity`` ta xabar), shuning uchun
+    xabar boshiga xarajat va xotira chegaralangan; threadlar ``TTLStore`` da (LRU + TTL) turadi.
+    Bahs "qizigan" hisoblanadi, agar oynada kamida ``min_participants`` kishi yozgan bo'lsa va
+    xabarlar soni ``min_messages`` ga yetgan yoki markerlar zichligi ``marker_density`` dan oshgan bo'lsa.
+    """
+
+    def __init__(
+            self,
+            window: float = 120,
+            min_messages: int = 4,
+            min_participants: int = 2,
+            marker_density: float = 0.5,
+            capacity: int = 16,
+            max_threads: int = 10_000,
+    ) -> None:
+        self.window = window
+        self.min_messages = min_messages
+        self.min_participants = min_participants
+        self.marker_density = marker_density
+        self.capacity = capacity
+        self._threads: TTLStore[_ThreadWindow] = TTLStore(max_threads, window)
+
+        self.observed = 0
+        self.checks = 0
+        self.heated = 0
+
+    def observe(self, chat_id: int, thread_id: Optional[int], user_id: int, markers: int,
+                now: Optional[float] = None) -> None:
+        """Guruhdagi har bir xabarda chaqiriladi (OpenAI yoki bazaga murojaat yo'q)."""
+        self.observed += 1
+        now = time.monotonic() if now is None else now
+        key: Tuple[int, Optional[int]] = (chat_id, thread_id)
+        self._threads.setdefault(key, lambda: _ThreadWindow(self.capacity)).push(now, user_id, markers)
+
+    def reading(self, chat_id: int, thread_id: Optional[int], now: Optional[float] = None) -> HeatReading:
+        thread = self._threads.get((chat_id, thread_id))
+        if thread is None:
+            return HeatReading(0, 0, 0)
+        now = time.monotonic() if now is None else now
+        return thread.read(now - self.window)
+
+    def is_heated(self, chat_id: int, thread_id: Optional[int], now: Optional[float] = None) -> bool:
+        self.checks += 1
+        r = self.reading(chat_id, thread_id, now)
+        heated = r.participants >= self.min_participants and (
+            r.messages >= self.min_messages or r.density >= self.marker_density
+        )
+        if heated:
+            self.heated += 1
+        return heated
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "threads": len(self._threads),
+            "observed": self.observed,
+            "checks": self.checks,
+            "heated": self.heated,
+            "evicted": self._threads.evicted,
+            "memory_bytes": self._threads.memory_bytes(),
+        }
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+
+class Lifecycle:
+    """
+    Jarayonni muloyim to'xtatish: yangi update'larni qabul qilmaslik, bajarilayotganlarini
+    (OpenAI chaqiruvi, javob yuborish) muddat ichida tugatish va hisobot berish.
+
+    Har bir update ``track`` ichida bajariladi (``LifecycleMiddleware``). ``drain`` chaqirilgach
+    ``draining`` yoqiladi, yangi update'lar rad etiladi; bajarilayotganlari ``drain_timeout``
+    soniyagacha kutiladi, muddatdan keyin qolganlari bekor qilinadi (``dropped``).
+    """
+
+    def __init__(self, drain_timeout: float = 25.0) -> None:
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self._in_flight: Dict[asyncio.Task, str] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._report: Optional[Dict[str, float]] = None
+
+        self.started = 0
+        self.completed = 0
+        self.rejected = 0
+
+    @asynccontextmanager
+    async def track(self, kind: str = "update"):
+        """Joriy vazifani bajarilayotgan ish sifatida belgilaydi."""
+        task = asyncio.current_task()
+        self._in_flight[task] = kind
+        self._idle.clear()
+        self.started += 1
+        try:
+            yield
+        finally:
+            self.completed += 1
+            self._in_flight.pop(task, None)
+            if not self._in_flight:
+                self._idle.set()
+
+    def reject(self) -> None:
+        self.rejected += 1
+
+    async def drain(self) -> Dict[str, float]:
+        """
+        Qabulni to'xtatadi va bajarilayotgan ishlarni kutadi (qayta chaqirilsa — avvalgi hisobot).
+
+        :return: {"in_flight", "drained", "dropped", "rejected", "seconds"}
+        """
+        if self._report is not None:
+            return self._report
+        self.draining = True
+        started = time.monotonic()
+        in_flight = len(self._in_flight)
+        if in_flight:
+            logging.info(f"To'xtatilmoqda: {in_flight} ta bajarilayotgan update kutilmoqda (≤{self.drain_timeout:.0f} s)")
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout=self.drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        stragglers = [task for task in self._in_flight if not task.done()]
+        for task in stragglers:
+            task.cancel()
+        if stragglers:
+            await asyncio.wait(stragglers, timeout=1.0)
+
+        self._report = {
+            "in_flight": in_flight,
+            "drained": in_flight - len(stragglers),
+            "dropped": len(stragglers),
+            "rejected": self.rejected,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+        log = logging.warning if stragglers else logging.info
+        log(
+            f"Drain tugadi: {self._report['drained']} ta tugatildi, {self._report['dropped']} ta bekor qilindi, "
+            f"{self.rejected} ta rad etildi ({self._report['seconds']} s)"
+        )
+        return self._report
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "draining": int(self.draining),
+            "in_flight": len(self._in_flight),
+            "started": self.started,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
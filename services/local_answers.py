@@ -0,0 +1,118 @@
+import json
+import logging
+import math
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+WORD_RE = re.compile(r"[\w']+", re.U)
+
+# O'zbekcha qo'shimchalar (uzunidan qisqasiga): "dockerda", "gitni", "pythonning" -> ildiz
+SUFFIXES = (
+    "larning", "lardan", "larga", "larni", "larda", "ning", "dagi", "lar", "dan", "ga", "ni", "da", "mi", "chi",
+)
+STOPWORDS = frozenset({
+    "va", "bu", "u", "bilan", "uchun", "ham", "esa", "men", "siz", "biz", "bir", "the", "a", "is", "of", "to",
+})
+
+
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    low = (text or "").lower().replace("’", "'").replace("‘", "'")
+    return [stem(w.strip("'")) for w in WORD_RE.findall(low) if w.strip("'") not in STOPWORDS]
+
+
+@dataclass(frozen=True)
+class FaqEntry:
+    questions: Tuple[str, ...]
+    answer: str
+
+
+def load_faq(path: str) -> List[FaqEntry]:
+    """
+    FAQ bilimlar bazasini JSON fayldan o'qiydi: ``[{"questions": [...], "answer": "..."}, ...]``.
+    Fayl bo'lmasa bo'sh ro'yxat qaytariladi (lokal daraja o'chadi).
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"FAQ fayli topilmadi: {path} — lokal javoblar o'chirildi")
+        return []
+    return [FaqEntry(tuple(row["questions"]), row["answer"]) for row in rows]
+
+
+class LocalAnswerIndex:
+    """
+    OpenAI'dan oldingi arzon daraja: FAQ savollari bo'yicha TF-IDF indeks.
+
+    Har bir savol varianti L2-normallangan TF-IDF vektor sifatida saqlanadi; so'rov bilan
+    kosinus o'xshashligi ``threshold`` dan yuqori bo'lgan eng yaqin yozuv javobi qaytariladi.
+    Qidiruv teskari indeks orqali faqat umumiy so'zli savollarni ko'radi (mikrosoniyalar).
+    """
+
+    def __init__(self, entries: Sequence[FaqEntry], threshold: float = 0.75) -> None:
+        self.entries = list(entries)
+        self.threshold = threshold
+        self.queries = 0
+        self.hits = 0
+
+        docs: List[Tuple[int, List[str]]] = [
+            (i, tokenize(question)) for i, entry in enumerate(self.entries) for question in entry.questions
+        ]
+        df: Dict[str, int] = {}
+        for _, tokens in docs:
+            for term in set(tokens):
+                df[term] = df.get(term, 0) + 1
+        n = len(docs)
+        self.idf: Dict[str, float] = {term: math.log((1 + n) / (1 + count)) + 1 for term, count in df.items()}
+        # Lug'atda yo'q so'z uchun eng yuqori idf: noma'lum so'zlar o'xshashlikni pasaytiradi
+        self.unknown_idf = math.log(1 + n) + 1
+
+        self._doc_entry: List[int] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, (entry_id, tokens) in enumerate(docs):
+            self._doc_entry.append(entry_id)
+            for term, weight in self._vector(tokens).items():
+                self._postings.setdefault(term, []).append((doc_id, weight))
+
+    def _vector(self, tokens: List[str]) -> Dict[str, float]:
+        tf: Dict[str, int] = {}
+        for term in tokens:
+            tf[term] = tf.get(term, 0) + 1
+        vector = {term: count * self.idf.get(term, self.unknown_idf) for term, count in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def match(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        :return: (javob, ishonch) yoki ishonch ``threshold`` dan past bo'lsa None.
+        """
+        self.queries += 1
+        if not self._postings:
+            return None
+        scores: Dict[int, float] = {}
+        for term, weight in self._vector(tokenize(text)).items():
+            for doc_id, doc_weight in self._postings.get(term, ()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * doc_weight
+        if not scores:
+            return None
+        doc_id, score = max(scores.items(), key=lambda item: item[1])
+        if score < self.threshold:
+            return None
+        self.hits += 1
+        return self.entries[self._doc_entry[doc_id]].answer, score
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self.entries),
+            "queries": self.queries,
+            "hits": self.hits,
+            "hit_ratio": (self.hits / self.queries) if self.queries else 0.0,
+        }
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Set
+
+from services.state import StateBackend
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+# Har bir xabar uchun rol/format qo'shimchasi (OpenAI chat formati)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[str, List["ChatCompletionMessageParam"]], Awaitable[str]]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Tokenlar sonini taxminiy hisoblaydi (~3.5 belgi = 1 token; lotin/kirill aralash matn uchun).
+    Aniq tokenizer shart emas: bu faqat byudjetni ushlab turish uchun.
+    """
+    return MESSAGE_OVERHEAD_TOKENS + (len(text or "") * 2 + 6) // 7
+
+
+def extractive_summary(summary: str, turns: List[ChatCompletionMessageParam], max_chars: int = 600) -> str:
+    """LLM'siz zaxira xulosa: foydalanuvchi savollarining qisqa bo'laklari."""
+    questions = [t["content"][:120] for t in turns if t.get("role") == "user" and t.get("content")]
+    merged = "; ".join(filter(None, [summary, *questions]))
+    return merged[-max_chars:]
+
+
+class ConversationMemory:
+    """
+    ``chatgpt_answer`` uchun token byudjetli suhbat xotirasi.
+
+    Har bir yozuv o'z token soni bilan saqlanadi. Umumiy hajm ``token_budget`` dan
+    oshsa, eng eski juftliklar kontekstdan chiqariladi va fon vazifasida (javobni
+    kechiktirmasdan) chatning yig'ma xulosasiga qo'shiladi.
+    """
+
+    def __init__(
+            self,
+            state: StateBackend,
+            token_budget: int = 1200,
+            summary_budget: int = 200,
+            summarizer: Optional[Summarizer] = None,
+    ) -> None:
+        self.state = state
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.summarizer = summarizer
+        self._tasks: Set[asyncio.Task] = set()
+        # chat_id -> [qulf, kutayotgan/bajarilayotgan xulosalar soni]: bir chatda xulosa ketma-ket yangilanadi
+        self._fold_locks: Dict[int, list] = {}
+
+        self.prompt_tokens_sent = 0
+        self.prompt_tokens_saved = 0
+        self.folds = 0
+
+    async def build(self, chat_id: int) -> List[ChatCompletionMessageParam]:
+        """
+        Modelga yuboriladigan kontekst: (bo'lsa) xulosa + byudjetga sig'gan oxirgi xabarlar.
+        """
+        summary = await self.state.get_summary(chat_id)
+        history = await self.state.get_history(chat_id)
+
+        messages: List[ChatCompletionMessageParam] = []
+        sent = 0
+        if summary and summary.get("text"):
+            messages.append({"role": "system", "content": f"Oldingi suhbat xulosasi: {summary['text']}"})
+            sent += summary.get("tokens", 0)
+            self.prompt_tokens_saved += max(0, summary.get("folded_tokens", 0) - summary.get("tokens", 0))
+
+        for entry in history:
+            messages.append({"role": entry["role"], "content": entry["content"]})
+            sent += entry.get("tokens") or estimate_tokens(entry["content"])
+        self.prompt_tokens_sent += sent
+        return messages
+
+    async def remember(self, chat_id: int, prompt: str, answer: str) -> None:
+        """Savol-javob juftligini yozadi va kerak bo'lsa kontekstni byudjetgacha qisqartiradi."""
+        # Qo'shish va qisqartirish backend'da bitta atomar amal: parallel turnlar (va replikalar)
+        # o'qish -> kesish -> qayta yozish oralig'ida bir-birining xabarlarini o'chirib yubormaydi.
+        # Eng oxirgi juftlik har doim qoladi, hatto byudjetdan katta bo'lsa ham.
+        evicted = await self.state.append_history(
+            chat_id,
+            {"role": "user", "content": prompt, "tokens": estimate_tokens(prompt)},
+            {"role": "assistant", "content": answer, "tokens": estimate_tokens(answer)},
+            token_budget=self.token_budget,
+        )
+        if not evicted:
+            return
+
+        task = asyncio.create_task(self._fold(chat_id, evicted))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fold(self, chat_id: int, evicted: List[ChatCompletionMessageParam]) -> None:
+        # O'qish -> xulosa -> yozish qulfsiz parallel bo'lsa, keyingi yozuv oldingisini bosib ketadi
+        entry = self._fold_locks.get(chat_id)
+        if entry is None:
+            entry = self._fold_locks[chat_id] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._fold_locked(chat_id, evicted)
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._fold_locks[chat_id]
+
+    async def _fold_locked(self, chat_id: int, evicted: List[ChatCompletionMessageParam]) -> None:
+        summary = await self.state.get_summary(chat_id) or {}
+        previous = summary.get("text", "")
+        turns = [{"role": e["role"], "content": e["content"]} for e in evicted]
+
+        text = None
+        if self.summarizer is not None:
+            try:
+                text = await self.summarizer(previous, turns)
+            except Exception as e:
+                logging.warning(f"Kontekst xulosasini yaratishda xato [chat:{chat_id}]: {e}")
+        if not text:
+            text = extractive_summary(previous, turns)
+
+        tokens = estimate_tokens(text)
+        if tokens > self.summary_budget:
+            text = text[-self.summary_budget * 3:]
+            tokens = estimate_tokens(text)
+
+        folded = summary.get("folded_tokens", 0) + sum(e.get("tokens") or 0 for e in evicted)
+        await self.state.set_summary(chat_id, {"text": text, "tokens": tokens, "folded_tokens": folded})
+        self.folds += 1
+
+    async def drain(self, timeout: float = 5.0) -> int:
+        """
+        Fon xulosa vazifalarini ``timeout`` soniyagacha kutadi, qolganlarini bekor qiladi.
+
+        :return: Bekor qilingan vazifalar soni.
+        """
+        if not self._tasks:
+            return 0
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logging.warning(f"{len(pending)} ta kontekst xulosasi tugallanmay qoldi")
+        return len(pending)
+
+    async def clear(self, chat_id: int) -> None:
+        await self.state.clear_history(chat_id)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens_sent": self.prompt_tokens_sent,
+            "prompt_tokens_saved": self.prompt_tokens_saved,
+            "folds": self.folds,
+        }
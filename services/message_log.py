@@ -0,0 +1,219 @@
+import asyncio
+import json
+import logging
+import os
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class MessageRecord:
+    chat_id: int
+    prompt: str
+    answer: str
+    tier: str
+    latency_ms: int
+    user_id: Optional[int] = None
+    model: Optional[str] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
+
+class MessageLogSink:
+    """
+    Savol-javob jurnalini bazaga asinxron, to'plab yozuvchi sink.
+
+    ``log`` javob yo'lini kutdirmaydi: yozuv chegaralangan buferga qo'shiladi, fon vazifasi
+    esa har ``flush_interval`` soniyada (yoki ``max_batch`` yig'ilganda) bitta multi-row
+    INSERT qiladi. Bufer to'lsa yoki baza ishlamasa, yozuvlar ``spill_path`` ga (JSONL)
+    tashlanadi va keyingi ishga tushishda bazaga qayta yuklanadi; ``spill_path`` bo'lmasa —
+    tashlab yuboriladi.
+    """
+
+    def __init__(
+            self,
+            session_pool,
+            flush_interval: float = 1.0,
+            max_batch: int = 500,
+            max_queue: int = 10_000,
+            spill_path: Optional[str] = None,
+    ) -> None:
+        self.session_pool = session_pool
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.spill_path = spill_path
+
+        self._buffer: Deque[MessageRecord] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.logged = 0
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.corrupt = 0
+        self.failed_flushes = 0
+
+    def log(self, record: MessageRecord) -> None:
+        """Yozuvni navbatga qo'yadi (hech qachon kutmaydi)."""
+        self.logged += 1
+        if len(self._buffer) >= self.max_queue:
+            self._overflow([record])
+            return
+        self._buffer.append(record)
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    def _overflow(self, records: List[MessageRecord]) -> None:
+        if not self.spill_path:
+            self.dropped += len(records)
+            return
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            # Kamdan-kam holat (bufer to'lgan/baza ishlamayapti): kichik sinxron yozuv yetarli
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(asdict(record), ensure_ascii=False) + "\n")
+            self.spilled += len(records)
+        except OSError:
+            logging.exception(f"Jurnal yozuvlarini faylga tashlab bo'lmadi ({len(records)} ta)")
+            self.dropped += len(records)
+
+    async def flush(self) -> int:
+        """
+        Buferdagi yozuvlarni ``max_batch`` li bo'laklarda bazaga yozadi.
+
+        :return: Yozilgan qatorlar soni.
+        """
+        written = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.max_batch, len(self._buffer)))]
+            if not await self._write(batch):
+                # Baza ishlamayapti: bo'lakni buferga qaytaramiz, sig'maganini faylga tashlaymiz
+                room = max(0, self.max_queue - len(self._buffer))
+                self._buffer.extendleft(reversed(batch[:room]))
+                if batch[room:]:
+                    self._overflow(batch[room:])
+                break
+            written += len(batch)
+        return written
+
+    async def _write(self, batch: List[MessageRecord]) -> bool:
+        # sqlalchemy faqat jurnal yoqilganda yuklanadi (MessageRecord/log_message importi yengil)
+        from infrastructure.database.repo.requests import RequestsRepo
+
+        try:
+            async with self.session_pool() as session:
+                self.written += await RequestsRepo(session).messages.insert_many(
+                    [asdict(record) for record in batch]
+                )
+            return True
+        except Exception:
+            self.failed_flushes += 1
+            logging.exception(f"Savol-javob jurnalini yozishda xato ({len(batch)} ta)")
+            return False
+
+    async def replay_spill(self) -> int:
+        """
+        Oldingi ishga tushishda faylga tashlangan yozuvlarni bazaga qayta yuklaydi.
+
+        Buzilgan (masalan, yozilayotganda uzilib qolgan) qatorlar o'tkazib yuboriladi va
+        ``corrupt`` da sanaladi. Oldingi qayta yuklash yarim yo'lda to'xtagan bo'lsa, uning
+        ``.replay`` fayli yana o'qiladi.
+        """
+        if not self.spill_path:
+            return 0
+        replaying = self.spill_path + ".replay"
+        if not os.path.exists(replaying):
+            if not os.path.exists(self.spill_path):
+                return 0
+            os.replace(self.spill_path, replaying)
+
+        records: List[MessageRecord] = []
+        with open(replaying, encoding="utf-8", errors="replace") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    records.append(MessageRecord(**json.loads(line)))
+                except (ValueError, TypeError) as e:
+                    self.corrupt += 1
+                    logging.warning(f"Jurnal faylining {number}-qatori buzilgan, o'tkazib yuborildi: {e}")
+        os.remove(replaying)
+
+        loaded = 0
+        for start in range(0, len(records), self.max_batch):
+            batch = records[start:start + self.max_batch]
+            if not await self._write(batch):
+                self._overflow(records[start:])
+                break
+            loaded += len(batch)
+        if loaded:
+            logging.info(f"Faylga tashlangan {loaded} ta jurnal yozuvi bazaga yuklandi")
+        return loaded
+
+    async def _run(self) -> None:
+        replayed = False
+        while True:
+            try:
+                if not replayed:
+                    # Qayta yuklash xatosi sink'ni to'xtatmaydi: fayl keyingi ishga tushishda yana o'qiladi
+                    replayed = True
+                    await self.replay_spill()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception("Savol-javob jurnali sink'ida kutilmagan xato")
+                await asyncio.sleep(self.flush_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="message-log")
+
+    async def stop(self) -> None:
+        """Fon vazifasini to'xtatadi, qolgan buferni yozadi; yozilmaganini faylga tashlaydi."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        if self._buffer:
+            self._overflow(list(self._buffer))
+            self._buffer.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "logged": self.logged,
+            "written": self.written,
+            "spilled": self.spilled,
+            "dropped": self.dropped,
+            "corrupt": self.corrupt,
+            "failed_flushes": self.failed_flushes,
+            "pending": len(self._buffer),
+        }
+
+
+_sink: Optional[MessageLogSink] = None
+
+
+def install_message_log(sink: Optional[MessageLogSink]) -> None:
+    """Jarayon bo'yicha jurnal sink'ini o'rnatadi (``None`` — o'chiradi)."""
+    global _sink
+    _sink = sink
+
+
+def log_message(record: MessageRecord) -> None:
+    """Sink o'rnatilgan bo'lsa yozuvni navbatga qo'yadi, aks holda hech narsa qilmaydi."""
+    if _sink is not None:
+        _sink.log(record)
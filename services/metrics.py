@@ -0,0 +1,177 @@
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Sekundlarda; Telegram/OpenAI kechikishlari uchun mos oraliq
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Iterable[Tuple[str, str]] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help = help_text
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        # label -> [bucket hisoblagichlari..., +Inf], yig'indi
+        self.counts: Dict[LabelKey, List[int]] = {}
+        self.sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0] * (len(self.buckets) + 1)
+            self.sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts in self.counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', str(bound))])} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {self.sums[key]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Qiymati so'ralgan paytda ``collect`` orqali olinadi (masalan, limiter holati)."""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[LabelKey, float]]) -> None:
+        self.name = name
+        self.help = help_text
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in self.collect().items():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Jarayon ichidagi Prometheus uslubidagi metrikalar (tashqi kutubxonasiz).
+    ``render`` — ``/metrics`` uchun matn formatida eksport.
+    """
+
+    def __init__(self, prefix: str = "bot_") -> None:
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        name = self.prefix + name
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, help_text)
+        return self._metrics[name]
+
+    def histogram(self, name: str, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        name = self.prefix + name
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, help_text, buckets)
+        return self._metrics[name]
+
+    def gauge(
+            self,
+            name: str,
+            help_text: str,
+            collect: Callable[[], Dict[str, float]],
+            label: str = "key",
+    ) -> Gauge:
+        """``collect`` {qiymat nomi: son} qaytaradi; nom ``label`` (odatda ``key``) sifatida chiqadi."""
+        name = self.prefix + name
+
+        def collect_labeled() -> Dict[LabelKey, float]:
+            return {((label, str(k)),): float(v) for k, v in collect().items() if isinstance(v, (int, float))}
+
+        self._metrics[name] = Gauge(name, help_text, collect_labeled)
+        return self._metrics[name]
+
+    @contextmanager
+    def span(self, stage: str, **labels: str):
+        """Bosqich vaqtini o'lchaydi: ``with METRICS.span("openai_generation"): ...``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, **labels)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+STAGE_SECONDS = METRICS.histogram("stage_seconds", "Update qayta ishlash bosqichlari davomiyligi")
+UPDATE_SECONDS = METRICS.histogram("update_seconds", "Update'ni to'liq qayta ishlash vaqti")
+UPDATES_TOTAL = METRICS.counter("updates_total", "Qayta ishlangan update'lar soni")
+TRIGGERS_TOTAL = METRICS.counter("triggers_total", "should_respond trigger tarmoqlari bo'yicha hisob")
+# Lokal FAQ javoblari mikrosoniyalarda — kichik bucket'lar qo'shilgan
+ANSWER_TIER_SECONDS = METRICS.histogram(
+    "answer_tier_seconds", "Javob qaysi darajadan (local/cache/openai/coalesced) va qancha vaqtda olindi",
+    buckets=(0.0001, 0.0005, 0.001) + DEFAULT_BUCKETS,
+)
+
+SEND_WAIT_SECONDS = METRICS.histogram(
+    "send_wait_seconds", "Bot API yuborishi rejalashtiruvchi navbatida qancha kutdi (ustuvorlik bo'yicha)",
+)
+
+
+async def start_metrics_server(host: str = "0.0.0.0", port: int = 9100):
+    """
+    Polling rejimi uchun kichik ``/metrics`` HTTP server (webhook rejimida FastAPI route ishlatiladi).
+
+    :return: aiohttp ``AppRunner`` — to'xtatish uchun ``await runner.cleanup()``.
+    """
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=METRICS.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
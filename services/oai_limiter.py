@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, List, Optional
+
+from services.fair_queue import FairQueue, QueueDropped
+from services.ttl_store import TTLStore
+
+# Navbat ustuvorliklari (kichik son — oldinroq)
+PRIORITY_INTERACTIVE = 0   # /ask, @mention, botga reply, ustoz
+PRIORITY_AUTO = 1          # qizigan bahsdagi avtomatik javoblar
+PRIORITY_BACKGROUND = 2    # xulosa va boshqa fon ishlari
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """OpenAI xatosidagi ``retry-after-ms`` / ``retry-after`` sarlavhasini o'qiydi."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+class AdaptiveLimiter:
+    """
+    OpenAI so'rovlari uchun moslashuvchan (AIMD) parallellik cheklovchisi.
+
+    - Muvaffaqiyatli va tez javoblarda limit asta-sekin oshadi (+1/limit har javobda).
+    - 429 yoki xatolar ulushi oshganda limit ``decrease_factor`` ga ko'paytiriladi.
+    - ``retry-after`` bo'lsa — shu vaqtgacha yangi slot berilmaydi.
+    - Chatlar ``FairQueue`` (DRR) orqali navbatma-navbat o'tadi: bitta qizigan guruh barcha
+      slotlarni egallab ololmaydi. Chat ichida interaktiv so'rovlar avtomatik javoblardan oldin
+      o'tadi; fon ishlari (``PRIORITY_BACKGROUND``) esa alohida, eng oxirgi navbatda.
+    - Chat navbati ``max_chat_depth`` dan oshsa eng eski so'rov ``QueueDropped`` bilan tugaydi.
+    """
+
+    def __init__(
+            self,
+            initial: int = 4,
+            min_limit: int = 1,
+            max_limit: int = 16,
+            latency_target: float = 6.0,
+            decrease_factor: float = 0.5,
+            error_threshold: float = 0.2,
+            quantum: float = 1500,
+            max_chat_depth: int = 8,
+            max_chats: int = 10_000,
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self.error_threshold = error_threshold
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.error_rate = 0.0
+        self.quantum = quantum
+        self.max_chat_depth = max_chat_depth
+        # yo'lak (0 — chat so'rovlari, PRIORITY_BACKGROUND — fon) -> chatlar orasida adolatli navbat
+        self._lanes: Dict[int, FairQueue] = {}
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+        # chat -> [o'tganlar, tashlanganlar, kutish yig'indisi, eng uzun kutish]
+        self._chat_waits: TTLStore[List[float]] = TTLStore(max_chats, 3600)
+
+        self.throttled = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def _can_start(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self.blocked_until
+
+    def _waiting(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _pop(self) -> Optional[asyncio.Future]:
+        for lane_id in sorted(self._lanes):
+            popped = self._lanes[lane_id].pop()
+            if popped is not None:
+                return popped[1]
+        return None
+
+    def _wake(self) -> None:
+        self._wake_handle = None
+        while self._can_start():
+            future = self._pop()
+            if future is None:
+                break
+            if future.done():
+                continue
+            self.in_flight += 1
+            future.set_result(None)
+
+        delay = self.blocked_until - time.monotonic()
+        if delay > 0 and self._wake_handle is None and self._waiting():
+            self._wake_handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _chat_record(self, key: Hashable) -> List[float]:
+        return self._chat_waits.setdefault(key, lambda: [0, 0, 0.0, 0.0])
+
+    async def acquire(self, priority: int = PRIORITY_AUTO, key: Hashable = None, cost: float = 1.0) -> None:
+        """
+        Slotni kutadi. ``key`` — adolatli navbat kaliti (chat), ``cost`` — so'rov narxi (tokenlar).
+
+        :raises QueueDropped: chat navbati to'lib, bu so'rov eng eskisi sifatida tashlanganda.
+        """
+        if self._can_start() and not self._waiting():
+            self.in_flight += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        lane_id = 0 if priority < PRIORITY_BACKGROUND else priority
+        lane = self._lanes.get(lane_id)
+        if lane is None:
+            lane = self._lanes[lane_id] = FairQueue(self.quantum, self.max_chat_depth)
+        dropped = lane.push(key, future, cost, priority)
+        if dropped is not None and not dropped.done():
+            self.dropped += 1
+            self._chat_record(key)[1] += 1
+            dropped.set_exception(QueueDropped(f"chat {key} navbati to'la ({self.max_chat_depth})"))
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Slot berilgan, lekin vazifa bekor qilindi — qaytaramiz
+                self._release()
+            else:
+                future.cancel()
+                lane.remove(key, future)
+            raise
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _on_success(self, latency: float) -> None:
+        self.completed += 1
+        self.error_rate *= 0.9
+        if latency <= self.latency_target:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def _on_failure(self, error: BaseException) -> None:
+        if is_rate_limited(error):
+            self.throttled += 1
+            self._decrease("429")
+            retry_after = retry_after_seconds(error)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+            return
+
+        self.failed += 1
+        self.error_rate = self.error_rate * 0.9 + 0.1
+        if self.error_rate > self.error_threshold:
+            self._decrease("xatolar ulushi")
+
+    def _decrease(self, reason: str) -> None:
+        previous = self.limit
+        self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+        if int(previous) != int(self.limit):
+            logging.warning(f"OpenAI parallellik limiti kamaytirildi ({reason}): {previous:.1f} -> {self.limit:.1f}")
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_AUTO, key: Hashable = None, cost: float = 1.0):
+        """
+        Bitta OpenAI chaqiruvi uchun slot. Natija (muvaffaqiyat/429/xato) avtomatik hisobga olinadi;
+        backoff paytida slot band qilinmasligi uchun qayta urinishni context'dan tashqarida qiling.
+        Navbatda kutilgan vaqt (s) ``as`` orqali qaytariladi.
+        """
+        queued = time.monotonic()
+        await self.acquire(priority, key, cost)
+        started = time.monotonic()
+        if key is not None:
+            record = self._chat_record(key)
+            record[0] += 1
+            record[2] += started - queued
+            record[3] = max(record[3], started - queued)
+        try:
+            yield started - queued
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._on_failure(e)
+            raise
+        else:
+            self._on_success(time.monotonic() - started)
+        finally:
+            self._release()
+
+    def chat_stats(self, top: int = 5) -> List[Dict[str, float]]:
+        """O'rtacha kutish eng uzun bo'lgan ``top`` ta chat: navbatda, o'tganlar, tashlanganlar, kutish (s)."""
+        rows = [
+            {
+                "chat_id": key,
+                "queue_depth": sum(lane.depth(key) for lane in self._lanes.values()),
+                "served": served,
+                "dropped": dropped,
+                "wait_mean": round(wait_sum / served, 3) if served else 0.0,
+                "wait_max": round(wait_max, 3),
+            }
+            for key, (served, dropped, wait_sum, wait_max) in self._chat_waits.items()
+        ]
+        return sorted(rows, key=lambda row: -row["wait_mean"])[:top]
+
+    def chat_metric(self, field: str, top: int = 20) -> Dict[str, float]:
+        """``chat_stats`` ning bitta ustuni {chat_id: qiymat} — ``METRICS.gauge(..., label="chat")`` uchun."""
+        return {str(row["chat_id"]): row[field] for row in self.chat_stats(top)}
+
+    def stats(self) -> Dict[str, float]:
+        lanes = {f"queue_lane_{lane_id}": len(lane) for lane_id, lane in sorted(self._lanes.items()) if lane}
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queue_depth": sum(lanes.values()),
+            **lanes,
+            "chats_waiting": sum(lane.stats()["keys"] for lane in self._lanes.values()),
+            "dropped": self.dropped,
+            "throttled": self.throttled,
+            "completed": self.completed,
+            "failed": self.failed,
+            "blocked_for": max(0.0, round(self.blocked_until - time.monotonic(), 2)),
+        }
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+from services.memory import estimate_tokens
+
+if TYPE_CHECKING:
+    from openai.types import CompletionUsage
+    from openai.types.chat import ChatCompletionMessageParam
+
+# Statik qism: (xabarlar, taxminiy tokenlar)
+Prefix = Tuple[Tuple["ChatCompletionMessageParam", ...], int]
+
+
+class PromptBuilder:
+    """
+    OpenAI so'rovi uchun xabarlar ro'yxatini provayderning prompt keshiga mos tartibda yig'adi.
+
+    Tartib: statik system prompt -> chat konteksti (xulosa + tarix) -> (bo'lsa) shu so'rovga
+    xos ko'rsatma -> foydalanuvchi savoli. Statik qism har chaqiruvda bayt-ba-bayt bir xil
+    va doim birinchi; kontekst faqat oxiridan o'sadi — shuning uchun oldingi so'rovning
+    prefiksi keshdan o'qiladi. O'zgaruvchan ko'rsatmalar (masalan, ustoz xabari) savol
+    matniga qo'shilmaydi: ular xotiraga ham, javob keshi kalitiga ham tushmaydi.
+
+    Statik xabarlar va ularning token soni system prompt (guruh siyosati) bo'yicha bir marta
+    tayyorlanadi. ``observe`` javobdagi ``usage.prompt_tokens_details.cached_tokens`` dan
+    keshdan o'qilgan tokenlar ulushini hisoblaydi.
+    """
+
+    def __init__(self, max_prefixes: int = 256) -> None:
+        self.max_prefixes = max_prefixes
+        self._prefixes: Dict[str, Prefix] = {}
+        self._instructions: Dict[str, Prefix] = {}
+
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    @staticmethod
+    def _remember(table: Dict[str, Prefix], text: str, limit: int) -> Prefix:
+        prepared = table.get(text)
+        if prepared is None:
+            if len(table) >= limit:
+                table.pop(next(iter(table)))
+            prepared = table[text] = (({"role": "system", "content": text},), estimate_tokens(text))
+        return prepared
+
+    def prefix(self, system_prompt: str) -> Prefix:
+        """System prompt uchun tayyor statik xabarlar (har safar aynan bir xil obyektlar)."""
+        return self._remember(self._prefixes, system_prompt, self.max_prefixes)
+
+    def build(
+            self,
+            system_prompt: str,
+            context: Sequence[ChatCompletionMessageParam],
+            prompt: str,
+            instruction: Optional[str] = None,
+    ) -> Tuple[List[ChatCompletionMessageParam], int]:
+        """
+        :return: (xabarlar, taxminiy prompt tokenlari) — tokenlar adolatli navbat narxi uchun.
+        """
+        static, tokens = self.prefix(system_prompt)
+        messages: List[ChatCompletionMessageParam] = [*static, *context]
+        tokens += sum(estimate_tokens(message["content"]) for message in context)
+        if instruction:
+            extra, extra_tokens = self._remember(self._instructions, instruction, self.max_prefixes)
+            messages.extend(extra)
+            tokens += extra_tokens
+        messages.append({"role": "user", "content": prompt})
+        return messages, tokens + estimate_tokens(prompt)
+
+    def observe(self, usage: Optional[CompletionUsage]) -> None:
+        """Javobdagi token hisobini (shu jumladan keshdan o'qilganlarini) yig'adi."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.requests += 1
+        self.prompt_tokens += usage.prompt_tokens or 0
+        self.cached_tokens += getattr(details, "cached_tokens", None) or 0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": (self.cached_tokens / self.prompt_tokens) if self.prompt_tokens else 0.0,
+            "prefixes": len(self._prefixes),
+        }
@@ -0,0 +1,243 @@
+import asyncio
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendChatAction, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+from services.metrics import SEND_WAIT_SECONDS
+from services.ttl_store import TTLStore
+
+if TYPE_CHECKING:
+    from aiogram import Bot
+
+# Chiquvchi so'rov ustuvorliklari (kichik son — oldinroq)
+PRIORITY_REPLY = 0      # javoblar, tahrirlar — foydalanuvchi kutyapti
+PRIORITY_ACTION = 1     # send_chat_action ("yozmoqda...")
+PRIORITY_BULK = 2       # broadcast, ishga tushish xabarlari
+
+PRIORITY_NAMES = {PRIORITY_REPLY: "reply", PRIORITY_ACTION: "action", PRIORITY_BULK: "bulk"}
+
+_send_priority: ContextVar[Optional[int]] = ContextVar("send_priority", default=None)
+
+
+@contextmanager
+def send_priority(priority: int):
+    """Blok ichidagi barcha Bot API yuborishlari uchun ustuvorlikni belgilaydi (vazifalarga ham o'tadi)."""
+    token = _send_priority.set(priority)
+    try:
+        yield
+    finally:
+        _send_priority.reset(token)
+
+
+# Navbatdagi so'rov turlari
+KIND_SEND = 0
+KIND_ACTION = 1
+KIND_EDIT = 2
+
+
+def _is_send(method: TelegramMethod) -> bool:
+    # Chatga yoziladigan metodlar; getUpdates, getChat* kabi o'qishlar navbatdan o'tmaydi
+    return getattr(method, "chat_id", None) is not None and not method.__api_method__.startswith("get")
+
+
+def _kind(method: TelegramMethod) -> int:
+    if isinstance(method, SendChatAction):
+        return KIND_ACTION
+    if method.__api_method__.startswith("edit") and getattr(method, "message_id", None) is not None:
+        return KIND_EDIT
+    return KIND_SEND
+
+
+class SendScheduler(BaseRequestMiddleware):
+    """
+    Bot session uchun chiquvchi so'rovlar rejalashtiruvchisi (aiogram request middleware).
+
+    - Global token bucket: soniyasiga ``rate`` ta yuborish.
+    - Har bir chatga ketma-ket yuborishlar orasida kamida ``chat_interval`` soniya.
+    - Kutayotganlar ustuvorlik bo'yicha o'tadi: javoblar > chat action > broadcast.
+    - ``send_chat_action``: bir xil harakat ``action_ttl`` ichida qayta yuborilmaydi, chatga
+      javob ketayotgan bo'lsa kutayotgan harakat tashlab yuboriladi (javob uni baribir o'chiradi).
+    - Tahrirlar (``editMessage*``) ``chat_interval`` ni kutmaydi va uni band qilmaydi (stream
+      tahrirlari yuborishlar ortida qolmaydi); bitta xabarning kutayotgan eski tahriri yangisi
+      kelganda tashlab yuboriladi — faqat eng oxirgi matn yuboriladi.
+    - ``TelegramRetryAfter`` markazlashgan: faqat o'sha chat to'xtatiladi, so'rov
+      ``max_retries`` martagacha navbatga qaytadi — boshqa chatlar kutib qolmaydi.
+    """
+
+    def __init__(
+            self,
+            rate: float = 25,
+            chat_interval: float = 1.0,
+            action_ttl: float = 4.0,
+            max_retries: int = 2,
+            max_chats: int = 10_000,
+    ) -> None:
+        self.rate = rate
+        self.chat_interval = chat_interval
+        self.action_ttl = action_ttl
+        self.max_retries = max_retries
+
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self._chat_ready: TTLStore[float] = TTLStore(max_chats, 0)   # chat_id -> qachondan bo'sh
+        # chat_id -> flood limit (RetryAfter) tugaydigan vaqt: tahrirlar faqat shuni kutadi
+        self._chat_flood: TTLStore[float] = TTLStore(max_chats, 0)
+        # (chat_id, message_id) -> navbatdagi eng oxirgi tahrirning future'i
+        self._pending_edits: Dict[Tuple[Any, int], asyncio.Future] = {}
+        self._recent_actions: TTLStore[bool] = TTLStore(max_chats, action_ttl)
+        # (ustuvorlik, tartib, chat_id, tur, future)
+        self._waiters: List[Tuple[int, int, Any, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+
+        self.sent = 0
+        self.actions_dropped = 0
+        self.edits_dropped = 0
+        self.retried = 0
+        self.retry_after_total = 0.0
+
+    def _hold_chat(self, chat_id: Any, until: float, flood: bool = False) -> None:
+        now = time.monotonic()
+        if until > self._chat_ready.get(chat_id, now):
+            self._chat_ready.set(chat_id, until, ttl=until - now)
+        if flood and until > self._chat_flood.get(chat_id, now):
+            self._chat_flood.set(chat_id, until, ttl=until - now)
+
+    def _wake(self) -> None:
+        if self._wake_handle is not None:
+            self._wake_handle.cancel()
+            self._wake_handle = None
+        now = time.monotonic()
+        self.tokens = min(float(self.rate), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        next_wake = float("inf")
+        replied = set()
+        remaining = []
+        for entry in sorted(self._waiters):
+            priority, _, chat_id, kind, future = entry
+            if future.done():
+                continue
+            if kind == KIND_ACTION and chat_id in replied:
+                future.set_result(False)
+                continue
+            ready_at = (self._chat_flood if kind == KIND_EDIT else self._chat_ready).get(chat_id, now)
+            if ready_at > now:
+                next_wake = min(next_wake, ready_at)
+                remaining.append(entry)
+                continue
+            if self.tokens < 1:
+                next_wake = min(next_wake, now + (1 - self.tokens) / self.rate)
+                remaining.append(entry)
+                continue
+            self.tokens -= 1
+            if kind == KIND_SEND:
+                replied.add(chat_id)
+                if self.chat_interval > 0:
+                    self._hold_chat(chat_id, now + self.chat_interval)
+            future.set_result(True)
+        self._waiters = remaining
+
+        if remaining and next_wake < float("inf"):
+            self._wake_handle = asyncio.get_running_loop().call_later(max(0.0, next_wake - now), self._wake)
+
+    async def _acquire(self, priority: int, chat_id: Any, kind: int, edit_key: Optional[Tuple[Any, int]] = None) -> bool:
+        """Navbatga turadi. Harakat yoki tahrir keraksiz bo'lib qolsa False qaytaradi."""
+        future = asyncio.get_running_loop().create_future()
+        if edit_key is not None:
+            # Xuddi shu xabarning hali navbatdagi tahriri eskirdi — yangisi uning o'rnini oladi
+            previous = self._pending_edits.get(edit_key)
+            if previous is not None and not previous.done():
+                previous.set_result(False)
+            self._pending_edits[edit_key] = future
+        self._waiters.append((priority, next(self._seq), chat_id, kind, future))
+        self._wake()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        finally:
+            if edit_key is not None and self._pending_edits.get(edit_key) is future:
+                del self._pending_edits[edit_key]
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: "Bot",
+            method: TelegramMethod[TelegramType],
+    ) -> TelegramType:
+        if not _is_send(method):
+            return await make_request(bot, method)
+
+        chat_id = method.chat_id
+        kind = _kind(method)
+        is_action = kind == KIND_ACTION
+        edit_key = (chat_id, method.message_id) if kind == KIND_EDIT else None
+        priority = _send_priority.get()
+        if priority is None:
+            priority = PRIORITY_ACTION if is_action else PRIORITY_REPLY
+
+        if is_action:
+            key = (chat_id, method.message_thread_id, method.action)
+            if self._recent_actions.get(key):
+                self.actions_dropped += 1
+                return True
+            self._recent_actions.set(key, True)
+
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            granted = await self._acquire(priority, chat_id, kind, edit_key)
+            SEND_WAIT_SECONDS.observe(time.monotonic() - started, priority=PRIORITY_NAMES.get(priority, str(priority)))
+            if not granted:
+                if kind == KIND_EDIT:
+                    self.edits_dropped += 1
+                else:
+                    self.actions_dropped += 1
+                return True
+            try:
+                result = await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retry_after_total += e.retry_after
+                self._hold_chat(chat_id, time.monotonic() + e.retry_after, flood=True)
+                self._wake()
+                logging.warning(f"Flood limit [chat:{chat_id}]: {e.retry_after} s, {type(method).__name__}")
+                # Eskirgan "yozmoqda..." ni qayta yubormaymiz
+                if is_action:
+                    return True
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self.retried += 1
+                continue
+            self.sent += 1
+            return result
+
+    def stats(self) -> Dict[str, float]:
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, _, _, future in self._waiters:
+            if not future.done():
+                queued[PRIORITY_NAMES.get(priority, str(priority))] += 1
+        return {
+            **{f"queued_{name}": count for name, count in queued.items()},
+            "sent": self.sent,
+            "actions_dropped": self.actions_dropped,
+            "edits_dropped": self.edits_dropped,
+            "retried": self.retried,
+            "retry_after_seconds": self.retry_after_total,
+            "held_chats": len(self._chat_ready),
+        }
+
+
+def installed_scheduler(bot: "Bot") -> Optional[SendScheduler]:
+    """Bot session'iga o'rnatilgan ``SendScheduler`` (o'rnatilmagan bo'lsa None)."""
+    return next((m for m in bot.session.middleware if isinstance(m, SendScheduler)), None)
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, List, Optional
+
+from services.ttl_store import TTLStore
+
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletionMessageParam
+
+
+class StateBackend(ABC):
+    """
+    Guruh yordamchisining umumiy holati: suhbat konteksti, foydalanuvchi throttling
+    va guruh cooldown.
+
+    Xotiradagi (bitta jarayon) va Redis (bir nechta bot nusxasi) variantlari bor.
+    """
+
+    @abstractmethod
+    async def get_history(self, chat_id: int) -> List[ChatCompletionMessageParam]:
+        ...
+
+    @abstractmethod
+    async def append_history(
+            self, chat_id: int, *messages: ChatCompletionMessageParam, token_budget: int = 0,
+    ) -> List[ChatCompletionMessageParam]:
+        """
+        Xabarlarni kontekst oxiriga qo'shadi va shu amalning o'zida (atomar) eng eski
+        yozuvlarni ``token_budget`` (0 — cheklanmagan) va ``history_limit`` gacha chiqaradi.
+        Yangi qo'shilgan xabarlar har doim qoladi.
+
+        :return: Chiqarilgan yozuvlar (eskidan yangiga) — ularni xulosaga qo'shish chaqiruvchining ishi.
+        """
+
+    @abstractmethod
+    async def clear_history(self, chat_id: int) -> None:
+        """Kontekstni va uning xulosasini o'chiradi."""
+
+    @abstractmethod
+    async def get_summary(self, chat_id: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def set_summary(self, chat_id: int, summary: dict) -> None:
+        ...
+
+    @abstractmethod
+    async def user_rate_limited(self, user_id: int, window: float) -> bool:
+        """``window`` soniya ichida foydalanuvchi avval ko'rilgan bo'lsa True; aks holda vaqtni belgilaydi."""
+
+    @abstractmethod
+    async def group_cooldown_ok(self, chat_id: int, window: float) -> bool:
+        """Guruhda oxirgi javobdan ``window`` soniya o'tgan bo'lsa vaqtni belgilab True qaytaradi."""
+
+    async def start(self) -> None:
+        """Fon vazifalarini ishga tushiradi (event loop ichida)."""
+
+    async def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, float]:
+        return {}
+
+
+def _history_size(history: Deque[ChatCompletionMessageParam]) -> int:
+    return sys.getsizeof(history) + sum(
+        sys.getsizeof(m) + sys.getsizeof(m.get("content") or "") for m in history
+    )
+
+
+class MemoryStateBackend(StateBackend):
+    """
+    Bitta jarayon uchun holat. Har bir lug'at ``TTLStore``: yozuvlar muddati o'tganda yoki
+    chat/foydalanuvchi soni chegaradan oshganda (LRU) chiqariladi, fon ``sweep`` vazifasi esa
+    muddati o'tganlarni davriy tozalaydi — uzoq ishlaydigan jarayon xotirasi o'smaydi.
+    """
+
+    def __init__(
+            self,
+            history_limit: int = 8,
+            max_chats: int = 10_000,
+            max_users: int = 100_000,
+            history_ttl: float = 7 * 24 * 3600,
+            cooldown_ttl: float = 3600,
+            sweep_interval: float = 60,
+    ) -> None:
+        self.history_limit = history_limit
+        self.cooldown_ttl = cooldown_ttl
+        self.sweep_interval = sweep_interval
+        self.history: TTLStore[Deque[ChatCompletionMessageParam]] = TTLStore(
+            max_chats, history_ttl, sizeof=_history_size,
+        )
+        self.summaries: TTLStore[dict] = TTLStore(max_chats, history_ttl)
+        self.last_seen_user: TTLStore[float] = TTLStore(max_users, 0)    # user_id -> ts (TTL = oyna)
+        self.group_cooldown: TTLStore[float] = TTLStore(max_chats, cooldown_ttl)   # chat_id -> ts
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def _stores(self) -> Dict[str, TTLStore]:
+        return {
+            "history": self.history,
+            "summaries": self.summaries,
+            "last_seen_user": self.last_seen_user,
+            "group_cooldown": self.group_cooldown,
+        }
+
+    async def get_history(self, chat_id: int) -> List[ChatCompletionMessageParam]:
+        history = self.history.get(chat_id)
+        return list(history) if history else []
+
+    async def append_history(
+            self, chat_id: int, *messages: ChatCompletionMessageParam, token_budget: int = 0,
+    ) -> List[ChatCompletionMessageParam]:
+        # deque'da maxlen yo'q: xabarlar faqat shu yerda, chaqiruvchiga qaytarilib chiqariladi.
+        # Orada await yo'q — parallel korutinalar uchun amal atomar.
+        history = self.history.setdefault(chat_id, deque)
+        history.extend(messages)
+        total = sum(entry.get("tokens") or 0 for entry in history)
+        evicted: List[ChatCompletionMessageParam] = []
+        while len(history) > len(messages) and (
+                (token_budget and total > token_budget) or len(history) > self.history_limit
+        ):
+            entry = history.popleft()
+            total -= entry.get("tokens") or 0
+            evicted.append(entry)
+        self.history.resize(chat_id)
+        return evicted
+
+    async def clear_history(self, chat_id: int) -> None:
+        self.history.pop(chat_id, None)
+        self.summaries.pop(chat_id, None)
+
+    async def get_summary(self, chat_id: int) -> Optional[dict]:
+        return self.summaries.get(chat_id)
+
+    async def set_summary(self, chat_id: int, summary: dict) -> None:
+        self.summaries.set(chat_id, summary)
+
+    async def user_rate_limited(self, user_id: int, window: float) -> bool:
+        # Yozuv oyna davomida yashaydi: bor bo'lsa — foydalanuvchi yaqinda yozgan
+        if self.last_seen_user.get(user_id) is not None:
+            return True
+        if window > 0:
+            self.last_seen_user.set(user_id, time.time(), ttl=window)
+        return False
+
+    async def group_cooldown_ok(self, chat_id: int, window: float) -> bool:
+        now = time.time()
+        if now - self.group_cooldown.get(chat_id, 0.0) >= window:
+            self.group_cooldown.set(chat_id, now)
+            return True
+        return False
+
+    def sweep(self) -> int:
+        return sum(store.sweep() for store in self._stores().values())
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            removed = self.sweep()
+            if removed:
+                logging.debug(f"Holat omboridan {removed} ta eskirgan yozuv tozalandi")
+
+    async def start(self) -> None:
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop(), name="state-sweeper")
+
+    async def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def stats(self) -> Dict[str, float]:
+        data: Dict[str, float] = {}
+        total_bytes = 0
+        for name, store in self._stores().items():
+            size = store.memory_bytes()
+            total_bytes += size
+            data[f"{name}_entries"] = len(store)
+            data[f"{name}_bytes"] = size
+            data[f"{name}_evicted"] = store.evicted
+        data["memory_bytes"] = total_bytes
+        return data
+
+
+# Tekshirish va yozish bitta atomar amalda — replikalar bir-birini "quvib o'tolmaydi"
+COOLDOWN_LUA = """
+local last = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tonumber(ARGV[1]) - last >= tonumber(ARGV[2]) then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# Qo'shish va byudjetgacha qisqartirish bitta atomar amalda: parallel yozuvlar (replikalar ham)
+# bir-birining xabarlarini yo'qotmaydi. Chiqarilgan yozuvlar xulosaga qo'shish uchun qaytariladi.
+# KEYS[1] — kontekst; ARGV: ttl, token_budget (0 — cheklanmagan), history_limit, xabarlar...
+APPEND_HISTORY_LUA = """
+for i = 4, #ARGV do
+    redis.call('RPUSH', KEYS[1], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+local budget = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+local keep = #ARGV - 3
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+local tokens = {}
+local total = 0
+for i, item in ipairs(items) do
+    local entry = cjson.decode(item)
+    local t = tonumber(entry['tokens'])
+    if not t or t == 0 then
+        -- tokens maydonisiz eski yozuvlar: estimate_tokens bilan bir xil taxmin (baytlarda)
+        local content = type(entry['content']) == 'string' and entry['content'] or ''
+        t = 4 + math.floor((string.len(content) * 2 + 6) / 7)
+    end
+    tokens[i] = t
+    total = total + t
+end
+local drop = 0
+while #items - drop > keep and ((budget > 0 and total > budget) or #items - drop > limit) do
+    drop = drop + 1
+    total = total - tokens[drop]
+end
+if drop == 0 then
+    return {}
+end
+redis.call('LTRIM', KEYS[1], drop, -1)
+local evicted = {}
+for i = 1, drop do
+    evicted[i] = items[i]
+end
+return evicted
+"""
+
+
+class RedisStateBackend(StateBackend):
+    """
+    Redis'dagi umumiy holat: bir nechta polling/webhook worker bir xil kontekst va
+    cheklovlarni ko'radi, restartdan keyin ham kontekst saqlanadi.
+    """
+
+    def __init__(
+            self,
+            dsn: str,
+            history_limit: int = 8,
+            history_ttl: int = 7 * 24 * 3600,
+            cooldown_ttl: int = 3600,
+            prefix: str = "bot:",
+    ) -> None:
+        from redis.asyncio import Redis
+
+        self.redis = Redis.from_url(dsn, decode_responses=True)
+        self.history_limit = history_limit
+        self.history_ttl = history_ttl
+        self.cooldown_ttl = cooldown_ttl
+        self.prefix = prefix
+        self._cooldown = self.redis.register_script(COOLDOWN_LUA)
+        self._append_history = self.redis.register_script(APPEND_HISTORY_LUA)
+
+    def _key(self, *parts) -> str:
+        return self.prefix + ":".join("-" if p is None else str(p) for p in parts)
+
+    async def get_history(self, chat_id: int) -> List[ChatCompletionMessageParam]:
+        items = await self.redis.lrange(self._key("history", chat_id), 0, -1)
+        return [json.loads(item) for item in items]
+
+    async def append_history(
+            self, chat_id: int, *messages: ChatCompletionMessageParam, token_budget: int = 0,
+    ) -> List[ChatCompletionMessageParam]:
+        evicted = await self._append_history(
+            keys=[self._key("history", chat_id)],
+            args=[
+                self.history_ttl, token_budget, self.history_limit,
+                *(json.dumps(m, ensure_ascii=False) for m in messages),
+            ],
+        )
+        return [json.loads(item) for item in evicted]
+
+    async def clear_history(self, chat_id: int) -> None:
+        await self.redis.delete(self._key("history", chat_id), self._key("summary", chat_id))
+
+    async def get_summary(self, chat_id: int) -> Optional[dict]:
+        raw = await self.redis.get(self._key("summary", chat_id))
+        return json.loads(raw) if raw else None
+
+    async def set_summary(self, chat_id: int, summary: dict) -> None:
+        await self.redis.set(
+            self._key("summary", chat_id), json.dumps(summary, ensure_ascii=False), ex=self.history_ttl
+        )
+
+    async def user_rate_limited(self, user_id: int, window: float) -> bool:
+        # SET NX — kalit bor bo'lsa (oyna ichida) yozilmaydi
+        created = await self.redis.set(self._key("user", user_id), 1, nx=True, px=max(1, int(window * 1000)))
+        return not created
+
+    async def group_cooldown_ok(self, chat_id: int, window: float) -> bool:
+        result = await self._cooldown(
+            keys=[self._key("cooldown", chat_id)],
+            args=[time.time(), window, self.cooldown_ttl],
+        )
+        return bool(result)
+
+    async def close(self) -> None:
+        await self.redis.aclose()
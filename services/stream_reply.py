@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Tuple
+
+from aiogram import exceptions, types
+
+
+class StreamingReply:
+    """
+    OpenAI stream javobini Telegramga bosqichma-bosqich chiqaruvchi yordamchi.
+
+    Birinchi to'liq jumla kelishi bilan ``reply`` yuboriladi, keyin xabar
+    ``min_interval`` soniyadan tez bo'lmagan oraliqda tahrirlanadi (Telegram
+    edit cheklovlariga tushib qolmaslik uchun).
+
+    ``push`` kutmaydi: oxirgi matn fon vazifasida chiqariladi — Telegram kechikishi, flood
+    va yuborish navbati OpenAI stream'ini (va uning limiter slotini) ushlab turmaydi.
+    """
+
+    def __init__(self, message: types.Message, min_interval: float = 1.5, max_length: int = 350) -> None:
+        self.message = message
+        self.min_interval = min_interval
+        self.max_length = max_length
+        self.sent: Optional[types.Message] = None
+        self.shown = ""
+        self.started = time.perf_counter()
+        self.first_visible: Optional[float] = None
+        self.edits = 0
+        self._next_edit_at = 0.0
+        self._latest: Optional[Tuple[str, int]] = None
+        self._changed = asyncio.Event()
+        self._publisher: Optional[asyncio.Task] = None
+        self._closed = False
+
+    def _clip(self, text: str) -> str:
+        if len(text) > self.max_length:
+            return text[:self.max_length - 20] + "..."
+        return text
+
+    async def update(self, text: str, complete_sentences: int) -> None:
+        """
+        Oraliq matnni ko'rsatadi.
+
+        :param text: Hozirgacha tozalangan matn.
+        :param complete_sentences: Matndagi tugallangan jumlalar soni.
+        """
+        text = self._clip(text.strip())
+        if not text or text == self.shown:
+            return
+
+        if self.sent is None:
+            if complete_sentences < 1:
+                return
+            self.sent = await self.message.reply(text, disable_web_page_preview=True)
+            self.first_visible = time.perf_counter() - self.started
+            self.shown = text
+            self._next_edit_at = time.monotonic() + self.min_interval
+            return
+
+        if time.monotonic() < self._next_edit_at:
+            return
+        await self._edit(text)
+
+    def push(self, text: str, complete_sentences: int) -> None:
+        """``update`` ning kutmaydigan varianti: faqat eng oxirgi matn fon vazifasida chiqariladi."""
+        self._latest = (text, complete_sentences)
+        self._changed.set()
+        if self._publisher is None:
+            self._publisher = asyncio.create_task(self._publish())
+
+    async def _publish(self) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if self._closed:
+                return
+            text, complete_sentences = self._latest
+            try:
+                await self.update(text, complete_sentences)
+            except Exception as e:
+                # Oraliq matn chiqmasa ham yakuniy ``finish`` javobni yuboradi
+                logging.warning(f"Stream oraliq matnini yuborib bo'lmadi: {e}")
+
+    async def drain(self) -> None:
+        """Fon vazifasini to'xtatadi (boshlangan yuborish tugashini kutadi)."""
+        self._closed = True
+        if self._publisher is not None:
+            self._changed.set()
+            await self._publisher
+            self._publisher = None
+
+    async def finish(self, text: str) -> types.Message:
+        """Yakuniy matnni chiqaradi (xabar hali yuborilmagan bo'lsa — oddiy reply)."""
+        await self.drain()
+        text = self._clip(text.strip())
+        if self.sent is None:
+            self.sent = await self.message.reply(text, disable_web_page_preview=True)
+            self.first_visible = time.perf_counter() - self.started
+            self.shown = text
+            return self.sent
+
+        if text != self.shown:
+            delay = self._next_edit_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._edit(text, retry=True)
+        return self.sent
+
+    async def _edit(self, text: str, retry: bool = False) -> None:
+        try:
+            await self.sent.edit_text(text, disable_web_page_preview=True)
+            self.shown = text
+            self.edits += 1
+            self._next_edit_at = time.monotonic() + self.min_interval
+        except exceptions.TelegramRetryAfter as e:
+            self._next_edit_at = time.monotonic() + e.retry_after
+            if retry:
+                await asyncio.sleep(e.retry_after)
+                await self._edit(text)
+        except exceptions.TelegramBadRequest as e:
+            # "message is not modified" va shunga o'xshash holatlar — jimgina o'tkazamiz
+            logging.debug(f"Stream xabarini tahrirlab bo'lmadi: {e}")
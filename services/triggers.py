@@ -0,0 +1,122 @@
+import re
+from typing import Dict, Iterable, Optional, Pattern, Sequence, Set
+
+
+def trie_pattern(words: Iterable[str]) -> str:
+    """
+    So'zlar ro'yxatidan prefikslari birlashtirilgan (trie) regex yasaydi.
+
+    ``a|ab|abc`` o'rniga ``a(?:b(?:c)?)?`` — Python regex dvigateli har pozitsiyada
+    barcha alternativalarni sinamaydi, bitta daraxt bo'ylab yuradi (Aho-Corasick'ka yaqin).
+    Uzunroq moslik har doim afzal.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        optional = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if optional:
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class TriggerFeatures:
+    """Bitta xabar uchun trigger belgilari — ``should_respond`` va listener shu bilan ishlaydi."""
+
+    __slots__ = ("it_topic", "question", "hot", "code_request", "playful", "mention_word", "mentioned", "ask")
+
+    def __init__(self) -> None:
+        self.it_topic = False
+        self.question = False
+        self.hot = 0
+        self.code_request = False
+        self.playful = False
+        self.mention_word = False
+        self.mentioned = False
+        self.ask = False
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"TriggerFeatures({fields})"
+
+
+class TriggerClassifier:
+    """
+    Xabarni bir marta tahlil qiladi: bitta kichik harfli nusxa ustidan ikkita trie regex —
+    IT mavzulari (so'z chegarasi bilan, birinchi moslikda to'xtaydi) va qolgan kalit so'zlar
+    (substring sifatida).
+
+    Mavzu va kalit so'zlar alohida qidiriladi: bitta ``(?=(mavzu)|(kalit))`` da bir pozitsiyada
+    faqat birinchi alternativa yozilardi va shu joydan boshlanadigan kalit so'z yo'qolardi.
+    Kalit so'zlar lookahead ichidagi guruh bilan har bir pozitsiyada qidiriladi, shuning uchun
+    bir-birining ichidagi kalit so'zlar ham ``k in low`` dagidek topiladi.
+    """
+
+    def __init__(
+            self,
+            topics: Sequence[str],
+            question_words: Sequence[str],
+            heated_markers: Sequence[str],
+            code_hints: Sequence[str],
+            playful_hints: Sequence[str],
+            mention_words: Sequence[str],
+            bot_username: Optional[str] = None,
+    ) -> None:
+        self.heated_markers = frozenset(heated_markers)
+        self._categories: Dict[str, Set[str]] = {}
+        for category, words in (
+                ("question", question_words),
+                ("hot", heated_markers),
+                ("code_request", code_hints),
+                ("playful", playful_hints),
+                ("mention_word", mention_words),
+        ):
+            for word in words:
+                self._categories.setdefault(word.lower(), set()).add(category)
+        if bot_username:
+            self._categories.setdefault(f"@{bot_username}".lower(), set()).add("mentioned")
+
+        self.topic_pattern: Pattern = re.compile(r"\b" + trie_pattern(t.lower() for t in topics) + r"\b")
+        self.keyword_pattern: Pattern = re.compile(r"(?=(" + trie_pattern(self._categories) + r"))")
+        # "ab" topilganda uning ichidagi "b" ham alohida pozitsiyada topiladi — prefiks
+        # bo'lgan qisqa kalit so'zlar uchun esa (masalan "aka" / "aka bot") kategoriya bir xil.
+        self._prefixes = {
+            word: [other for other in self._categories if other != word and word.startswith(other)]
+            for word in self._categories
+        }
+
+    def classify(self, text: str) -> TriggerFeatures:
+        features = TriggerFeatures()
+        if not text:
+            return features
+        features.ask = text.startswith("/ask")
+        low = text.lower()
+        features.question = "?" in low
+
+        features.it_topic = self.topic_pattern.search(low) is not None
+
+        hot_seen = None
+        for match in self.keyword_pattern.finditer(low):
+            word = match.group(1)
+            for kw in (word, *self._prefixes[word]):
+                for category in self._categories[kw]:
+                    if category == "hot":
+                        if hot_seen is None:
+                            hot_seen = {kw}
+                        else:
+                            hot_seen.add(kw)
+                    else:
+                        setattr(features, category, True)
+        if hot_seen:
+            features.hot = len(hot_seen)
+        return features
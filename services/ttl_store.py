@@ -0,0 +1,138 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class _Entry:
+    __slots__ = ("value", "expires", "size")
+
+    def __init__(self, value: Any, expires: float, size: int = 0) -> None:
+        self.value = value
+        self.expires = expires
+        self.size = size
+
+
+_ENTRY_SIZE = sys.getsizeof(_Entry(None, 0.0))
+
+
+class TTLStore(Generic[V]):
+    """
+    Xotiradagi kalit-qiymat ombori: har yozuvning yashash muddati (TTL) va umumiy
+    ``max_entries`` chegarasi bor. Chegaradan oshsa eng uzoq ishlatilmagan (LRU) yozuv
+    chiqariladi; muddati o'tganlari o'qishda yoki ``sweep`` orqali tozalanadi.
+
+    Qiymatlar ``__slots__`` li yozuvlarda saqlanadi — kalit boshiga qo'shimcha xotira kichik.
+    Taxminiy hajm yozishda o'lchanib jamlanadi (``memory_bytes`` — O(1)); qiymat joyida
+    o'zgartirilsa (masalan, ``deque.extend``) ``resize`` chaqiriladi.
+    """
+
+    def __init__(
+            self,
+            max_entries: int,
+            ttl: float,
+            sizeof: Callable[[Any], int] = sys.getsizeof,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _live(self, key: Hashable, now: float) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= now:
+            del self._data[key]
+            self._bytes -= entry.size
+            self.expired += 1
+            return None
+        return entry
+
+    def _measure(self, key: Hashable, value: Any) -> int:
+        return _ENTRY_SIZE + sys.getsizeof(key) + self.sizeof(value)
+
+    def get(self, key: Hashable, default: Any = None) -> Optional[V]:
+        entry = self._live(key, time.monotonic())
+        if entry is None:
+            return default
+        self._data.move_to_end(key)
+        return entry.value
+
+    def set(self, key: Hashable, value: V, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        size = self._measure(key, value)
+        entry = self._data.get(key)
+        if entry is not None:
+            self._bytes += size - entry.size
+            entry.value = value
+            entry.expires = expires
+            entry.size = size
+            self._data.move_to_end(key)
+            return
+        self._data[key] = _Entry(value, expires, size)
+        self._bytes += size
+        while len(self._data) > self.max_entries:
+            _, evicted = self._data.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evicted += 1
+
+    def setdefault(self, key: Hashable, factory: Callable[[], V], ttl: Optional[float] = None) -> V:
+        """Mavjud qiymatni qaytaradi (muddatini uzaytiradi) yoki ``factory()`` natijasini yozadi."""
+        now = time.monotonic()
+        entry = self._live(key, now)
+        if entry is None:
+            value = factory()
+            self.set(key, value, ttl)
+            return value
+        entry.expires = now + (self.ttl if ttl is None else ttl)
+        self._data.move_to_end(key)
+        return entry.value
+
+    def pop(self, key: Hashable, default: Any = None) -> Optional[V]:
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self._bytes -= entry.size
+        return entry.value
+
+    def resize(self, key: Hashable) -> None:
+        """Joyida o'zgartirilgan qiymat hajmini qayta o'lchaydi."""
+        entry = self._data.get(key)
+        if entry is not None:
+            size = self._measure(key, entry.value)
+            self._bytes += size - entry.size
+            entry.size = size
+
+    def sweep(self) -> int:
+        """Muddati o'tgan barcha yozuvlarni o'chiradi va ularning sonini qaytaradi."""
+        now = time.monotonic()
+        stale = [key for key, entry in self._data.items() if entry.expires <= now]
+        for key in stale:
+            self._bytes -= self._data.pop(key).size
+        self.expired += len(stale)
+        return len(stale)
+
+    def items(self) -> Iterator[Tuple[Hashable, V]]:
+        now = time.monotonic()
+        return ((key, entry.value) for key, entry in list(self._data.items()) if entry.expires > now)
+
+    def memory_bytes(self) -> int:
+        """Taxminiy xotira hajmi: konteyner + yozuvlar + kalit/qiymatlar (``sizeof`` orqali)."""
+        return sys.getsizeof(self._data) + self._bytes
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "evicted": self.evicted,
+            "expired": self.expired,
+        }
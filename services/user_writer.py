@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional
+
+from infrastructure.database.repo.requests import RequestsRepo
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    user_id: int
+    full_name: str
+    language: str
+    username: Optional[str] = None
+
+
+class UserWriteBehind:
+    """
+    Foydalanuvchilarni bazaga "write-behind" usulida yozuvchi bufer.
+
+    Yaqinda ko'rilgan foydalanuvchilar LRU da saqlanadi: ma'lumot o'zgarmagan bo'lsa
+    bazaga umuman murojaat qilinmaydi. Yangi yoki o'zgargan foydalanuvchilar navbatga
+    qo'yiladi va fon vazifasi ularni har ``flush_interval`` soniyada yoki ``max_batch``
+    ta yig'ilganda yozadi — har bir upsert ko'pi bilan ``max_batch`` qator (asyncpg
+    parametrlar chegarasi). Baza ishlamay qolsa navbat ``max_pending`` bilan cheklanadi:
+    eng eski yozuvlar tashlanadi (``dropped``) va foydalanuvchi keyingi xabarida qayta navbatga tushadi.
+    """
+
+    def __init__(
+            self,
+            session_pool,
+            flush_interval: float = 0.5,
+            max_batch: int = 500,
+            lru_size: int = 50_000,
+            max_pending: int = 20_000,
+    ) -> None:
+        self.session_pool = session_pool
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.lru_size = lru_size
+        self.max_pending = max_pending
+
+        self._seen: "OrderedDict[int, UserSnapshot]" = OrderedDict()
+        self._pending: Dict[int, UserSnapshot] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.skipped = 0
+        self.queued = 0
+        self.flushed = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+
+    def seen(self, user: UserSnapshot) -> UserSnapshot:
+        """
+        Foydalanuvchini qayd qiladi. O'zgarish bo'lsa — yozish navbatiga qo'shadi.
+
+        :param user: Foydalanuvchi ma'lumotlari.
+        :return: Keshdagi foydalanuvchi ma'lumotlari.
+        """
+        cached = self._seen.get(user.user_id)
+        if cached == user:
+            self._seen.move_to_end(user.user_id)
+            self.skipped += 1
+            return cached
+
+        self._remember(user)
+        self._pending[user.user_id] = user
+        self.queued += 1
+        self._trim()
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return user
+
+    def _remember(self, user: UserSnapshot) -> None:
+        self._seen[user.user_id] = user
+        self._seen.move_to_end(user.user_id)
+        while len(self._seen) > self.lru_size:
+            self._seen.popitem(last=False)
+
+    def _trim(self) -> None:
+        """Navbat ``max_pending`` dan oshsa eng eski yozuvlarni tashlaydi."""
+        while len(self._pending) > self.max_pending:
+            user_id = next(iter(self._pending))
+            del self._pending[user_id]
+            # LRU dan ham chiqaramiz — keyingi xabarida foydalanuvchi yana navbatga tushadi
+            self._seen.pop(user_id, None)
+            self.dropped += 1
+
+    async def flush(self) -> int:
+        """
+        Navbatdagi foydalanuvchilarni ``max_batch`` qatorlik bo'laklarda bazaga yozadi.
+        Bo'lak yozilmasa, u va qolganlari navbatga qaytadi.
+
+        :return: Yozilgan qatorlar soni.
+        """
+        if not self._pending:
+            return 0
+
+        pending, self._pending = list(self._pending.values()), {}
+        written = 0
+        for start in range(0, len(pending), self.max_batch):
+            chunk = pending[start:start + self.max_batch]
+            try:
+                async with self.session_pool() as session:
+                    written += await RequestsRepo(session).users.upsert_users([asdict(user) for user in chunk])
+            except Exception:
+                self.failed_flushes += 1
+                rest = pending[start:]
+                logging.exception(f"Foydalanuvchilarni yozishda xato ({len(rest)} ta), keyingi flush'da qayta uriniladi")
+                # Yangiroq ma'lumot kelgan bo'lsa, uni ustiga yozmaymiz; eski yozuvlar navbat boshida qoladi
+                newer, self._pending = self._pending, {user.user_id: user for user in rest}
+                self._pending.update(newer)
+                self._trim()
+                break
+
+        self.flushed += written
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="user-write-behind")
+
+    async def stop(self) -> None:
+        """Fon vazifasini to'xtatadi va qolgan navbatni yozib tugatadi."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "skipped": self.skipped,
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "pending": len(self._pending),
+            "cached": len(self._seen),
+        }